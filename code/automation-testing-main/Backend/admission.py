@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; `retry_after` is the client back-off hint in seconds."""
+
+    def __init__(self, route_class, retry_after):
+        super().__init__(f"too many {route_class} requests in progress")
+        self.route_class = route_class
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency limits with a bounded, prioritised wait queue.
+
+    At most `capacity` admitted requests run at once, and each route class
+    at most its own entry in `limits`, which lists classes highest priority
+    first.  Giving a lower class a smaller limit keeps slots free for the
+    classes above it; when a slot frees up, waiters of a higher class go
+    first.  A request that finds `queue_size` others of its class already
+    waiting, or that would wait past `max_wait` seconds or its deadline, is
+    rejected with Overloaded straight away instead of queueing on the
+    database.  Classes in `no_wait` never queue: they are rejected as soon
+    as they find no slot, so they never hold a server thread while waiting.
+    """
+
+    def __init__(self, capacity, limits, queue_size=64, max_wait=1.0, retry_after=2, no_wait=()):
+        self.capacity = capacity
+        self.limits = dict(limits)
+        self.no_wait = frozenset(no_wait)
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self._cond = threading.Condition()
+        self._running = {route_class: 0 for route_class in self.limits}
+        self._waiting = {route_class: 0 for route_class in self.limits}
+        self._total = 0
+        self._stats = {'admitted': 0, 'queued': 0, 'rejected': 0, 'timed_out': 0}
+
+    def admit(self, route_class, deadline=None):
+        """Wait for a slot for `route_class`; raises Overloaded if none frees up in time.
+
+        `deadline` is a time.monotonic() value.  Every admitted request must
+        be paired with release().
+        """
+        give_up = time.monotonic() + self.max_wait
+        if deadline is not None:
+            give_up = min(give_up, deadline)
+        with self._cond:
+            if not self._waiting[route_class] and self._can_run(route_class):
+                self._enter(route_class)
+                return
+            if route_class in self.no_wait or self._waiting[route_class] >= self.queue_size:
+                self._stats['rejected'] += 1
+                raise Overloaded(route_class, self.retry_after)
+
+            self._waiting[route_class] += 1
+            self._stats['queued'] += 1
+            try:
+                while not self._can_run(route_class):
+                    remaining = give_up - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timed_out'] += 1
+                        raise Overloaded(route_class, self.retry_after)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting[route_class] -= 1
+                # A waiter leaving may unblock lower classes that were yielding to it
+                self._cond.notify_all()
+            self._enter(route_class)
+
+    def release(self, route_class):
+        """Give back the slot taken by admit()."""
+        with self._cond:
+            self._running[route_class] -= 1
+            self._total -= 1
+            self._cond.notify_all()
+
+    def stats(self):
+        """Return a snapshot of counters and current occupancy per class."""
+        with self._cond:
+            snapshot = dict(self._stats, running=self._total, capacity=self.capacity)
+            for route_class in self.limits:
+                snapshot[f'running_{route_class}'] = self._running[route_class]
+                snapshot[f'waiting_{route_class}'] = self._waiting[route_class]
+        return snapshot
+
+    def _can_run(self, route_class):
+        if self._total >= self.capacity or self._running[route_class] >= self.limits[route_class]:
+            return False
+        for other in self.limits:
+            if other == route_class:
+                return True
+            if self._waiting[other] and self._running[other] < self.limits[other]:
+                return False  # a higher class is waiting for a slot it could take
+
+    def _enter(self, route_class):
+        self._running[route_class] += 1
+        self._total += 1
+        self._stats['admitted'] += 1
+
+
+class AsyncAdmissionController:
+    """Admission control for coroutines: an asyncio.Semaphore of `limits[c]` slots per route class.
+
+    A request waits for a slot of its own class on the event loop, holding
+    no thread, for at most `max_wait` seconds or until its deadline, and is
+    then rejected with Overloaded.  The semaphores belong to the loop that
+    first uses them; a new loop (e.g. a restarted server) starts afresh.
+    """
+
+    def __init__(self, limits, max_wait=1.0, retry_after=2):
+        self.limits = dict(limits)
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self._loop = None
+        self._slots = {}
+        self._running = {route_class: 0 for route_class in self.limits}
+        self._stats = {'admitted': 0, 'timed_out': 0}
+
+    async def admit(self, route_class, deadline=None):
+        """Wait for a slot for `route_class`; every admitted request must be paired with release()."""
+        slots = self._semaphores()[route_class]
+        if slots.locked():
+            timeout = self.max_wait
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+            try:
+                await asyncio.wait_for(slots.acquire(), max(0, timeout))
+            except asyncio.TimeoutError:
+                self._stats['timed_out'] += 1
+                raise Overloaded(route_class, self.retry_after)
+        else:
+            await slots.acquire()
+        self._running[route_class] += 1
+        self._stats['admitted'] += 1
+
+    def release(self, route_class):
+        """Give back the slot taken by admit()."""
+        self._running[route_class] -= 1
+        self._slots[route_class].release()
+
+    def stats(self):
+        snapshot = dict(self._stats)
+        for route_class, limit in self.limits.items():
+            snapshot[f'running_{route_class}'] = self._running[route_class]
+            snapshot[f'limit_{route_class}'] = limit
+        return snapshot
+
+    def _semaphores(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = {route_class: asyncio.Semaphore(limit) for route_class, limit in self.limits.items()}
+            self._running = {route_class: 0 for route_class in self.limits}
+        return self._slots
@@ -1,11 +1,61 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
-import mysql.connector
+from flask import (Flask, Response, abort, g, has_request_context, render_template, request, redirect, send_file,
+                   url_for, session, jsonify)
+import atexit
+import logging
+from datetime import date, datetime, timedelta, timezone
 import secrets
 import os
-import uuid
+import threading
+import time
+from contextlib import closing
+
+import click
+
+from admission import AdmissionController, Overloaded
+from cart_store import MemoryCartBackend, SharedCartBackend, parse_address
+from assets import IMMUTABLE, AssetManifest, negotiate, optimize_response
+from db_pool import DeadlineExceeded, PoolExhausted
+from dispatch import DispatchScheduler, SharedDispatchScheduler
+from eta import EtaEngine, utc_stamp
+from fragment_cache import FragmentCache
+from idempotency import IN_PROGRESS, KEY_MAX_LENGTH, MISMATCH, REPLAY, IdempotencyCache, fingerprint
+from menu_catalog import MenuCatalog
+from metrics import CONTENT_TYPE, InstrumentedConnection, Registry
+from order_events import DELIVERED, HEARTBEAT, OrderEvents, StreamLimitReached, format_event, unsent
+from order_queue import OrderWriter, PERSISTED, QUEUED
+from order_ids import key_to_text, make_generator, migrate_order_ids, text_to_key
+from orders import (ORDER_COLUMNS, PhaseTimer, count_items, decode_cursor, fetch_order_items, fetch_order_page,
+                    insert_orders, order_item_rows, order_items_statement, order_summary, order_total,
+                    orders_statement, price_items, split_priced, utc_epoch)
+from rollups import apply_rollups, backfill, rollup_statements
+from storage import DB_ERRORS, INTEGRITY_ERRORS, create_engine
+from structured_logging import LogPipeline
+from user_cache import MISS, UserLookupCache
+from warmup import Warmup
 
 app = Flask(__name__)
-app.secret_key = secrets.token_hex(16)
+
+def _load_secret_key():
+    """Returns the session signing key shared by every worker.
+
+    SECRET_KEY wins, then the contents of SECRET_KEY_FILE. Without either a random
+    per-process key is generated, which only suits a single development server.
+    """
+    key = os.getenv("SECRET_KEY")
+    if key:
+        return key
+    path = os.getenv("SECRET_KEY_FILE")
+    if path:
+        with open(path) as f:
+            return f.read().strip()
+    return secrets.token_hex(16)
+
+app.secret_key = _load_secret_key()
+
+# Storage Engine: "mysql" or "sqlite" (embedded, no server needed)
+app.config['DB_ENGINE'] = os.getenv("DB_ENGINE", "mysql")
+app.config['SQLITE_PATH'] = os.getenv("SQLITE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "scu_food_delivery.db"))
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend.sql")
 
 # MySQL Configuration
 app.config['MYSQL_HOST'] = os.getenv("MYSQL_HOST", "localhost")
@@ -13,6 +63,91 @@ app.config['MYSQL_USER'] = os.getenv("MYSQL_USER", "scu_food")
 app.config['MYSQL_PASSWORD'] = os.getenv("MYSQL_PASSWORD", "")
 app.config['MYSQL_DB'] = os.getenv("MYSQL_DB", "scu_food_delivery")
 
+# Connection Pool Configuration
+app.config['DB_POOL_MIN_SIZE'] = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+app.config['DB_POOL_MAX_SIZE'] = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+app.config['DB_POOL_TIMEOUT'] = float(os.getenv("DB_POOL_TIMEOUT", "5"))  # seconds to wait for a free connection
+app.config['DB_POOL_MAX_LIFETIME'] = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+app.config['DB_POOL_VALIDATE_ON_BORROW'] = os.getenv("DB_POOL_VALIDATE_ON_BORROW", "false").lower() == "true"
+app.config['DB_POOL_PING_INTERVAL'] = float(os.getenv("DB_POOL_PING_INTERVAL", "30"))  # idle seconds before a ping
+app.config['DB_CONNECT_TIMEOUT'] = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))  # seconds to open a new connection
+
+# Server Processes (gunicorn.conf.py exports the counts it resolved; a plain `python app.py` is one worker)
+app.config['WEB_WORKERS'] = int(os.getenv("WEB_WORKERS", "1"))  # worker processes; above 1, per-process state must be shared
+app.config['WEB_THREADS'] = int(os.getenv("WEB_THREADS", "4"))  # server threads per worker
+
+# Admission Control (capacity follows the pool: an admitted request beyond it would only wait for a connection)
+app.config['ADMISSION_CAPACITY'] = int(os.getenv("ADMISSION_CAPACITY", app.config['DB_POOL_MAX_SIZE']))  # requests running at once
+# Browsing fails fast at its limit, which stays below the server threads so one is always free for orders
+app.config['ADMISSION_BROWSE_LIMIT'] = int(os.getenv("ADMISSION_BROWSE_LIMIT", max(1, min(app.config['ADMISSION_CAPACITY'], app.config['WEB_THREADS']) - 1)))
+app.config['ADMISSION_QUEUE_SIZE'] = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))  # waiting requests per class before shedding
+app.config['ADMISSION_MAX_WAIT'] = float(os.getenv("ADMISSION_MAX_WAIT", "1"))  # seconds a request may wait for a slot
+app.config['ADMISSION_RETRY_AFTER'] = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))  # seconds, sent with every 503
+app.config['REQUEST_DEADLINE'] = float(os.getenv("REQUEST_DEADLINE", "5"))  # seconds from arrival for a request's DB work
+
+# Start-up Warm-up and Health Checks
+app.config['WARMUP_DB_CONNECTIONS'] = int(os.getenv("WARMUP_DB_CONNECTIONS", app.config['DB_POOL_MIN_SIZE']))  # opened before reporting ready
+app.config['READINESS_TIMEOUT'] = float(os.getenv("READINESS_TIMEOUT", "2"))  # seconds /readyz waits for the database
+
+# Logging
+app.config['LOG_LEVEL'] = os.getenv("LOG_LEVEL", "INFO")
+app.config['LOG_QUEUE_SIZE'] = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records buffered before new ones are dropped
+app.config['LOG_SUCCESS_SAMPLE_RATE'] = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "0.1"))  # share of successful requests logged
+app.config['LOG_SLOW_REQUEST_MS'] = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000"))  # slower requests are always logged
+
+# Write-behind Order Ingestion
+app.config['ORDER_WRITE_BEHIND'] = os.getenv("ORDER_WRITE_BEHIND", "false").lower() == "true"
+app.config['ORDER_QUEUE_SIZE'] = int(os.getenv("ORDER_QUEUE_SIZE", "1000"))
+app.config['ORDER_BATCH_SIZE'] = int(os.getenv("ORDER_BATCH_SIZE", "50"))
+app.config['ORDER_FLUSH_INTERVAL'] = float(os.getenv("ORDER_FLUSH_INTERVAL", "0.2"))  # seconds
+app.config['ORDER_ID_SCHEME'] = os.getenv("ORDER_ID_SCHEME", "ulid")  # "ulid" (time-ordered) or "legacy"
+app.config['BULK_ORDER_MAX'] = int(os.getenv("BULK_ORDER_MAX", "100"))  # orders accepted per /bulk_orders call
+app.config['REPORT_USER_IDS'] = {int(i) for i in os.getenv("REPORT_USER_IDS", "1").split(",") if i.strip()}  # may read sales reports
+app.config['ROLLUP_BACKFILL_CHUNK'] = int(os.getenv("ROLLUP_BACKFILL_CHUNK", "1000"))  # orders per backfill transaction
+app.config['ORDER_PAGE_SIZE'] = int(os.getenv("ORDER_PAGE_SIZE", "20"))  # default /orders page size
+app.config['ORDER_PAGE_MAX'] = int(os.getenv("ORDER_PAGE_MAX", "100"))  # largest page a client may request
+
+# Cart Store Configuration
+app.config['CART_BACKEND'] = os.getenv("CART_BACKEND", "shared" if app.config['WEB_WORKERS'] > 1 else "memory")  # memory (single worker only) or shared
+app.config['CART_STORE_ADDRESS'] = os.getenv("CART_STORE_ADDRESS", "127.0.0.1:50055")
+app.config['CART_STORE_AUTHKEY'] = os.getenv("CART_STORE_AUTHKEY", "scu-food-carts")
+app.config['CART_STORE_SPAWN'] = os.getenv("CART_STORE_SPAWN", "true").lower() == "true"  # gunicorn starts the cart server (carts and courier runs) itself
+
+# Login Lookup Cache Configuration
+app.config['USER_CACHE_SIZE'] = int(os.getenv("USER_CACHE_SIZE", "10000"))
+app.config['USER_CACHE_TTL'] = float(os.getenv("USER_CACHE_TTL", "300"))  # seconds; edits to a users row apply after this
+app.config['USER_NEGATIVE_TTL'] = float(os.getenv("USER_NEGATIVE_TTL", "30"))  # seconds to remember emails with no account
+
+# Idempotent Order Placement
+app.config['IDEMPOTENCY_CACHE_SIZE'] = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))  # keys remembered per process
+app.config['IDEMPOTENCY_TTL'] = float(os.getenv("IDEMPOTENCY_TTL", "86400"))  # seconds a placed order's response is replayed
+
+# Live Order Stream (Server-Sent Events)
+app.config['ORDER_STREAM_MAX'] = int(os.getenv("ORDER_STREAM_MAX", max(1, app.config['WEB_THREADS'] // 2)))  # open streams per worker; each holds a server thread
+app.config['ORDER_STREAM_MAX_PER_USER'] = int(os.getenv("ORDER_STREAM_MAX_PER_USER", "2"))
+app.config['ORDER_STREAM_BUFFER'] = int(os.getenv("ORDER_STREAM_BUFFER", "64"))  # orders with unsent updates before a stream must resync
+app.config['ORDER_STREAM_HEARTBEAT'] = float(os.getenv("ORDER_STREAM_HEARTBEAT", "15"))  # seconds between keep-alive comments
+app.config['ORDER_STREAM_POLL'] = float(os.getenv("ORDER_STREAM_POLL", "2"))  # seconds between reads of changes made by other workers
+app.config['ORDER_STREAM_MAX_AGE'] = float(os.getenv("ORDER_STREAM_MAX_AGE", "300"))  # seconds before a stream is closed for the client to reconnect
+app.config['ORDER_STREAM_RETRY'] = int(os.getenv("ORDER_STREAM_RETRY", "3000"))  # ms the browser waits before reconnecting
+
+# Delivery ETA Model
+app.config['ETA_WINDOW'] = float(os.getenv("ETA_WINDOW", "900"))  # seconds of completions used for throughput
+app.config['ETA_MIN_THROUGHPUT'] = float(os.getenv("ETA_MIN_THROUGHPUT", "0.5"))  # orders/minute floor per location
+app.config['ETA_MAX_AGE'] = float(os.getenv("ETA_MAX_AGE", "3600"))  # seconds before an open order is presumed delivered
+app.config['ETA_REFRESH'] = float(os.getenv("ETA_REFRESH", "5"))  # seconds the queue state read from the database is reused
+app.config['COURIER_USER_IDS'] = {int(i) for i in os.getenv("COURIER_USER_IDS", "1").split(",") if i.strip()}  # may mark orders delivered
+
+# Courier Dispatch
+app.config['DISPATCH_BACKEND'] = os.getenv("DISPATCH_BACKEND", "shared" if app.config['WEB_WORKERS'] > 1 else "memory")  # memory (single worker only) or shared, in the cart server
+app.config['DISPATCH_MAX_WAIT'] = float(os.getenv("DISPATCH_MAX_WAIT", "120"))  # seconds a run waits after its first order is ready
+app.config['DISPATCH_MAX_BATCH'] = int(os.getenv("DISPATCH_MAX_BATCH", "4"))  # orders per courier run
+
+# Menu Catalog Configuration
+app.config['MENU_CACHE_TTL'] = float(os.getenv("MENU_CACHE_TTL", "300"))  # seconds before menu_items is re-read; menu edits in the database apply after this
+app.config['MENU_API_MAX_AGE'] = int(os.getenv("MENU_API_MAX_AGE", "30"))  # seconds browsers may reuse /api/menu
+app.config['MENU_API_SHARED_MAX_AGE'] = int(os.getenv("MENU_API_SHARED_MAX_AGE", "60"))  # seconds for proxies/CDNs
+
 # Location Delivery Times (in minutes)
 LOCATION_TIMES = {
     "Lucas Hall": 7,
@@ -31,18 +166,284 @@ LOCATION_IMAGES = {
     "Finn Residence Hall": "finn_hall.jpeg"
 }
 
+# Static assets get content-hashed URLs so browsers can cache them forever
+app.config['COMPRESS_MIN_SIZE'] = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))  # bytes; smaller bodies go uncompressed
+assets = AssetManifest(app.static_folder).build()
+app.jinja_env.globals['asset_url'] = lambda filename: assets.url(filename)
+# Embedded in the page so the client never has to ask for a location's image URL
+LOCATION_IMAGE_URLS = {location: assets.url(filename) for location, filename in LOCATION_IMAGES.items()}
+
+def _log_context():
+    """Request id, route, user id and elapsed time for records logged while serving a request."""
+    if not has_request_context() or 'request_id' not in g:
+        return {}
+    return {
+        'request_id': g.request_id,
+        'route': request.endpoint,
+        # dict.get reads the cookie session without marking it accessed (which would add Vary: Cookie)
+        'user_id': dict.get(session._get_current_object(), 'user_id'),
+        'duration_ms': round((time.perf_counter() - g.request_start) * 1000, 2),
+    }
+
+# JSON logs written by a background thread; request threads only enqueue
+log_pipeline = LogPipeline(
+    level=app.config['LOG_LEVEL'],
+    queue_size=app.config['LOG_QUEUE_SIZE'],
+    sample_rate=app.config['LOG_SUCCESS_SAMPLE_RATE'],
+    context=_log_context
+)
+log_pipeline.start()
+atexit.register(log_pipeline.stop)
+logger = logging.getLogger(__name__)
+request_log = logging.getLogger('app.request')
+slow_log = logging.getLogger('app.slow')
+
+# Metrics
+metrics_registry = Registry()
+REQUEST_DURATION = metrics_registry.histogram(
+    'http_request_duration_seconds', 'Time spent serving a request.', ('endpoint', 'method', 'status'))
+REQUESTS_IN_FLIGHT = metrics_registry.gauge(
+    'http_requests_in_flight', 'Requests currently being served.', ('endpoint',))
+DB_QUERY_DURATION = metrics_registry.histogram(
+    'db_query_duration_seconds', 'Time spent executing a SQL statement.', ('statement',))
+DB_QUERY_ROWS = metrics_registry.counter(
+    'db_query_rows_total', 'Rows returned or affected per SQL statement.', ('statement',))
+DB_ACQUIRE_DURATION = metrics_registry.histogram(
+    'db_connection_acquire_seconds', 'Time spent obtaining a database connection.')
+DB_ACQUIRE_FAILURES = metrics_registry.counter(
+    'db_connection_failures_total', 'Database connections that could not be obtained.')
+ORDERS_PLACED = metrics_registry.counter(
+    'orders_placed_total', 'Orders accepted per delivery location.', ('location',))
+IDEMPOTENT_REPLAYS = metrics_registry.counter(
+    'idempotent_replays_total', 'Repeated order submissions answered without placing another order.', ('source',))
+REQUESTS_SHED = metrics_registry.counter(
+    'http_requests_shed_total', 'Requests answered 503 by admission control.', ('reason',))
+
+_db_engine = None
+_db_engine_lock = threading.Lock()
+
+def get_db_engine():
+    """Return the configured storage engine, creating it on first use."""
+    global _db_engine
+    if _db_engine is None:
+        with _db_engine_lock:
+            if _db_engine is None:
+                _db_engine = create_engine(app.config, SCHEMA_PATH)
+    return _db_engine
+
 def get_db_connection():
-    """Establish and return a database connection."""
+    """Borrow a database connection from the storage engine; close() hands it back.
+
+    Inside a request the wait and the statements are bounded by the request
+    deadline; running out raises DeadlineExceeded, answered with a 503.
+    """
+    start = time.perf_counter()
+    deadline = g.get('deadline') if has_request_context() else None
     try:
-        return mysql.connector.connect(
-            host=app.config['MYSQL_HOST'],
-            user=app.config['MYSQL_USER'],
-            password=app.config['MYSQL_PASSWORD'],
-            database=app.config['MYSQL_DB']
-        )
-    except mysql.connector.Error as err:
-        print(f"Database Connection Error: {err}")
+        conn = get_db_engine().connect(deadline)
+    except (*DB_ERRORS, PoolExhausted) as err:
+        DB_ACQUIRE_FAILURES.inc()
+        logger.error("Database connection error: %s", err)
+        return None
+    finally:
+        DB_ACQUIRE_DURATION.observe(time.perf_counter() - start)
+    return InstrumentedConnection(conn, DB_QUERY_DURATION, DB_QUERY_ROWS)
+
+def _load_menu_items():
+    """Read every menu_items row for the menu catalog; None if the DB is unreachable."""
+    conn = get_db_connection()
+    if conn is None:
         return None
+    with closing(conn), closing(conn.cursor(dictionary=True)) as cursor:
+        cursor.execute("SELECT id, name, category, price FROM menu_items ORDER BY id")
+        return list(cursor.fetchall())
+
+menu_catalog = MenuCatalog(_load_menu_items, ttl=app.config['MENU_CACHE_TTL'])
+
+# Generates the public order ids; stored as 16-byte keys in orders.order_id
+order_ids = make_generator(app.config['ORDER_ID_SCHEME'])
+
+# Rendered menu section of index.html, reused until the menu content changes
+fragment_cache = FragmentCache()
+
+user_cache = UserLookupCache(
+    capacity=app.config['USER_CACHE_SIZE'],
+    ttl=app.config['USER_CACHE_TTL'],
+    negative_ttl=app.config['USER_NEGATIVE_TTL']
+)
+
+# Responses of /place_order requests that carried an Idempotency-Key
+idempotent_orders = IdempotencyCache(
+    capacity=app.config['IDEMPOTENCY_CACHE_SIZE'],
+    ttl=app.config['IDEMPOTENCY_TTL']
+)
+
+# Pushes order status and ETA changes to the owner's open /orders/stream connections
+order_events = OrderEvents(
+    max_streams=app.config['ORDER_STREAM_MAX'],
+    max_streams_per_user=app.config['ORDER_STREAM_MAX_PER_USER'],
+    max_pending=app.config['ORDER_STREAM_BUFFER']
+)
+
+def publish_order(order, status):
+    """Tells the order's owner about its new status and ETA."""
+    order_events.publish(order['user_id'], {'order_id': order['order_id'], 'status': status,
+                                            'eta_minutes': order['delivery_time']})
+
+def _make_cart_store():
+    """Builds the configured cart backend."""
+    if app.config['CART_BACKEND'] == 'shared':
+        return SharedCartBackend(parse_address(app.config['CART_STORE_ADDRESS']),
+                                 app.config['CART_STORE_AUTHKEY'].encode())
+    return MemoryCartBackend()
+
+cart_store = _make_cart_store()
+
+_order_writer = None
+_order_writer_lock = threading.Lock()
+
+def record_sales(cursor, orders):
+    """Add freshly inserted orders to the sales rollups, in the caller's transaction."""
+    apply_rollups(cursor, get_db_engine().name, orders)
+
+def get_order_writer():
+    """Return the write-behind order writer, creating it on first use."""
+    global _order_writer
+    if _order_writer is None:
+        with _order_writer_lock:
+            if _order_writer is None:
+                _order_writer = OrderWriter(
+                    lambda: get_db_connection(),
+                    DB_ERRORS,
+                    batch_size=app.config['ORDER_BATCH_SIZE'],
+                    flush_interval=app.config['ORDER_FLUSH_INTERVAL'],
+                    max_queue=app.config['ORDER_QUEUE_SIZE'],
+                    after_insert=lambda cursor, orders: record_sales(cursor, orders),
+                    on_status=publish_order
+                )
+                atexit.register(_order_writer.stop, 10)
+    return _order_writer
+
+metrics_registry.collector('db_pool', 'Database connection pool statistics.',
+                           lambda: get_db_engine().stats())
+metrics_registry.collector('menu_catalog', 'Menu catalog statistics.', lambda: menu_catalog.stats())
+metrics_registry.collector('fragment_cache', 'Rendered template fragment cache statistics.',
+                           lambda: fragment_cache.stats())
+metrics_registry.collector('user_cache', 'Login lookup cache statistics.', lambda: user_cache.stats())
+metrics_registry.collector('idempotency', 'Idempotency key cache statistics.', lambda: idempotent_orders.stats())
+metrics_registry.collector('order_queue', 'Write-behind order queue statistics.',
+                           lambda: _order_writer.stats() if _order_writer else {})
+metrics_registry.collector('dispatch', 'Courier run scheduler statistics.', lambda: dispatcher.stats())
+metrics_registry.collector('admission', 'Admission control occupancy and shedding.', lambda: admission.stats())
+metrics_registry.collector('logging', 'Log pipeline queue statistics.', lambda: log_pipeline.stats())
+metrics_registry.collector('order_streams', 'Live order stream statistics.', lambda: order_events.stats())
+metrics_registry.collector('warmup', 'Start-up warm-up state and phase durations.', lambda: warmup.stats())
+metrics_registry.collector('cart_store', 'Server-side cart store statistics.',
+                           lambda: {'carts': cart_store.count()})
+
+@app.before_request
+def _start_request_log():
+    # Honour an id set by the proxy so log lines can be joined across services
+    incoming = request.headers.get('X-Request-ID', '')
+    g.request_id = incoming if 0 < len(incoming) <= 64 and incoming.isprintable() else secrets.token_hex(8)
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def _start_request_metrics():
+    g.metrics_endpoint = request.endpoint or 'unmatched'
+    g.metrics_start = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc(endpoint=g.metrics_endpoint)
+
+# Admission classes, highest priority first; endpoints not listed here are browsing
+ROUTE_CLASSES = {'place_order': 'orders', 'bulk_orders': 'orders', 'order_status': 'orders'}
+# Health checks and routes that never touch the database are never queued or shed (None: no route matched)
+ADMISSION_EXEMPT = frozenset({'metrics', 'healthz', 'readyz', 'static', 'fingerprinted_asset', 'get_location_image',
+                              None})
+
+admission = AdmissionController(
+    app.config['ADMISSION_CAPACITY'],
+    {'orders': app.config['ADMISSION_CAPACITY'], 'browse': app.config['ADMISSION_BROWSE_LIMIT']},
+    queue_size=app.config['ADMISSION_QUEUE_SIZE'],
+    max_wait=app.config['ADMISSION_MAX_WAIT'],
+    retry_after=app.config['ADMISSION_RETRY_AFTER'],
+    no_wait=('browse',)  # a waiting page view would hold the server thread an order needs
+)
+
+@app.before_request
+def _admit_request():
+    if request.endpoint in ADMISSION_EXEMPT:
+        return
+    g.deadline = time.monotonic() + app.config['REQUEST_DEADLINE']
+    route_class = ROUTE_CLASSES.get(request.endpoint, 'browse')
+    admission.admit(route_class, g.deadline)
+    g.admission_class = route_class
+
+def _service_unavailable(reason, retry_after):
+    REQUESTS_SHED.inc(reason=reason)
+    return {'error': 'Service is busy, please retry shortly.'}, 503, {'Retry-After': str(retry_after)}
+
+@app.errorhandler(Overloaded)
+def _overloaded(err):
+    return _service_unavailable('overloaded', err.retry_after)
+
+@app.errorhandler(DeadlineExceeded)
+def _deadline_exceeded(err):
+    return _service_unavailable('deadline', app.config['ADMISSION_RETRY_AFTER'])
+
+@app.after_request
+def _record_response_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+@app.after_request
+def _send_request_id(response):
+    response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.after_request
+def _optimize_response(response):
+    # A view that read the session rendered a per-user body (Flask adds Vary: Cookie for the same reason)
+    return optimize_response(response, request, app.config['COMPRESS_MIN_SIZE'], private=session.accessed)
+
+@app.teardown_request
+def _release_admission(exc):
+    route_class = g.pop('admission_class', None)
+    if route_class is not None:
+        admission.release(route_class)
+
+@app.teardown_request
+def _log_request(exc):
+    start = g.get('request_start')
+    if start is None:
+        return
+    duration_ms = round((time.perf_counter() - start) * 1000, 2)
+    status = g.get('metrics_status', 500)
+    fields = {'method': request.method, 'path': request.path, 'status': status, 'duration_ms': duration_ms}
+    if duration_ms >= app.config['LOG_SLOW_REQUEST_MS']:
+        slow_log.warning("Slow request %s %s took %.0f ms", request.method, request.path, duration_ms, extra=fields)
+    if status >= 500:
+        request_log.error("%s %s %s", request.method, request.path, status, extra=fields, exc_info=exc)
+    else:
+        # Successes are the bulk of traffic, so only a sample of them is kept
+        request_log.info("%s %s %s", request.method, request.path, status, extra=dict(fields, sampled=status < 400))
+
+@app.teardown_request
+def _finish_request_metrics(exc):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return
+    REQUESTS_IN_FLIGHT.dec(endpoint=g.metrics_endpoint)
+    REQUEST_DURATION.observe(time.perf_counter() - start, endpoint=g.metrics_endpoint,
+                             method=request.method, status=g.get('metrics_status', 500))
+
+@app.route('/metrics')
+def metrics():
+    """Exposes service metrics in the Prometheus text exposition format."""
+    return Response(metrics_registry.render(), content_type=CONTENT_TYPE)
+
+# The login lookup; the SCU ID is compared in process by the user cache.  The cache keys
+# emails lower-cased, so the lookup must ignore case too (SQLite's = does not)
+USER_BY_EMAIL = 'SELECT id, name, scu_id FROM users WHERE LOWER(scu_email) = LOWER(%s)'
 
 @app.route('/', methods=['GET', 'POST'])
 def login():
@@ -52,77 +453,160 @@ def login():
         scu_email = request.form['scu_email']
         scu_id = request.form['scu_id']
 
-        conn = get_db_connection()
-        if conn is None:
-            return "Database connection failed", 500
+        user = user_cache.get(scu_email, scu_id)
+        if user is MISS:
+            conn = get_db_connection()
+            if conn is None:
+                return "Database connection failed", 500
 
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute('SELECT * FROM users WHERE scu_email = %s AND scu_id = %s', (scu_email, scu_id))
-        user = cursor.fetchone()
-        cursor.close()
-        conn.close()
+            with closing(conn), closing(conn.cursor(dictionary=True)) as cursor:
+                cursor.execute(USER_BY_EMAIL, (scu_email,))
+                row = cursor.fetchone()
+            user = user_cache.put(scu_email, row, scu_id)
 
-        if user:
-            session['user_id'] = user['id']
-            session['name'] = user['name']
+        error = _sign_in(session, user)
+        if error is None:
             return redirect(url_for('index'))
-        else:
-            error = 'Invalid SCU Email or SCU ID'
 
     return render_template('login.html', error=error)
 
+def _sign_in(sess, user):
+    """Starts a session for a looked-up user; returns None, or the login error if `user` is None."""
+    if not user:
+        return 'Invalid SCU Email or SCU ID'
+    sess['user_id'] = user['id']
+    sess['name'] = user['name']
+    return None
+
 @app.route('/index')
 def index():
     """Displays the main menu."""
     if 'user_id' not in session:
         return redirect(url_for('login'))
 
-    conn = get_db_connection()
-    if conn is None:
+    menu = menu_catalog.get()
+    if menu is None:
         return "Database connection failed", 500
 
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM menu_items")
-    menu_items = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    return render_template('index.html', **_index_context(session, menu))
+
+def _index_context(sess, menu):
+    """Template variables for index.html."""
+    return {'username': sess['name'], 'menu_fragment': _menu_fragment(menu), 'location_images': LOCATION_IMAGE_URLS}
 
-    return render_template('index.html', username=session['name'], menu_items=menu_items)
+def _menu_fragment(menu):
+    # Keyed by content digest: an unchanged menu is never re-rendered, a changed one always is
+    return fragment_cache.get('menu', menu.digest,
+                              lambda: app.jinja_env.get_template('_menu.html').render(menu_items=menu.items))
+
+@app.route('/api/menu')
+def menu_api():
+    """Read-only menu as JSON, optionally filtered by ?category=, with conditional GET."""
+    menu = menu_catalog.get()
+    if menu is None:
+        return jsonify({'error': 'Menu unavailable'}), 503
+
+    category = request.args.get('category')
+    if category is not None and not menu.by_category(category):
+        return jsonify({'error': 'Unknown category'}), 400
+
+    # Same menu content and filter -> same tag, in every worker
+    etag = f"{menu.digest[:32]}-{category or 'all'}"
+    cache_control = (f"public, max-age={app.config['MENU_API_MAX_AGE']}, "
+                     f"s-maxage={app.config['MENU_API_SHARED_MAX_AGE']}")
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        items = menu.by_category(category) if category else menu.items
+        response = jsonify({
+            'version': menu.version,
+            'items': [{'id': item['id'], 'name': item['name'], 'category': item['category'],
+                       'price': float(item['price'])} for item in items]
+        })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
 
 @app.route('/logout')
 def logout():
     """Logs out the user and clears session."""
-    session.clear()
+    _sign_out(session)
     return redirect(url_for('login'))
 
+def _sign_out(sess):
+    """Drops the session and its server-side cart."""
+    if 'cart_id' in sess:
+        cart_store.clear(sess['cart_id'])
+    sess.clear()
+
+def _to_cents(price):
+    """Converts a price to integer cents."""
+    return int(round(float(price) * 100))
+
+def _cart_id(sess, create=False):
+    """Returns the session's cart handle, moving any legacy cookie cart into the cart store."""
+    cart_id = sess.get('cart_id')
+    legacy = sess.pop('cart', None)
+    if cart_id is None and (create or legacy):
+        cart_id = sess['cart_id'] = secrets.token_urlsafe(16)
+    for item in legacy or ():
+        cart_store.add(cart_id, int(item['id']), _to_cents(item['price']))
+    return cart_id
+
 @app.route('/add_to_cart', methods=['POST'])
 def add_to_cart():
-    """Adds an item to the user's session-based cart."""
-    if 'cart' not in session:
-        session['cart'] = []
-
-    data = request.get_json()
-    session['cart'].append({
-        'id': data['item_id'],
-        'name': data['name'],
-        'price': float(data['price'])  # Ensure price is float
-    })
-    session.modified = True  # Ensure session updates
-    return jsonify({"message": "Item added to cart"}), 200
+    """Adds an item to the user's server-side cart."""
+    return _add_to_cart(session, request.get_json(silent=True), menu_catalog.get())
+
+def _add_to_cart(sess, data, menu):
+    """Adds an item to a session's cart, pricing it from `menu` (None if the catalog is unavailable)."""
+    data = data if isinstance(data, dict) else {}
+    try:
+        item_id = int(data.get('item_id'))
+    except (TypeError, ValueError):
+        return {'error': 'Invalid menu item'}, 400
+
+    item = menu.get(item_id) if menu else None
+    if item is None and menu:
+        return {'error': 'Invalid menu item'}, 400
+
+    # Price from the catalog; the client's price is only used if the menu is unavailable,
+    # and place_order re-prices every item server-side regardless.
+    try:
+        price = _to_cents(item['price'] if item else data.get('price'))
+    except (TypeError, ValueError):
+        return {'error': 'Invalid price'}, 400
+    cart_store.add(_cart_id(sess, create=True), item_id, price)
+    return {"message": "Item added to cart"}, 200
 
 @app.route('/remove_from_cart', methods=['POST'])
 def remove_from_cart():
     """Removes an item from the cart."""
-    if 'cart' in session:
-        session['cart'] = [item for item in session['cart'] if item['id'] != request.json['item_id']]
-        session.modified = True  # Ensure session updates
-    return jsonify({"message": "Item removed from cart"}), 200
+    return _remove_from_cart(session, request.get_json(silent=True))
+
+def _remove_from_cart(sess, data):
+    """Removes an item from a session's cart; ids not in it are ignored."""
+    data = data if isinstance(data, dict) else {}
+    if 'item_id' not in data:
+        return {'error': 'Invalid menu item'}, 400
+    cart_id = _cart_id(sess)
+    if cart_id is not None:
+        try:
+            cart_store.remove(cart_id, int(data['item_id']))
+        except (TypeError, ValueError):
+            pass  # not a menu item id, so it cannot be in the cart
+    return {"message": "Item removed from cart"}, 200
 
 @app.route('/cart_total', methods=['GET'])
 def cart_total():
-    """Calculates the total cart price."""
-    total = sum(item['price'] for item in session.get('cart', []))
-    return jsonify({"total": total}), 200
+    """Returns the running cart total."""
+    return _cart_total(session)
+
+def _cart_total(sess):
+    """Returns a session's cart total in dollars."""
+    cart_id = _cart_id(sess)
+    total = cart_store.total(cart_id) if cart_id is not None else 0
+    return {"total": total / 100}, 200
 
 @app.route('/place_order', methods=['POST'])
 def place_order():
@@ -131,60 +615,443 @@ def place_order():
         return jsonify({'error': 'Unauthorized access'}), 401
 
     user_id = session['user_id']
-    data = request.get_json()
-    location = data['location']
-    cart_items = data['cart_items']
+    idempotency_key = request.headers.get('Idempotency-Key')
+    location, quantities = _order_request(request.get_json(silent=True), idempotency_key)
 
-    if location not in LOCATION_TIMES:
-        return jsonify({'error': 'Invalid location'}), 400
+    menu = menu_catalog.get()
+    if menu is None:
+        return "Database connection failed", 500
+
+    if idempotency_key is None:
+        return _submit_order(user_id, location, quantities, menu)
+    # Retries carrying the same key get the first response back instead of a second order
+    replay = _claim_order_key(user_id, idempotency_key, location, quantities)
+    if replay is not None:
+        return replay
+    try:
+        response = app.make_response(_submit_order(user_id, location, quantities, menu, idempotency_key))
+    except Exception:
+        idempotent_orders.release(user_id, idempotency_key)
+        raise
+    _settle_order_key(user_id, idempotency_key, response.status_code, response.get_json())
+    return response
+
+# The helpers below are shared with asgi_app.py, so both front ends validate, price,
+# write and announce orders the same way.  They return (body, status[, headers]).
+
+class OrderRejected(Exception):
+    """An order request that cannot be placed as sent; answered with `status`."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+@app.errorhandler(OrderRejected)
+def _order_rejected(err):
+    return {'error': err.message}, err.status
+
+def _order_request(data, idempotency_key):
+    """Validates a /place_order body; returns (location, {item_id: quantity}) or raises OrderRejected."""
+    data = data if isinstance(data, dict) else {}
+    location = data.get('location')
+    if not isinstance(location, str) or location not in LOCATION_TIMES:
+        raise OrderRejected('Invalid location')
+
+    cart_items = data.get('cart_items')
+    if not cart_items:
+        raise OrderRejected('Cart is empty')
+
+    try:
+        quantities = count_items(cart_items)
+    except (TypeError, ValueError):
+        raise OrderRejected('Invalid menu item')
+
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= KEY_MAX_LENGTH:
+        raise OrderRejected(f'Idempotency-Key must be 1-{KEY_MAX_LENGTH} characters')
+    return location, quantities
+
+def _claim_order_key(user_id, key, location, quantities):
+    """Claims an Idempotency-Key for a new order; returns the response to send instead, or None to place it."""
+    digest = fingerprint({'location': location, 'items': sorted(quantities.items())})
+    state, stored = idempotent_orders.claim(user_id, key, digest)
+    if state == REPLAY:
+        IDEMPOTENT_REPLAYS.inc(source='cache')
+        return _replayed(*stored)
+    if state == IN_PROGRESS:
+        return {'error': 'This order is still being placed.'}, 409
+    if state == MISMATCH:
+        return {'error': 'Idempotency-Key was already used for a different order.'}, 422
+    return None
+
+def _settle_order_key(user_id, key, status, body):
+    """Keeps a successful response for replay, or frees the key so the client can retry."""
+    if status < 300:
+        idempotent_orders.complete(user_id, key, status, body)
+    else:
+        idempotent_orders.release(user_id, key)
+
+def _replayed(status, body):
+    """The stored response of an already placed order, marked as a replay."""
+    return body, status, {'Idempotent-Replayed': 'true'}
+
+# Finds the order a user already placed under an Idempotency-Key
+KEYED_ORDER = "SELECT order_id, estimated_delivery_time FROM orders WHERE user_id = %s AND idempotency_key = %s"
+
+def _keyed_replay(row):
+    """Replays a KEYED_ORDER row, or None if there was none."""
+    if row is None:
+        return None
+    IDEMPOTENT_REPLAYS.inc(source='database')
+    return _replayed(200, {'order_id': key_to_text(row['order_id']), 'delivery_time': row['estimated_delivery_time']})
+
+def _new_order(user_id, location, quantities, idempotency_key=None):
+    """Builds an order for a validated cart and books it onto a courier run."""
+    order_id = order_ids.new(user_id)
+    num_items = sum(quantities.values())
+    # Kitchen estimate, pushed back to the departure of the courier run the order joins
+    delivery_time = dispatcher.assign(order_id, location, eta_engine.estimate(location, num_items))
+    return {
+        'order_id': order_id,
+        'user_id': user_id,
+        'location': location,
+        'delivery_time': delivery_time,
+        'eta_baseline': eta_engine.baseline(location, num_items),
+        'items': quantities,
+        'idempotency_key': idempotency_key
+    }
+
+def _price_order(order, prices):
+    """Totals an order from {item_id: unit price}.
+
+    An id without a price is not on the menu and would fail the order_items
+    foreign key, so the order is taken off its run and rejected instead.
+    """
+    if any(item_id not in prices for item_id in order['items']):
+        dispatcher.discard(order['order_id'])
+        raise OrderRejected('Invalid menu item')
+    order['prices'] = {item_id: prices[item_id] for item_id in order['items']}
+    order['total_price'] = order_total(prices, order['items'])
+
+def _order_statements(order, row_id, dialect):
+    """The order_items INSERT and sales rollup upserts that follow an order's own INSERT."""
+    return [order_items_statement(order_item_rows([order], {order['order_id']: row_id})),
+            *rollup_statements(dialect, [order])]
+
+def _order_placed(order):
+    """Bookkeeping once an order is committed; returns the response body."""
+    ORDERS_PLACED.inc(location=order['location'])
+    eta_engine.order_placed(order['location'])
+    publish_order(order, PERSISTED)
+    return {'order_id': order['order_id'], 'delivery_time': order['delivery_time']}
+
+def _order_failed(order, err):
+    """Takes an order that could not be written off its run and answers 500."""
+    dispatcher.discard(order['order_id'])
+    logger.error("Order placement failed: %s", err)
+    return {'error': 'Order placement failed.'}, 500
+
+def _submit_order(user_id, location, quantities, menu, idempotency_key=None):
+    """Places a validated cart, synchronously or through the write-behind queue."""
+    order = _new_order(user_id, location, quantities, idempotency_key)
+    if app.config['ORDER_WRITE_BEHIND']:
+        return _enqueue_order(order, menu)
 
     conn = get_db_connection()
     if conn is None:
+        dispatcher.discard(order['order_id'])
         return "Database connection failed", 500
 
-    cursor = conn.cursor(dictionary=True)
+    timer = PhaseTimer()
+    with closing(conn), closing(conn.cursor(dictionary=True)) as cursor:
+        try:
+            # Price the whole cart in one lookup
+            with timer.phase('price'):
+                _price_order(order, price_items(menu, cursor, quantities))
+
+            # Insert the order, its items and its sales rollups, then commit once
+            with timer.phase('insert'):
+                cursor.execute(*orders_statement([order]))
+                for statement in _order_statements(order, cursor.lastrowid, get_db_engine().name):
+                    cursor.execute(*statement)
+
+            with timer.phase('commit'):
+                conn.commit()
+
+        except DB_ERRORS as err:
+            conn.rollback()
+            if idempotency_key is not None and isinstance(err, INTEGRITY_ERRORS):
+                # Placed earlier by another worker, or since evicted from the cache
+                cursor.execute(KEYED_ORDER, (user_id, idempotency_key))
+                replay = _keyed_replay(cursor.fetchone())
+                if replay is not None:
+                    dispatcher.discard(order['order_id'])
+                    return replay
+            return _order_failed(order, err)
+
+    return _order_placed(order), 200, {'Server-Timing': timer.server_timing()}
+
+def _enqueue_order(order, menu):
+    """Prices an order from the menu snapshot and hands it to the write-behind queue."""
+    _price_order(order, split_priced(menu, order['items'])[0])
+
+    if not get_order_writer().submit(order):
+        dispatcher.discard(order['order_id'])
+        return {'error': 'Too many pending orders, please retry.'}, 503
+    ORDERS_PLACED.inc(location=order['location'])
+    eta_engine.order_placed(order['location'])
+    return {
+        'order_id': order['order_id'],
+        'delivery_time': order['delivery_time'],
+        'status': QUEUED
+    }, 202
+
+@app.route('/bulk_orders', methods=['POST'])
+def bulk_orders():
+    """Places a batch of orders (e.g. for a campus event) in one transaction.
+
+    Each entry has its own location and cart_items.  Invalid entries are
+    reported per order and skipped; the rest are priced in one lookup and
+    written with multi-row INSERTs and a single commit.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized access'}), 401
+
+    user_id = session['user_id']
+    data = request.get_json(silent=True) or {}
+    entries = data.get('orders')
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'error': 'No orders supplied'}), 400
+    if len(entries) > app.config['BULK_ORDER_MAX']:
+        return jsonify({'error': f"At most {app.config['BULK_ORDER_MAX']} orders per request"}), 413
+
+    menu = menu_catalog.get()
+    if menu is None:
+        return "Database connection failed", 500
+
+    results = [None] * len(entries)
+    pending = []
+    for index, entry in enumerate(entries):
+        entry = entry if isinstance(entry, dict) else {}
+        location = entry.get('location')
+        if location not in LOCATION_TIMES:
+            results[index] = {'index': index, 'error': 'Invalid location'}
+            continue
+        if not entry.get('cart_items'):
+            results[index] = {'index': index, 'error': 'Cart is empty'}
+            continue
+        try:
+            quantities = count_items(entry['cart_items'])
+        except (TypeError, ValueError):
+            results[index] = {'index': index, 'error': 'Invalid menu item'}
+            continue
+        pending.append((index, location, quantities))
+
+    # Quote and book every entry before borrowing a connection: the ETA model's loader
+    # borrows one too, and on SQLite that is this thread's connection, deadline and all
+    booked = []
+    for index, location, quantities in pending:
+        booked.append((index, _new_order(user_id, location, quantities)))
+        # Registering as we go queues each order behind the earlier ones in the batch
+        eta_engine.order_placed(location)
+
+    conn = get_db_connection()
+    if conn is None:
+        _discard_orders(order for _, order in booked)
+        return "Database connection failed", 500
+
+    orders = []
+    with closing(conn), closing(conn.cursor(dictionary=True)) as cursor:
+        try:
+            # Price every cart in the batch with one lookup
+            prices = price_items(menu, cursor, {item_id for _, _, q in pending for item_id in q})
+            for index, order in booked:
+                try:
+                    _price_order(order, prices)
+                except OrderRejected as err:
+                    eta_engine.discard(order['location'])
+                    results[index] = {'index': index, 'error': err.message}
+                    continue
+                orders.append(order)
+                results[index] = {'index': index, 'order_id': order['order_id']}
+
+            if orders:
+                insert_orders(cursor, orders)
+                record_sales(cursor, orders)
+                conn.commit()
+
+        except DB_ERRORS as err:
+            logger.error("Bulk order placement failed: %s", err, extra={'orders': len(orders)})
+            conn.rollback()
+            # Rejected entries are already off the queue and their runs
+            _discard_orders(order for index, order in booked if 'error' not in (results[index] or {}))
+            return jsonify({'error': 'Order placement failed.'}), 500
+
+    for order in orders:
+        ORDERS_PLACED.inc(location=order['location'])
+        publish_order(order, PERSISTED)
+    delivery_times = {order['order_id']: order['delivery_time'] for order in orders}
+    for result in results:
+        if 'order_id' in result:
+            result['delivery_time'] = delivery_times[result['order_id']]
+
+    status = 200 if orders else 400
+    return jsonify({'placed': len(orders), 'failed': len(entries) - len(orders), 'orders': results}), status
+
+def _discard_orders(orders):
+    """Takes booked orders that were never written out of the ETA queue and off their runs."""
+    for order in orders:
+        eta_engine.discard(order['location'])
+        dispatcher.discard(order['order_id'])
+
+@app.route('/order_status/<order_id>')
+def order_status(order_id):
+    """Reports whether an order is queued, persisted or failed."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized access'}), 401
+
+    user_id = session['user_id']
+    status = _order_writer.status(order_id, user_id) if _order_writer else None
+    if status is None:
+        try:
+            key = text_to_key(order_id)
+        except ValueError:
+            return jsonify({'error': 'Order not found'}), 404
+        conn = get_db_connection()
+        if conn is None:
+            return "Database connection failed", 500
+        with closing(conn), closing(conn.cursor(dictionary=True)) as cursor:
+            cursor.execute("SELECT id FROM orders WHERE order_id = %s AND user_id = %s", (key, user_id))
+            if cursor.fetchone() is None:
+                return jsonify({'error': 'Order not found'}), 404
+        status = PERSISTED
+
+    return jsonify({'order_id': order_id, 'status': status})
+
+@app.route('/orders')
+def order_history():
+    """Lists the user's orders newest first, one keyset-paginated page at a time."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized access'}), 401
 
     try:
-        # Calculate total price
-        total_price = 0
-        for item_id in cart_items:
-            cursor.execute("SELECT price FROM menu_items WHERE id = %s", (item_id,))
-            item = cursor.fetchone()
-            if item:
-                total_price += float(item['price'])
-
-        # Generate unique order ID
-        order_id = f"ORD-{uuid.uuid4().hex[:8]}-{user_id}"
-
-        # Insert into orders table
-        cursor.execute(
-            "INSERT INTO orders (user_id, location, total_price, order_id) VALUES (%s, %s, %s, %s)",
-            (user_id, location, total_price, order_id)
-        )
-        conn.commit()
-        order_id_db = cursor.lastrowid
+        limit = int(request.args.get('limit', app.config['ORDER_PAGE_SIZE']))
+        after = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid pagination parameters'}), 400
+    limit = max(1, min(limit, app.config['ORDER_PAGE_MAX']))
 
-        # Insert into order_items table
-        for item_id in cart_items:
-            cursor.execute("INSERT INTO order_items (order_id, menu_item_id) VALUES (%s, %s)", (order_id_db, item_id))
+    conn = get_db_connection()
+    if conn is None:
+        return "Database connection failed", 500
 
-        conn.commit()
+    with closing(conn), closing(conn.cursor(dictionary=True)) as cursor:
+        rows, next_cursor = fetch_order_page(cursor, session['user_id'], limit, after)
+        items = fetch_order_items(cursor, [row['id'] for row in rows])
 
-        # Calculate and update estimated delivery time
-        delivery_time = calculate_delivery_time(location, len(cart_items))
-        cursor.execute("UPDATE orders SET estimated_delivery_time = %s WHERE id = %s", (delivery_time, order_id_db))
-        conn.commit()
+    return jsonify({
+        'orders': [order_summary(row, items[row['id']]) for row in rows],
+        'next_cursor': next_cursor
+    })
 
-        return jsonify({'order_id': order_id, 'delivery_time': delivery_time})
+@app.route('/orders/<order_id>')
+def order_detail(order_id):
+    """Returns one of the user's orders with its line items for tracking."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized access'}), 401
+    try:
+        key = text_to_key(order_id)
+    except ValueError:
+        return jsonify({'error': 'Order not found'}), 404
 
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-        conn.rollback()
-        return jsonify({'error': 'Order placement failed.'}), 500
+    conn = get_db_connection()
+    if conn is None:
+        return "Database connection failed", 500
 
-    finally:
-        cursor.close()
-        conn.close()
+    with closing(conn), closing(conn.cursor(dictionary=True)) as cursor:
+        cursor.execute(f"SELECT {ORDER_COLUMNS} FROM orders WHERE order_id = %s AND user_id = %s",
+                       (key, session['user_id']))
+        row = cursor.fetchone()
+        if row is None:
+            return jsonify({'error': 'Order not found'}), 404
+        items = fetch_order_items(cursor, [row['id']])
+
+    return jsonify(order_summary(row, items[row['id']]))
+
+@app.route('/reports/sales')
+def sales_report():
+    """Sales by location or by menu item over a date range, read only from the rollups."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized access'}), 401
+    if session['user_id'] not in app.config['REPORT_USER_IDS']:
+        return jsonify({'error': 'Forbidden'}), 403
+
+    by = request.args.get('by', 'location')
+    try:
+        # Rollup buckets are UTC
+        end = date.fromisoformat(request.args['end']) if 'end' in request.args else datetime.now(timezone.utc).date()
+        start = date.fromisoformat(request.args['start']) if 'start' in request.args else end - timedelta(days=6)
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    if by not in ('location', 'hour', 'item') or start > end:
+        return jsonify({'error': 'Invalid report parameters'}), 400
+
+    conn = get_db_connection()
+    if conn is None:
+        return "Database connection failed", 500
+
+    # Half-open range [start, end + 1 day) over the bucket columns
+    since, until = start.isoformat(), (end + timedelta(days=1)).isoformat()
+    with closing(conn), closing(conn.cursor(dictionary=True)) as cursor:
+        if by == 'location':
+            cursor.execute(
+                "SELECT location, SUM(order_count) AS orders, SUM(item_count) AS items, SUM(revenue) AS revenue "
+                "FROM sales_hourly_location WHERE bucket_hour >= %s AND bucket_hour < %s "
+                "GROUP BY location ORDER BY revenue DESC", (since, until))
+        elif by == 'hour':
+            cursor.execute(
+                "SELECT bucket_hour AS hour, location, order_count AS orders, item_count AS items, revenue "
+                "FROM sales_hourly_location WHERE bucket_hour >= %s AND bucket_hour < %s "
+                "ORDER BY bucket_hour, location", (since, until))
+        else:
+            cursor.execute(
+                "SELECT menu_item_id, SUM(quantity) AS quantity, SUM(revenue) AS revenue "
+                "FROM sales_daily_item WHERE bucket_day >= %s AND bucket_day < %s "
+                "GROUP BY menu_item_id ORDER BY revenue DESC", (since, until))
+        rows = cursor.fetchall()
+
+    menu = menu_catalog.get() if by == 'item' else None
+    report = []
+    for row in rows:
+        entry = dict(row)
+        entry['revenue'] = float(row['revenue'])
+        for key in ('orders', 'items', 'quantity'):
+            if key in entry:
+                entry[key] = int(entry[key])  # MySQL SUM() yields Decimal
+        if by == 'hour':
+            entry['hour'] = str(row['hour'])
+        if menu is not None:
+            item = menu.get(row['menu_item_id'])
+            entry['name'] = item['name'] if item else None
+        report.append(entry)
+    return jsonify({'by': by, 'start': start.isoformat(), 'end': end.isoformat(), 'rows': report})
+
+@app.cli.command('backfill-rollups')
+def backfill_rollups_command():
+    """Rebuild the sales rollup tables from existing orders; stop order writes first.
+
+    Run it only while no orders are being placed (workers and the
+    write-behind queue stopped).  An order committed during the rebuild can
+    be counted both by its own rollup update and by the rebuild scan.
+    """
+    done = backfill(get_db_connection, get_db_engine().name, app.config['ROLLUP_BACKFILL_CHUNK'], log=click.echo)
+    click.echo(f"Rebuilt sales rollups from {done} orders")
+
+@app.cli.command('migrate-order-ids')
+def migrate_order_ids_command():
+    """Convert stored order ids to the compact 16-byte key form."""
+    done = migrate_order_ids(get_db_connection, get_db_engine().name, log=click.echo)
+    click.echo(f"Converted {done} order ids")
 
 def calculate_delivery_time(location, num_items):
     """Calculates estimated delivery time based on location and number of items."""
@@ -195,12 +1062,332 @@ def calculate_delivery_time(location, num_items):
         base_time += 10
     return base_time
 
+def _load_eta_state(opened_after, delivered_after):
+    """Outstanding orders per location and recent deliveries for the ETA model; None if the DB is unreachable."""
+    conn = get_db_connection()
+    if conn is None:
+        return None
+    with closing(conn), closing(conn.cursor(dictionary=True)) as cursor:
+        try:
+            cursor.execute("SELECT location, COUNT(*) AS outstanding FROM orders "
+                           "WHERE delivered_at IS NULL AND order_date >= %s GROUP BY location", (opened_after,))
+            outstanding = {row['location']: row['outstanding'] for row in cursor.fetchall()}
+            # Lateness is measured against the uncorrected baseline; older rows only have the quoted ETA
+            cursor.execute("SELECT location, order_date, delivered_at, "
+                           "COALESCE(eta_baseline, estimated_delivery_time) AS baseline FROM orders "
+                           "WHERE delivered_at >= %s", (delivered_after,))
+            completions = [(row['location'], (utc_epoch(row['delivered_at']) - utc_epoch(row['order_date'])) / 60,
+                            row['baseline'] or 0)
+                           for row in cursor.fetchall()]
+        except DB_ERRORS as err:
+            logger.error("ETA state could not be loaded: %s", err)
+            return None
+    return outstanding, completions
+
+# Queue depth and delivery history come from the orders table, so every worker quotes from the same state
+eta_engine = EtaEngine(
+    calculate_delivery_time,
+    _load_eta_state,
+    window=app.config['ETA_WINDOW'],
+    min_throughput=app.config['ETA_MIN_THROUGHPUT'],
+    max_age=app.config['ETA_MAX_AGE'],
+    refresh=app.config['ETA_REFRESH']
+)
+
+@app.route('/orders/<order_id>/delivered', methods=['POST'])
+def order_delivered(order_id):
+    """Records that an order was handed over (couriers only); the ETA model learns from it."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized access'}), 401
+    if session['user_id'] not in app.config['COURIER_USER_IDS']:
+        return jsonify({'error': 'Forbidden'}), 403
+    try:
+        key = text_to_key(order_id)
+    except ValueError:
+        return jsonify({'error': 'Order not found'}), 404
+
+    conn = get_db_connection()
+    if conn is None:
+        return "Database connection failed", 500
+    now = time.time()
+    with closing(conn), closing(conn.cursor(dictionary=True)) as cursor:
+        cursor.execute("SELECT user_id, location, order_date FROM orders WHERE order_id = %s", (key,))
+        order = cursor.fetchone()
+        if order is None:
+            return jsonify({'error': 'Order not found'}), 404
+        # Only the first report counts, however many couriers or retries send one
+        cursor.execute("UPDATE orders SET delivered_at = %s WHERE order_id = %s AND delivered_at IS NULL",
+                       (utc_stamp(now), key))
+        if cursor.rowcount == 0:
+            conn.rollback()
+            return jsonify({'error': 'Order already delivered'}), 409
+        conn.commit()
+
+    eta_engine.invalidate()
+    order_events.publish(order['user_id'], {'order_id': order_id, 'status': DELIVERED})
+    _publish_etas(order['location'])
+    minutes = (now - utc_epoch(order['order_date'])) / 60
+    return jsonify({'order_id': order_id, 'fulfilment_minutes': round(minutes, 1)})
+
+def _open_orders(column, value, delivered_after=None):
+    """Undelivered orders with `column` (user_id or location) = value, with their current ETA; None if the DB is down.
+
+    With `delivered_after`, orders delivered since then are included too, with 'delivered' set and no ETA.
+    """
+    conn = get_db_connection()
+    if conn is None:
+        return None
+    params = [value, utc_stamp(time.time() - app.config['ETA_MAX_AGE'])]
+    delivered = "delivered_at IS NULL"
+    if delivered_after is not None:
+        delivered = "(delivered_at IS NULL OR delivered_at >= %s)"
+        params.append(delivered_after)
+    with closing(conn), closing(conn.cursor(dictionary=True)) as cursor:
+        cursor.execute(f"SELECT order_id, user_id, location, order_date, "
+                       f"COALESCE(eta_baseline, estimated_delivery_time) AS baseline, delivered_at "
+                       f"FROM orders WHERE {column} = %s AND order_date >= %s AND {delivered} ORDER BY order_date, id",
+                       params)
+        rows = cursor.fetchall()
+    for row in rows:
+        row['order_id'] = key_to_text(row['order_id'])
+    # Every open order's ETA in one pass over the current model
+    etas = eta_engine.recompute((row['order_id'], row['location'], utc_epoch(row['order_date']), row['baseline'] or 0)
+                                for row in rows if row['delivered_at'] is None)
+    return [{'order_id': row['order_id'], 'user_id': row['user_id'], 'delivered': True}
+            if row['delivered_at'] is not None else
+            {'order_id': row['order_id'], 'user_id': row['user_id'], 'delivered': False,
+             'eta_minutes': _delivery_eta(row['order_id'], etas[row['order_id']])}
+            for row in rows]
+
+def _order_updates(user_id, delivered_after=None):
+    """A user's open orders (and those delivered since `delivered_after`) as stream events, [] if the DB is down."""
+    return [{'order_id': order['order_id'], 'status': DELIVERED} if order['delivered'] else
+            {'order_id': order['order_id'], 'status': PERSISTED, 'eta_minutes': order['eta_minutes']}
+            for order in _open_orders('user_id', user_id, delivered_after) or ()]
+
+def _publish_etas(location):
+    """Pushes the updated ETA of every open order at a location to its owner, if anyone is streaming."""
+    if not order_events.active():
+        return
+    for order in _open_orders('location', location) or ():
+        order_events.publish(order['user_id'], {'order_id': order['order_id'], 'eta_minutes': order['eta_minutes']})
+
+def _delivery_eta(order_id, minutes):
+    """An open order's ETA from the kitchen model, never earlier than its courier run can deliver it."""
+    run_eta = dispatcher.delivery_eta(order_id)
+    return minutes if run_eta is None else max(minutes, run_eta)
+
+@app.route('/orders/stream')
+def order_stream():
+    """Server-Sent Events feed of status and ETA changes for the user's orders.
+
+    Opens with the user's open orders, then pushes each change as an
+    `order` event: at once for changes this worker makes, and within
+    ORDER_STREAM_POLL seconds, read from the orders table, for those made
+    by other workers.  A client that falls too far behind gets a `resync`
+    event and should reload; streams end after ORDER_STREAM_MAX_AGE and
+    the browser reconnects on its own.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized access'}), 401
+
+    user_id = session['user_id']
+    try:
+        subscription = order_events.subscribe(user_id)
+    except StreamLimitReached:
+        return _service_unavailable('streams', app.config['ADMISSION_RETRY_AFTER'])
+
+    try:
+        # Orders still in the write-behind queue are not in the snapshot; their 'persisted' event follows
+        snapshot = _order_updates(user_id)
+    except Exception:
+        order_events.unsubscribe(subscription)
+        raise
+
+    response = Response(_stream_events(subscription, snapshot), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+    # Also runs when the client leaves before the first event, which a generator's finally would miss
+    response.call_on_close(lambda: order_events.unsubscribe(subscription))
+    return response
+
+def _stream_events(subscription, snapshot):
+    # Deliveries recorded from a second before the stream opened are reported, so none falls in between
+    delivered_after = utc_stamp(time.time() - 1)
+    opened = time.monotonic()
+    closes_at = opened + app.config['ORDER_STREAM_MAX_AGE']
+    next_poll = opened + app.config['ORDER_STREAM_POLL']
+    last_write = opened
+    sent = {}  # order_id -> fields already sent
+    yield f"retry: {app.config['ORDER_STREAM_RETRY']}\n\n"
+    for event in unsent(sent, snapshot):
+        yield format_event('order', event)
+    while True:
+        now = time.monotonic()
+        if now >= closes_at:
+            return
+        wait = min(closes_at, next_poll, last_write + app.config['ORDER_STREAM_HEARTBEAT']) - now
+        events = subscription.get(max(0, wait))
+        if events is None:
+            if subscription.overflowed:
+                yield format_event('resync', {})
+            return
+        if time.monotonic() >= next_poll:
+            # Other workers' changes only reach this stream through the orders table
+            events = events + _order_updates(subscription.user_id, delivered_after)
+            next_poll = time.monotonic() + app.config['ORDER_STREAM_POLL']
+        fresh = unsent(sent, events)
+        for event in fresh:
+            yield format_event('order', event)
+        if fresh:
+            last_write = time.monotonic()
+        elif time.monotonic() - last_write >= app.config['ORDER_STREAM_HEARTBEAT']:
+            yield HEARTBEAT
+            last_write = time.monotonic()
+
+@app.route('/eta/state')
+def eta_state():
+    """Exposes the per-location ETA model for inspection."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized access'}), 401
+    return jsonify(eta_engine.state())
+
+def _make_dispatcher():
+    """Builds the configured courier run scheduler."""
+    if app.config['DISPATCH_BACKEND'] == 'shared':
+        return SharedDispatchScheduler(parse_address(app.config['CART_STORE_ADDRESS']),
+                                       app.config['CART_STORE_AUTHKEY'].encode(), LOCATION_TIMES, 5,
+                                       max_wait=app.config['DISPATCH_MAX_WAIT'],
+                                       max_batch=app.config['DISPATCH_MAX_BATCH'])
+    return DispatchScheduler(
+        lambda location: LOCATION_TIMES.get(location, 5),
+        max_wait=app.config['DISPATCH_MAX_WAIT'],
+        max_batch=app.config['DISPATCH_MAX_BATCH']
+    )
+
+# Groups orders per location into courier runs; with several workers one scheduler in the cart server holds them all
+dispatcher = _make_dispatcher()
+
+@app.route('/dispatch/runs')
+def dispatch_runs():
+    """Lists current courier runs, optionally for one ?location= (couriers only)."""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized access'}), 401
+    if session['user_id'] not in app.config['COURIER_USER_IDS']:
+        return jsonify({'error': 'Forbidden'}), 403
+    location = request.args.get('location')
+    if location is not None and location not in LOCATION_TIMES:
+        return jsonify({'error': 'Invalid location'}), 400
+    return jsonify({'runs': dispatcher.runs(location)})
+
 @app.route('/get_location_image/<location>')
 def get_location_image(location):
     """Returns the image URL for a given location."""
-    filename = LOCATION_IMAGES.get(location, "default.jpeg")
-    return jsonify({'image_url': url_for('static', filename=filename)})
+    return jsonify({'image_url': LOCATION_IMAGE_URLS.get(location) or assets.url("default.jpeg")})
+
+@app.route('/assets/<path:filename>')
+def fingerprinted_asset(filename):
+    """Serves a content-hashed static file with far-future immutable caching."""
+    asset = assets.lookup(filename)
+    if asset is None:
+        abort(404)
+
+    encoding = negotiate(request.accept_encodings, tuple(asset.variants))
+    if encoding:
+        response = Response(asset.variants[encoding], mimetype=asset.mimetype)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_file(asset.path, mimetype=asset.mimetype)
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+    return response
+
+def _warm_database():
+    """Open the pool's first connections and run a trivial query on each."""
+    conns = []
+    try:
+        for _ in range(min(max(1, app.config['WARMUP_DB_CONNECTIONS']), app.config['DB_POOL_MAX_SIZE'])):
+            conn = get_db_connection()
+            if conn is None:
+                raise RuntimeError("database unreachable")
+            conns.append(conn)
+            with closing(conn.cursor()) as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+    finally:
+        for conn in conns:
+            conn.close()
+
+# Compiled once per process and kept by Jinja's template cache
+WARMUP_TEMPLATES = ('login.html', 'index.html', '_menu.html')
+
+def _warm_templates():
+    for name in WARMUP_TEMPLATES:
+        app.jinja_env.get_template(name)
+
+def _warm_menu():
+    """Load the menu catalog and render the cached menu fragment."""
+    menu = menu_catalog.get()
+    if menu is None:
+        raise RuntimeError("menu_items could not be loaded")
+    _menu_fragment(menu)
+
+def _warm_cart_store():
+    """Reach the cart server (carts and courier runs), which gunicorn may still be starting."""
+    cart_store.count()
+    dispatcher.stats()
+
+# Run in each worker before it takes traffic; /readyz answers 503 until every phase has succeeded
+WARMUP_PHASES = [('database', _warm_database), ('templates', _warm_templates), ('menu', _warm_menu)]
+if 'shared' in (app.config['CART_BACKEND'], app.config['DISPATCH_BACKEND']):
+    WARMUP_PHASES.append(('cart_store', _warm_cart_store))
+warmup = Warmup(WARMUP_PHASES)
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: warm-up has finished and the database answers a ping."""
+    if not warmup.ready:
+        warmup.start()  # a server that never ran the warm-up gets it on the first probe
+        return jsonify({'status': 'warming', 'phases': warmup.status()}), 503
+
+    g.deadline = time.monotonic() + app.config['READINESS_TIMEOUT']
+    try:
+        conn = get_db_connection()
+        if conn is None:
+            return jsonify({'status': 'database unavailable'}), 503
+        with closing(conn), closing(conn.cursor()) as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    except (*DB_ERRORS, DeadlineExceeded) as err:
+        logger.warning("Readiness check failed: %s", err)
+        return jsonify({'status': 'database unavailable'}), 503
+    return jsonify({'status': 'ready', 'phases': warmup.status()})
+
+def reset_after_fork():
+    """Drops per-process state a forked worker inherited from a preloading parent."""
+    global _db_engine, _order_writer
+    # Inherited sockets belong to the parent; forget them rather than closing them.
+    _db_engine = None
+    _order_writer = None
+    order_ids.reseed()
+    log_pipeline.after_fork()
+    warmup.reset()
+
+def shutdown(timeout=30):
+    """Drains queued orders and releases database connections before exit."""
+    order_events.close()
+    if _order_writer is not None:
+        _order_writer.stop(timeout)
+    if _db_engine is not None:
+        _db_engine.close()
+    log_pipeline.stop()
 
 if __name__ == '__main__':
     app.config['TEMPLATES_AUTO_RELOAD'] = True
+    warmup.start()
     app.run(host='0.0.0.0', port=5000, debug=True)  # ✅ Fixed binding for Docker
@@ -0,0 +1,313 @@
+"""Optional async (ASGI) serving mode for the SCU Food Delivery backend.
+
+login, index, logout, place_order and the cart endpoints run as coroutines
+on a Quart app backed by an aiomysql connection pool, so requests waiting
+on MySQL share one event loop instead of each holding a thread.  Every
+other route is passed through to the regular Flask app, which keeps its
+own pool.  Sessions use the same signed cookie, so the two halves agree
+on who is logged in.
+
+    pip install -r requirements-asgi.txt
+    uvicorn asgi_app:application --host 0.0.0.0 --port 5000 --workers 4
+
+Requires DB_ENGINE=mysql.  Validation, pricing, idempotency and order
+events are app.py's own helpers, so both halves behave alike; only the
+database round trips differ.  Admission control has the same route
+classes, but the async routes wait for a slot on the event loop, with
+limits sized to the aiomysql pool rather than to server threads.  The ETA model, dispatch
+runs, caches and metrics are shared with app.py within each worker process.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import aiomysql
+from asgiref.wsgi import WsgiToAsgi
+from flask import Flask
+from quart import Quart, Response, g, has_request_context, redirect, render_template, request, session, url_for
+
+import app as sync_app
+from admission import AsyncAdmissionController, Overloaded
+from db_pool import DeadlineExceeded
+from menu_catalog import MenuCatalog
+from orders import PhaseTimer, menu_prices_statement, orders_statement, split_priced
+from user_cache import MISS
+
+# Errors meaning "the database said no" on the async path (including pool waits that time out).
+ASYNC_DB_ERRORS = (aiomysql.Error, asyncio.TimeoutError)
+
+logger = logging.getLogger(__name__)
+
+asgi = Quart(__name__)
+asgi.secret_key = sync_app.app.secret_key
+asgi.config.update({key: value for key, value in sync_app.app.config.items() if key not in Flask.default_config})
+asgi.jinja_env.globals['asset_url'] = sync_app.app.jinja_env.globals['asset_url']
+
+_pool = None
+_loop = None
+
+@asgi.before_serving
+async def open_pool():
+    """Creates the aiomysql pool on the serving event loop."""
+    global _pool, _loop
+    if asgi.config['DB_ENGINE'] != 'mysql':
+        raise RuntimeError("ASGI mode requires DB_ENGINE=mysql")
+    _loop = asyncio.get_running_loop()
+    _pool = await aiomysql.create_pool(
+        host=asgi.config['MYSQL_HOST'],
+        user=asgi.config['MYSQL_USER'],
+        password=asgi.config['MYSQL_PASSWORD'],
+        db=asgi.config['MYSQL_DB'],
+        minsize=asgi.config['DB_POOL_MIN_SIZE'],
+        maxsize=asgi.config['DB_POOL_MAX_SIZE'],
+        pool_recycle=int(asgi.config['DB_POOL_MAX_LIFETIME']),
+        init_command="SET time_zone = '+00:00'",
+        autocommit=True
+    )
+
+@asgi.after_serving
+async def close_pool():
+    """Closes every pooled connection on shutdown."""
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+
+# Orders may use every pooled connection, browsing one fewer
+admission = AsyncAdmissionController(
+    {'orders': asgi.config['DB_POOL_MAX_SIZE'], 'browse': max(1, asgi.config['DB_POOL_MAX_SIZE'] - 1)},
+    max_wait=asgi.config['ADMISSION_MAX_WAIT'],
+    retry_after=asgi.config['ADMISSION_RETRY_AFTER']
+)
+sync_app.metrics_registry.collector('asgi_admission', 'Async route admission occupancy.', lambda: admission.stats())
+
+@asgi.before_request
+async def _admit_request():
+    """Waits on the event loop for a slot of the route's admission class."""
+    if request.endpoint in sync_app.ADMISSION_EXEMPT:
+        return
+    g.deadline = time.monotonic() + asgi.config['REQUEST_DEADLINE']
+    route_class = sync_app.ROUTE_CLASSES.get(request.endpoint, 'browse')
+    await admission.admit(route_class, g.deadline)
+    g.admission_class = route_class
+
+@asgi.teardown_request
+async def _release_admission(exc):
+    route_class = g.pop('admission_class', None)
+    if route_class is not None:
+        admission.release(route_class)
+
+@asgi.errorhandler(Overloaded)
+async def _overloaded(err):
+    return sync_app._service_unavailable('overloaded', err.retry_after)
+
+@asgi.errorhandler(DeadlineExceeded)
+async def _deadline_exceeded(err):
+    return sync_app._service_unavailable('deadline', asgi.config['ADMISSION_RETRY_AFTER'])
+
+@asgi.errorhandler(sync_app.OrderRejected)
+async def _order_rejected(err):
+    return {'error': err.message}, err.status
+
+@asynccontextmanager
+async def db_cursor():
+    """Borrow a pooled connection and a dict cursor; anything left uncommitted is rolled back.
+
+    The wait for a connection is capped by the request deadline, like the Flask pool's.
+    """
+    start = time.perf_counter()
+    timeout = asgi.config['DB_POOL_TIMEOUT']
+    deadline = g.get('deadline') if has_request_context() else None
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("request deadline passed before a connection was requested")
+        timeout = min(timeout, remaining)
+    try:
+        conn = await asyncio.wait_for(_pool.acquire(), timeout)
+    except ASYNC_DB_ERRORS:
+        sync_app.DB_ACQUIRE_FAILURES.inc()
+        raise
+    finally:
+        sync_app.DB_ACQUIRE_DURATION.observe(time.perf_counter() - start)
+    try:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            yield conn, cursor
+    finally:
+        if conn.get_transaction_status():
+            await conn.rollback()
+        _pool.release(conn)
+
+@asgi.errorhandler(aiomysql.Error)
+@asgi.errorhandler(asyncio.TimeoutError)
+async def database_unavailable(err):
+    logger.error("Database connection error: %s", err)
+    return "Database connection failed", 500
+
+async def _fetch_menu_rows():
+    async with db_cursor() as (conn, cursor):
+        await cursor.execute("SELECT id, name, category, price FROM menu_items ORDER BY id")
+        return list(await cursor.fetchall())
+
+def _load_menu_items():
+    """Catalog loader; runs on a worker thread and waits for the query on the event loop."""
+    try:
+        return asyncio.run_coroutine_threadsafe(_fetch_menu_rows(), _loop).result()
+    except ASYNC_DB_ERRORS as err:
+        logger.error("Database connection error: %s", err)
+        return None
+
+menu_catalog = MenuCatalog(_load_menu_items, ttl=asgi.config['MENU_CACHE_TTL'])
+
+async def get_menu():
+    """Return the menu snapshot; only a stale catalog costs a trip off the event loop."""
+    menu = menu_catalog.peek()
+    if menu is None:
+        menu = await asyncio.to_thread(menu_catalog.get)
+    return menu
+
+@asgi.route('/', methods=['GET', 'POST'])
+async def login():
+    """Handles user login."""
+    error = None
+    if request.method == 'POST':
+        form = await request.form
+        scu_email = form['scu_email']
+        scu_id = form['scu_id']
+
+        user = sync_app.user_cache.get(scu_email, scu_id)
+        if user is MISS:
+            async with db_cursor() as (conn, cursor):
+                await cursor.execute(sync_app.USER_BY_EMAIL, (scu_email,))
+                row = await cursor.fetchone()
+            user = sync_app.user_cache.put(scu_email, row, scu_id)
+
+        error = sync_app._sign_in(session, user)
+        if error is None:
+            return redirect(url_for('index'))
+
+    return await render_template('login.html', error=error)
+
+@asgi.route('/index')
+async def index():
+    """Displays the main menu."""
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    menu = await get_menu()
+    if menu is None:
+        return "Database connection failed", 500
+
+    return await render_template('index.html', **sync_app._index_context(session, menu))
+
+@asgi.route('/logout')
+async def logout():
+    """Logs out the user and clears session."""
+    sync_app._sign_out(session)
+    return redirect(url_for('login'))
+
+@asgi.route('/add_to_cart', methods=['POST'])
+async def add_to_cart():
+    """Adds an item to the user's server-side cart."""
+    data = await request.get_json(silent=True)
+    return sync_app._add_to_cart(session, data, await get_menu())
+
+@asgi.route('/remove_from_cart', methods=['POST'])
+async def remove_from_cart():
+    """Removes an item from the cart."""
+    return sync_app._remove_from_cart(session, await request.get_json(silent=True))
+
+@asgi.route('/cart_total', methods=['GET'])
+async def cart_total():
+    """Returns the running cart total."""
+    return sync_app._cart_total(session)
+
+@asgi.route('/place_order', methods=['POST'])
+async def place_order():
+    """Handles order placement without holding a thread across the MySQL round trips."""
+    if 'user_id' not in session:
+        return {'error': 'Unauthorized access'}, 401
+
+    user_id = session['user_id']
+    idempotency_key = request.headers.get('Idempotency-Key')
+    location, quantities = sync_app._order_request(await request.get_json(silent=True), idempotency_key)
+
+    menu = await get_menu()
+    if menu is None:
+        return "Database connection failed", 500
+
+    if idempotency_key is None:
+        return await _submit_order(user_id, location, quantities, menu)
+    replay = sync_app._claim_order_key(user_id, idempotency_key, location, quantities)
+    if replay is not None:
+        return replay
+    try:
+        response = await asgi.make_response(await _submit_order(user_id, location, quantities, menu, idempotency_key))
+    except BaseException:
+        # Including cancellation when the client goes away mid-order
+        sync_app.idempotent_orders.release(user_id, idempotency_key)
+        raise
+    sync_app._settle_order_key(user_id, idempotency_key, response.status_code, await response.get_json())
+    return response
+
+async def _submit_order(user_id, location, quantities, menu, idempotency_key=None):
+    """app._submit_order with the round trips awaited on the aiomysql pool."""
+    order = sync_app._new_order(user_id, location, quantities, idempotency_key)
+    if asgi.config['ORDER_WRITE_BEHIND']:
+        return sync_app._enqueue_order(order, menu)
+
+    timer = PhaseTimer()
+    try:
+        async with db_cursor() as (conn, cursor):
+            try:
+                # Price the whole cart in one lookup
+                with timer.phase('price'):
+                    prices, missing = split_priced(menu, quantities)
+                    if missing:
+                        await cursor.execute(*menu_prices_statement(missing))
+                        for row in await cursor.fetchall():
+                            prices[int(row['id'])] = float(row['price'])
+                sync_app._price_order(order, prices)
+
+                # Insert the order, its items and its sales rollups, then commit once
+                with timer.phase('insert'):
+                    await conn.begin()
+                    await cursor.execute(*orders_statement([order]))
+                    for statement in sync_app._order_statements(order, cursor.lastrowid, 'mysql'):
+                        await cursor.execute(*statement)
+
+                with timer.phase('commit'):
+                    await conn.commit()
+
+            except aiomysql.IntegrityError:
+                await conn.rollback()
+                if idempotency_key is None:
+                    raise
+                # Placed earlier by another worker, or since evicted from the cache
+                await cursor.execute(sync_app.KEYED_ORDER, (user_id, idempotency_key))
+                replay = sync_app._keyed_replay(await cursor.fetchone())
+                if replay is None:
+                    raise
+                sync_app.dispatcher.discard(order['order_id'])
+                return replay
+    except ASYNC_DB_ERRORS as err:
+        return sync_app._order_failed(order, err)
+
+    return sync_app._order_placed(order), 200, {'Server-Timing': timer.server_timing()}
+
+@asgi.route('/metrics')
+async def metrics():
+    """Exposes service metrics in the Prometheus text exposition format."""
+    return Response(sync_app.metrics_registry.render(), content_type=sync_app.CONTENT_TYPE)
+
+# Exact paths served by the coroutines above; everything else goes to Flask.
+ASYNC_PATHS = frozenset(rule.rule for rule in asgi.url_map.iter_rules() if '<' not in rule.rule)
+
+_flask = WsgiToAsgi(sync_app.app)
+
+async def application(scope, receive, send):
+    """ASGI entry point: async routes on Quart, the rest on the Flask app."""
+    if scope['type'] == 'http' and scope['path'] not in ASYNC_PATHS:
+        await _flask(scope, receive, send)
+    else:
+        await asgi(scope, receive, send)
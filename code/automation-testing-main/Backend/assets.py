@@ -0,0 +1,136 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Response types worth compressing on the fly or ahead of time.
+COMPRESSIBLE = frozenset((
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+    'application/json', 'image/svg+xml'
+))
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def supported_encodings():
+    """Content codings this process can produce, most preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encodings, available=None):
+    """Pick the best coding the client accepts (a werkzeug Accept), or None for identity."""
+    for encoding in supported_encodings() if available is None else available:
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+class Asset:
+    """One fingerprinted file from the static folder."""
+
+    __slots__ = ('path', 'mimetype', 'variants')
+
+    def __init__(self, path, mimetype, variants):
+        self.path = path
+        self.mimetype = mimetype
+        self.variants = variants  # {encoding: pre-compressed bytes}
+
+
+class AssetManifest:
+    """Content-hashed URLs for everything under a static folder.
+
+    build() walks the folder once at startup: each file's URL is prefixed with
+    a short SHA-256 of its content ("SCU.jpg" -> "/assets/3f2a9c1b7d4e/SCU.jpg")
+    so it can be cached forever, and text assets are compressed ahead of time.
+    Files that are not in the manifest fall back to the plain static URL.
+    """
+
+    def __init__(self, folder, url_prefix='/assets', static_url_path='/static'):
+        self.folder = folder
+        self.url_prefix = url_prefix
+        self.static_url_path = static_url_path
+        self._urls = {}
+        self._assets = {}
+
+    def build(self):
+        urls, assets = {}, {}
+        if self.folder and os.path.isdir(self.folder):
+            for root, _, files in os.walk(self.folder):
+                for name in files:
+                    path = os.path.join(root, name)
+                    logical = os.path.relpath(path, self.folder).replace(os.sep, '/')
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                    hashed = f"{hashlib.sha256(data).hexdigest()[:12]}/{logical}"
+                    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                    variants = {}
+                    if mimetype in COMPRESSIBLE:
+                        variants = {encoding: compress(data, encoding) for encoding in supported_encodings()}
+                    urls[logical] = hashed
+                    assets[hashed] = Asset(path, mimetype, variants)
+        self._urls, self._assets = urls, assets
+        return self
+
+    def url(self, filename):
+        """Return the fingerprinted URL for a static file, or its plain static URL."""
+        hashed = self._urls.get(filename)
+        if hashed is None:
+            return f"{self.static_url_path}/{filename}"
+        return f"{self.url_prefix}/{hashed}"
+
+    def lookup(self, hashed):
+        """Return the Asset for a fingerprinted "<hash>/<name>" path, or None."""
+        return self._assets.get(hashed)
+
+    def __len__(self):
+        return len(self._assets)
+
+
+def optimize_response(response, request, min_size=1024, private=False):
+    """Add a validator and a negotiated content coding to an HTML or JSON response.
+
+    Answers If-None-Match with 304 when the body is unchanged, and compresses
+    bodies of at least `min_size` bytes with the best coding the client
+    accepts.  Streamed, passthrough and already-encoded responses are left alone.
+    Pass `private` for bodies that depend on the session, so shared caches
+    never store one user's page under a validator another user can match.
+    """
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+        return response
+    if response.is_streamed or response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in COMPRESSIBLE:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if private:
+        response.cache_control.public = False
+        response.cache_control.private = True
+    if response.get_etag()[0] is None:
+        # Weak: the same validator covers every coding of this body.
+        response.add_etag(weak=True)
+    response.make_conditional(request)
+    if response.status_code != 200:
+        return response
+
+    data = response.get_data()
+    encoding = negotiate(request.accept_encodings) if len(data) >= min_size else None
+    if encoding:
+        response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        tag, weak = response.get_etag()
+        if not weak:
+            # A strong tag names exact bytes; the encoded body is a different representation.
+            response.set_etag(tag, weak=True)
+    return response
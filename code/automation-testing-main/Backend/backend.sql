@@ -59,7 +59,10 @@ CREATE TABLE orders (
     location VARCHAR(255) NOT NULL,
     total_price DECIMAL(7, 2) NOT NULL,
     estimated_delivery_time INT,
-    order_id VARCHAR(255) UNIQUE NOT NULL,
+    eta_baseline INT NULL,  -- ETA model's minutes before its lateness correction and courier run
+    order_id BINARY(16) UNIQUE NOT NULL,  -- time-ordered key; "ORD-..." text form in order_ids.py
+    idempotency_key VARCHAR(64) NULL,  -- client Idempotency-Key of /place_order, if sent
+    delivered_at TIMESTAMP NULL DEFAULT NULL,  -- UTC, set by POST /orders/<id>/delivered
     FOREIGN KEY (user_id) REFERENCES users(id)
 );
 
@@ -74,4 +77,40 @@ CREATE TABLE order_items (
     FOREIGN KEY (menu_item_id) REFERENCES menu_items(id)
 );
 
+# Order history is read newest-first per user and paged by (order_date, id)
+CREATE INDEX idx_orders_user_date ON orders (user_id, order_date, id);
+CREATE INDEX idx_order_items_order ON order_items (order_id);
+
+# The ETA model counts undelivered orders and recent deliveries across every worker
+# (existing databases: ALTER TABLE orders ADD COLUMN delivered_at TIMESTAMP NULL DEFAULT NULL;
+#  ALTER TABLE orders ADD COLUMN eta_baseline INT NULL AFTER estimated_delivery_time;)
+CREATE INDEX idx_orders_delivery ON orders (delivered_at, order_date);
+
+# Logins match emails case-insensitively, as the user cache keys them
+CREATE INDEX idx_users_email_lower ON users ((LOWER(scu_email)));
+
+# A retried /place_order with the same Idempotency-Key can never create a second order
+# (existing databases: ALTER TABLE orders ADD COLUMN idempotency_key VARCHAR(64) NULL AFTER order_id;)
+CREATE UNIQUE INDEX idx_orders_idempotency ON orders (user_id, idempotency_key);
+
+# Sales rollups, maintained with every order and rebuilt by `flask backfill-rollups`
+
+CREATE TABLE IF NOT EXISTS sales_hourly_location (
+    bucket_hour DATETIME NOT NULL,
+    location VARCHAR(255) NOT NULL,
+    order_count INT NOT NULL DEFAULT 0,
+    item_count INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_hour, location)
+);
+
+CREATE TABLE IF NOT EXISTS sales_daily_item (
+    bucket_day DATE NOT NULL,
+    menu_item_id INT NOT NULL,
+    quantity INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_day, menu_item_id),
+    FOREIGN KEY (menu_item_id) REFERENCES menu_items(id)
+);
+
 Select * from users
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""Per-route load and latency benchmark for the SCU Food Delivery backend.
+
+Drives the real login -> /index -> /add_to_cart -> /place_order flow with
+concurrent virtual users against the app served over HTTP.  By default the
+app runs on a throwaway SQLite database, so no MySQL server is needed.
+
+    python benchmarks/route_bench.py --concurrency 16 --iterations 50 --output run.json
+    python benchmarks/route_bench.py --compare baseline.json run.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+
+import requests
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+ROUTES = ('POST /', 'GET /index', 'POST /add_to_cart', 'POST /place_order')
+LOCATIONS = ("Lucas Hall", "scdi", "Alameda Hall", "Kenna Hall", "Finn Residence Hall")
+
+
+class QuietHandler(WSGIRequestHandler):
+    """Request handler that skips per-request access logging."""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    """Turn per-route latency samples (seconds) into the report dict."""
+    routes = {}
+    for route in ROUTES:
+        samples = latencies.get(route, [])
+        routes[route] = {
+            'requests': len(samples),
+            'errors': errors.get(route, 0),
+            'rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+            'mean_ms': round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+            'p50_ms': round(percentile(samples, 50) * 1000, 3),
+            'p95_ms': round(percentile(samples, 95) * 1000, 3),
+            'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        }
+    return routes
+
+
+def prepare_app(engine, sqlite_path, users):
+    """Point the app at the chosen database and make sure bench users exist."""
+    import app as app_module
+
+    app_module.app.config['DB_ENGINE'] = engine
+    if engine == 'sqlite':
+        app_module.app.config['SQLITE_PATH'] = sqlite_path
+    app_module._db_engine = None
+
+    conn = app_module.get_db_connection()
+    if conn is None:
+        raise SystemExit("benchmark database is unreachable")
+    with closing(conn), closing(conn.cursor()) as cursor:
+        for n in range(users):
+            cursor.execute("SELECT id FROM users WHERE scu_email = %s", (f"bench{n}@scu.edu",))
+            if cursor.fetchone() is None:
+                cursor.execute("INSERT INTO users (name, scu_email, scu_id) VALUES (%s, %s, %s)",
+                               (f"Bench User {n}", f"bench{n}@scu.edu", f"9{n:09d}"))
+        conn.commit()
+    return app_module.app
+
+
+def virtual_user(base_url, n, iterations, items, record):
+    """One client session repeating the full ordering flow."""
+    http = requests.Session()
+    for i in range(iterations):
+        timed(record, 'POST /', http.post, f"{base_url}/",
+              data={'scu_email': f"bench{n}@scu.edu", 'scu_id': f"9{n:09d}"}, allow_redirects=False)
+        timed(record, 'GET /index', http.get, f"{base_url}/index")
+        cart = [(n + i + k) % 22 + 1 for k in range(items)]
+        for item_id in cart:
+            timed(record, 'POST /add_to_cart', http.post, f"{base_url}/add_to_cart",
+                  json={'item_id': item_id, 'name': '', 'price': 0})
+        timed(record, 'POST /place_order', http.post, f"{base_url}/place_order",
+              json={'cart_items': cart, 'location': LOCATIONS[(n + i) % len(LOCATIONS)]})
+
+
+def timed(record, route, call, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        ok = call(*args, **kwargs).status_code < 400
+    except requests.RequestException:
+        ok = False
+    record(route, time.perf_counter() - start, ok)
+
+
+def run(concurrency, iterations, items, engine='sqlite', warmup=1):
+    """Run the benchmark and return the JSON-serialisable result."""
+    with tempfile.TemporaryDirectory() as tmp:
+        app = prepare_app(engine, os.path.join(tmp, 'bench.db'), concurrency)
+        server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+        latencies, errors, lock = {}, {}, threading.Lock()
+
+        def record(route, seconds, ok):
+            with lock:
+                latencies.setdefault(route, []).append(seconds)
+                if not ok:
+                    errors[route] = errors.get(route, 0) + 1
+
+        try:
+            if warmup:
+                virtual_user(base_url, 0, warmup, items, lambda *args: None)
+            users = [threading.Thread(target=virtual_user, args=(base_url, n, iterations, items, record))
+                     for n in range(concurrency)]
+            start = time.perf_counter()
+            for user in users:
+                user.start()
+            for user in users:
+                user.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            server.shutdown()
+
+    total = sum(len(samples) for samples in latencies.values())
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'engine': engine,
+            'concurrency': concurrency,
+            'iterations': iterations,
+            'items_per_order': items,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'elapsed_s': round(elapsed, 3),
+            'total_rps': round(total / elapsed, 2) if elapsed else 0.0,
+        },
+        'routes': summarize(latencies, errors, elapsed),
+    }
+
+
+def compare(baseline, candidate, threshold):
+    """Print per-route deltas; return True if any p95 or throughput regressed past threshold %."""
+    regressed = False
+    print(f"{'route':<20} {'metric':<7} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    for route in ROUTES:
+        before, after = baseline['routes'].get(route), candidate['routes'].get(route)
+        if not before or not after:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'rps'):
+            old, new = before[metric], after[metric]
+            change = (new - old) / old * 100 if old else 0.0
+            worse = change > threshold if metric != 'rps' else change < -threshold
+            if worse and metric in ('p95_ms', 'rps'):
+                regressed = True
+            flag = ' !' if worse else ''
+            print(f"{route:<20} {metric:<7} {old:>10.2f} {new:>10.2f} {change:>+7.1f}%{flag}")
+    return regressed
+
+
+def print_report(result):
+    meta = result['meta']
+    print(f"engine={meta['engine']} concurrency={meta['concurrency']} iterations={meta['iterations']} "
+          f"elapsed={meta['elapsed_s']}s total_rps={meta['total_rps']}")
+    print(f"{'route':<20} {'reqs':>6} {'errs':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, stats in result['routes'].items():
+        print(f"{route:<20} {stats['requests']:>6} {stats['errors']:>5} {stats['rps']:>9.2f} "
+              f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=8, help="concurrent virtual users")
+    parser.add_argument('--iterations', type=int, default=20, help="flows per virtual user")
+    parser.add_argument('--items', type=int, default=3, help="items added per order")
+    parser.add_argument('--engine', choices=('sqlite', 'mysql'), default='sqlite',
+                        help="sqlite uses a throwaway database; mysql uses the MYSQL_* settings")
+    parser.add_argument('--warmup', type=int, default=1, help="untimed flows before measuring")
+    parser.add_argument('--output', help="write the JSON result here")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help="compare two saved results instead of running")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="percent change in p95 or rps counted as a regression")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            candidate = json.load(f)
+        return 1 if compare(baseline, candidate, args.threshold) else 0
+
+    result = run(args.concurrency, args.iterations, args.items, args.engine, args.warmup)
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import argparse
+import logging
+import os
+import threading
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+
+from dispatch import serve_dispatcher
+
+
+class MemoryCartBackend:
+    """Carts kept in this process, keyed by the cart handle stored in the session.
+
+    Each cart maps menu item id -> quantity, remembers the unit price (in
+    cents) each item was added at, and keeps a running total so add, remove
+    and total are all O(1).  The least recently used carts are dropped once
+    more than `max_carts` exist.
+    """
+
+    def __init__(self, max_carts=100000):
+        self.max_carts = max_carts
+        self._carts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, cart_id, item_id, unit_cents, quantity=1):
+        """Add `quantity` of an item and return the new total in cents."""
+        with self._lock:
+            cart = self._cart(cart_id, create=True)
+            cart['items'][item_id] = cart['items'].get(item_id, 0) + quantity
+            # Keep the first price seen so removal subtracts exactly what was added.
+            unit_cents = cart['prices'].setdefault(item_id, unit_cents)
+            cart['total'] += unit_cents * quantity
+            return cart['total']
+
+    def remove(self, cart_id, item_id):
+        """Remove every unit of an item and return the new total in cents."""
+        with self._lock:
+            cart = self._cart(cart_id)
+            if cart is None:
+                return 0
+            quantity = cart['items'].pop(item_id, 0)
+            cart['total'] -= cart['prices'].pop(item_id, 0) * quantity
+            return cart['total']
+
+    def total(self, cart_id):
+        """Return the cart total in cents."""
+        with self._lock:
+            cart = self._cart(cart_id)
+            return cart['total'] if cart else 0
+
+    def items(self, cart_id):
+        """Return a copy of the cart's {item_id: quantity} map."""
+        with self._lock:
+            cart = self._cart(cart_id)
+            return dict(cart['items']) if cart else {}
+
+    def clear(self, cart_id):
+        """Drop a cart entirely."""
+        with self._lock:
+            self._carts.pop(cart_id, None)
+
+    def count(self):
+        """Return the number of carts currently held."""
+        with self._lock:
+            return len(self._carts)
+
+    def _cart(self, cart_id, create=False):
+        cart = self._carts.get(cart_id)
+        if cart is not None:
+            self._carts.move_to_end(cart_id)
+        elif create:
+            cart = self._carts[cart_id] = {'items': {}, 'prices': {}, 'total': 0}
+            if len(self._carts) > self.max_carts:
+                self._carts.popitem(last=False)
+        return cart
+
+
+class _CartClient(BaseManager):
+    pass
+
+
+_CartClient.register('carts')
+
+
+class SharedCartBackend:
+    """Carts held by a cart server process shared by every app worker.
+
+    Any process running `python cart_store.py --serve HOST:PORT` (or
+    serve_carts()) can act as the server; each call is one round trip and
+    runs atomically on the server's MemoryCartBackend.
+    """
+
+    def __init__(self, address, authkey):
+        self._address = address
+        self._authkey = authkey
+        self._proxy = None
+        self._lock = threading.Lock()
+
+    def add(self, cart_id, item_id, unit_cents, quantity=1):
+        return self._carts().add(cart_id, item_id, unit_cents, quantity)
+
+    def remove(self, cart_id, item_id):
+        return self._carts().remove(cart_id, item_id)
+
+    def total(self, cart_id):
+        return self._carts().total(cart_id)
+
+    def items(self, cart_id):
+        return self._carts().items(cart_id)
+
+    def clear(self, cart_id):
+        return self._carts().clear(cart_id)
+
+    def count(self):
+        return self._carts().count()
+
+    def _carts(self):
+        # Connect lazily so pre-forked workers each get their own connection.
+        if self._proxy is None:
+            with self._lock:
+                if self._proxy is None:
+                    manager = _CartClient(address=self._address, authkey=self._authkey)
+                    manager.connect()
+                    self._proxy = manager.carts()
+        return self._proxy
+
+
+def make_cart_server(address, authkey, max_carts=100000):
+    """Build a cart server around a fresh MemoryCartBackend; call serve_forever() on it.
+
+    It also hosts the courier dispatcher that SharedDispatchScheduler talks to.
+    """
+    backend = MemoryCartBackend(max_carts)
+
+    class _CartServer(BaseManager):
+        pass
+
+    _CartServer.register('carts', callable=lambda: backend)
+    _CartServer.register('dispatcher', callable=serve_dispatcher())
+    return _CartServer(address=address, authkey=authkey).get_server()
+
+
+def parse_address(value):
+    """Turn 'host:port' into a (host, port) tuple."""
+    host, _, port = value.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the shared cart and courier dispatch server for SCU Food Delivery workers.")
+    parser.add_argument('--serve', default=os.getenv('CART_STORE_ADDRESS', '127.0.0.1:50055'), help="host:port to listen on")
+    parser.add_argument('--authkey', default=os.getenv('CART_STORE_AUTHKEY', 'scu-food-carts'))
+    parser.add_argument('--max-carts', type=int, default=100000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s %(message)s')
+    server = make_cart_server(parse_address(args.serve), args.authkey.encode(), args.max_carts)
+    logging.getLogger('cart_store').info("Cart server listening on %s", args.serve)
+    server.serve_forever()
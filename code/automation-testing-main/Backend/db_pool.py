@@ -0,0 +1,230 @@
+import threading
+import time
+
+
+class PoolExhausted(Exception):
+    """Raised when no connection frees up before the checkout timeout."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the caller's deadline passes before its database work could start."""
+
+
+class _Entry:
+    """Bookkeeping for one physical connection owned by the pool."""
+
+    __slots__ = ('raw', 'created', 'last_used')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created = self.last_used = time.monotonic()
+
+
+class PooledConnection:
+    """Connection handed out by the pool; close() returns it instead of closing it."""
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name):
+        entry = self.__dict__.get('_entry')
+        if entry is None:
+            raise AttributeError(f"connection already returned to pool: {name}")
+        return getattr(entry.raw, name)
+
+    def close(self):
+        """Give the connection back to the pool (idempotent)."""
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool._release(entry)
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of DB-API connections.
+
+    `connect(timeout)` opens a new physical connection, giving up after
+    `timeout` seconds (None for the driver default), and `ping` raises if
+    one is no longer usable.  Opening is capped at `connect_timeout` and
+    at whatever remains of a caller's deadline.  Connections are checked
+    on borrow when `validate_on_borrow` is set, otherwise only after
+    sitting idle for `ping_interval` seconds, and are retired once older
+    than `max_lifetime`.
+    """
+
+    def __init__(self, connect, ping, min_size=1, max_size=10, timeout=5.0,
+                 max_lifetime=1800.0, validate_on_borrow=False, ping_interval=30.0, connect_timeout=None):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError("pool sizes must satisfy 0 <= min_size <= max_size, max_size >= 1")
+        self._connect = connect
+        self._ping = ping
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.validate_on_borrow = validate_on_borrow
+        self.ping_interval = ping_interval
+        self.connect_timeout = connect_timeout
+
+        self._cond = threading.Condition()
+        self._idle = []  # LIFO so the warmest connection is reused first
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'exhausted': 0,
+            'created': 0,
+            'discarded': 0,
+        }
+
+    def fill(self, deadline=None):
+        """Open connections until the pool holds at least min_size, stopping once `deadline` has passed."""
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                entry = self._open(deadline)
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def acquire(self, deadline=None):
+        """Borrow a connection, waiting up to `timeout` seconds for one to free up.
+
+        A caller `deadline` (a time.monotonic() value) shortens the wait and
+        raises DeadlineExceeded, rather than PoolExhausted, when it is what
+        ran out.
+        """
+        start = time.monotonic()
+        limit = start + self.timeout
+        open_deadline = deadline
+        if deadline is not None and deadline < limit:
+            limit = deadline
+        else:
+            deadline = None
+        waited = False
+        with self._cond:
+            self._stats['checkouts'] += 1
+            while True:
+                if self._closed:
+                    raise PoolExhausted("connection pool is closed")
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    entry = None
+                    break
+                remaining = limit - time.monotonic()
+                if remaining <= 0:
+                    self._stats['exhausted'] += 1
+                    if deadline is not None:
+                        raise DeadlineExceeded("request deadline passed while waiting for a connection")
+                    raise PoolExhausted(
+                        f"no connection available within {self.timeout}s "
+                        f"(max_size={self.max_size})")
+                if not waited:
+                    self._stats['waits'] += 1
+                    waited = True
+                self._cond.wait(remaining)
+            self._in_use += 1
+            if waited:
+                self._stats['wait_seconds'] += time.monotonic() - start
+
+        try:
+            if entry is not None and not self._usable(entry):
+                self._close_raw(entry)
+                entry = None
+            if entry is None:
+                entry = self._open(open_deadline)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, entry)
+
+    def close(self):
+        """Close idle connections and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_raw(entry)
+
+    def stats(self):
+        """Return a snapshot of pool counters and current occupancy."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot.update(size=self._size, idle=len(self._idle), in_use=self._in_use,
+                            max_size=self.max_size)
+        return snapshot
+
+    def _open(self, deadline=None):
+        timeout = self.connect_timeout
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded("request deadline passed before a connection could be opened")
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        entry = _Entry(self._connect(timeout))
+        with self._cond:
+            self._stats['created'] += 1
+        return entry
+
+    def _expired(self, entry, now):
+        return self.max_lifetime is not None and now - entry.created >= self.max_lifetime
+
+    def _usable(self, entry):
+        now = time.monotonic()
+        if self._expired(entry, now):
+            return False
+        if self.validate_on_borrow or now - entry.last_used >= self.ping_interval:
+            try:
+                self._ping(entry.raw)
+            except Exception:
+                return False
+        return True
+
+    def _release(self, entry):
+        keep = not self._closed and not self._expired(entry, time.monotonic())
+        if keep and getattr(entry.raw, 'in_transaction', False):
+            # Never hand the next borrower someone else's half-finished transaction.
+            try:
+                entry.raw.rollback()
+            except Exception:
+                keep = False
+        with self._cond:
+            self._in_use -= 1
+            if keep and not self._closed:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            else:
+                self._size -= 1
+                keep = False
+            self._cond.notify()
+        if not keep:
+            self._close_raw(entry)
+
+    def _close_raw(self, entry):
+        with self._cond:
+            self._stats['discarded'] += 1
+        try:
+            entry.raw.close()
+        except Exception:
+            pass
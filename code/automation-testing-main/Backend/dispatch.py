@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from multiprocessing.managers import BaseManager
+
+
+class _Run:
+    """One courier trip to a single location."""
+
+    __slots__ = ('run_id', 'location', 'orders', 'departs_at')
+
+    def __init__(self, run_id, location, departs_at):
+        self.run_id = run_id
+        self.location = location
+        self.orders = OrderedDict()  # order_id -> ready_at, in arrival order
+        self.departs_at = departs_at
+
+
+class DispatchScheduler:
+    """Groups orders for the same location into courier runs, in memory.
+
+    A run opens when an order arrives for a location with no open run and
+    departs `max_wait` seconds after that first order is ready, or as soon
+    as every order in it is ready once it holds `max_batch` orders.  Later
+    orders join the open run only if they will be ready before it departs.
+    An order's delivery ETA is its run's departure plus the travel time to
+    the location, so batching never quotes a delivery before the food is
+    ready.  Departed runs are forgotten after `retention` seconds.
+    """
+
+    def __init__(self, travel_time, max_wait=120.0, max_batch=4, retention=3600.0):
+        self._travel = travel_time
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.retention = retention
+        self._open = {}              # location -> run still accepting orders
+        self._runs = OrderedDict()   # run_id -> run, oldest first
+        self._order_run = {}
+        self._created = 0
+        self._assigned = 0
+        self._lock = threading.Lock()
+
+    def assign(self, order_id, location, eta, now=None):
+        """Put an order with a kitchen-side ETA of `eta` minutes on a run; returns its delivery ETA.
+
+        The order is ready for pickup `eta` minus the travel time from now.
+        """
+        now = time.time() if now is None else now
+        travel = self._travel(location)
+        ready_at = now + max(0, eta - travel) * 60
+        with self._lock:
+            self._prune(now)
+            run = self._open.get(location)
+            if run is None or run.departs_at <= now or ready_at > run.departs_at:
+                self._created += 1
+                run = _Run(self._created, location, ready_at + self.max_wait)
+                self._open[location] = self._runs[run.run_id] = run
+            run.orders[order_id] = ready_at
+            self._order_run[order_id] = run
+            self._assigned += 1
+            if len(run.orders) >= self.max_batch:
+                # Full: leave as soon as the last order is ready
+                run.departs_at = max(run.orders.values())
+                del self._open[location]
+            return max(1, round((run.departs_at - now) / 60 + travel))
+
+    def discard(self, order_id):
+        """Take an order that was never persisted off its run, without rescheduling the run."""
+        with self._lock:
+            run = self._order_run.pop(order_id, None)
+            if run is None:
+                return
+            del run.orders[order_id]
+            self._assigned -= 1
+            if not run.orders:
+                self._runs.pop(run.run_id, None)
+                if self._open.get(run.location) is run:
+                    del self._open[run.location]
+
+    def delivery_eta(self, order_id, now=None):
+        """Return the minutes until an order's run can deliver it, or None if it is not on a run."""
+        now = time.time() if now is None else now
+        with self._lock:
+            run = self._order_run.get(order_id)
+            if run is None:
+                return None
+            return max(1, round((max(run.departs_at, now) - now) / 60 + self._travel(run.location)))
+
+    def runs(self, location=None, now=None):
+        """Return a JSON-friendly list of known runs, oldest first."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._prune(now)
+            return [self._describe(run, now) for run in self._runs.values()
+                    if location is None or run.location == location]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'open_runs': len(self._open),
+                'tracked_runs': len(self._runs),
+                'runs_created': self._created,
+                'orders_assigned': self._assigned,
+            }
+
+    def _describe(self, run, now):
+        if run.departs_at <= now:
+            status = 'departed'
+        elif self._open.get(run.location) is run:
+            status = 'open'
+        else:
+            status = 'scheduled'
+        return {
+            'run_id': run.run_id,
+            'location': run.location,
+            'status': status,
+            'order_ids': list(run.orders),
+            'departs_at': datetime.fromtimestamp(run.departs_at, timezone.utc).isoformat(),
+            'departs_in_seconds': max(0, round(run.departs_at - now)),
+        }
+
+    def _prune(self, now):
+        cutoff = now - self.retention
+        while self._runs:
+            run = next(iter(self._runs.values()))
+            if run.departs_at >= cutoff:
+                break
+            self._runs.popitem(last=False)
+            for order_id in run.orders:
+                self._order_run.pop(order_id, None)
+
+
+class _DispatchClient(BaseManager):
+    pass
+
+
+_DispatchClient.register('dispatcher')
+
+
+class SharedDispatchScheduler:
+    """Courier runs kept by the one DispatchScheduler in the cart server.
+
+    Every worker books orders onto, and lists, the same runs, so orders for
+    a location are batched together whichever worker took them.  The first
+    worker to connect configures the scheduler with its travel times and
+    limits.  Each call is one round trip.
+    """
+
+    def __init__(self, address, authkey, travel_times, default_travel, max_wait=120.0, max_batch=4):
+        self._address = address
+        self._authkey = authkey
+        self._settings = (dict(travel_times), default_travel, max_wait, max_batch)
+        self._proxy = None
+        self._lock = threading.Lock()
+
+    def assign(self, order_id, location, eta, now=None):
+        return self._scheduler().assign(order_id, location, eta, now)
+
+    def discard(self, order_id):
+        return self._scheduler().discard(order_id)
+
+    def delivery_eta(self, order_id, now=None):
+        return self._scheduler().delivery_eta(order_id, now)
+
+    def runs(self, location=None, now=None):
+        return self._scheduler().runs(location, now)
+
+    def stats(self):
+        return self._scheduler().stats()
+
+    def _scheduler(self):
+        # Connect lazily so pre-forked workers each get their own connection.
+        if self._proxy is None:
+            with self._lock:
+                if self._proxy is None:
+                    manager = _DispatchClient(address=self._address, authkey=self._authkey)
+                    manager.connect()
+                    self._proxy = manager.dispatcher(*self._settings)
+        return self._proxy
+
+
+def serve_dispatcher():
+    """A server-side factory for SharedDispatchScheduler: one scheduler, set up by the first caller."""
+    schedulers = []
+    lock = threading.Lock()
+
+    def dispatcher(travel_times, default_travel, max_wait, max_batch):
+        with lock:
+            if not schedulers:
+                schedulers.append(DispatchScheduler(lambda location: travel_times.get(location, default_travel),
+                                                    max_wait=max_wait, max_batch=max_batch))
+            return schedulers[0]
+
+    return dispatcher
@@ -0,0 +1,159 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class _LocationModel:
+    """Queue and throughput state for one delivery location."""
+
+    __slots__ = ('outstanding', 'throughput', 'bias', 'fulfilment', 'completed')
+
+    def __init__(self, outstanding=0, completions=(), window=900.0, min_throughput=0.5):
+        self.outstanding = outstanding
+        self.completed = len(completions)
+        # Completions per minute over the window, never below the floor
+        self.throughput = max(self.completed / (window / 60), min_throughput)
+        # Mean (actual - baseline) and actual fulfilment minutes of recent deliveries
+        self.bias = sum(actual - baseline for actual, baseline in completions) / self.completed if completions else 0.0
+        self.fulfilment = sum(actual for actual, _ in completions) / self.completed if completions else None
+
+
+def utc_stamp(epoch):
+    """A time.time() value as the naive UTC 'YYYY-MM-DD HH:MM:SS' both databases compare order_date with."""
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class EtaEngine:
+    """Load-aware delivery ETAs computed from the shared orders table.
+
+    An order's ETA is its static estimate (prep, travel and cart size, from
+    `static_estimate`) plus the time to clear the orders still outstanding
+    at that location - together the order's baseline - plus how much
+    longer than their baselines recent deliveries there took on average.
+    Lateness is measured against the baseline rather than the quoted ETA,
+    which already includes the correction and would feed it back into itself.
+    Queue clearance uses the throughput of deliveries over the last `window`
+    seconds (never below `min_throughput` orders per minute).  Orders never
+    marked delivered stop counting after `max_age` seconds.
+
+    `loader(opened_after, delivered_after)` reads that state from the
+    database, so every worker sees the same queue: it returns
+    ({location: outstanding orders}, [(location, actual minutes, baseline
+    minutes)]), or None when the database is unreachable.  The result is
+    reused for `refresh` seconds; orders this worker places in between are
+    added to the cached queue so a burst still queues behind itself.
+    """
+
+    def __init__(self, static_estimate, loader, window=900.0, min_throughput=0.5, max_age=3600.0, refresh=5.0):
+        self._static = static_estimate
+        self._loader = loader
+        self.window = window
+        self.min_throughput = min_throughput
+        self.max_age = max_age
+        self.refresh = refresh
+        self._locations = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stats = {'loads': 0, 'load_failures': 0}
+
+    def estimate(self, location, num_items, now=None):
+        """Return the ETA in whole minutes for a new order, without registering it."""
+        model = self._model(location, now)
+        return max(1, round(self._baseline(model, location, num_items) + model.bias))
+
+    def baseline(self, location, num_items, now=None):
+        """Return a new order's ETA in whole minutes before the lateness correction; store it with the order."""
+        return max(1, round(self._baseline(self._model(location, now), location, num_items)))
+
+    def _baseline(self, model, location, num_items):
+        return self._static(location, num_items) + model.outstanding / model.throughput
+
+    def order_placed(self, location, now=None):
+        """Count an order this worker just placed until the next reload sees it in the database."""
+        model = self._model(location, now)
+        with self._lock:
+            model.outstanding += 1
+
+    def discard(self, location):
+        """Undo order_placed() for an order that was never persisted."""
+        with self._lock:
+            model = self._locations.get(location)
+            if model is not None and model.outstanding > 0:
+                model.outstanding -= 1
+
+    def recompute(self, open_orders, now=None):
+        """Return {order_id: remaining minutes} for open orders in one pass.
+
+        `open_orders` yields (order_id, location, placed_at epoch, baseline
+        minutes) rows read from the orders table.  The model is loaded once
+        and each order's baseline is shifted by its location's current
+        correction, less the time since it was placed.
+        """
+        now = time.time() if now is None else now
+        self._model(None, now)
+        with self._lock:
+            bias = {location: model.bias for location, model in self._locations.items()}
+        return {
+            order_id: max(1, round(baseline + bias.get(location, 0.0) - (now - placed_at) / 60))
+            for order_id, location, placed_at, baseline in open_orders
+        }
+
+    def invalidate(self):
+        """Reload from the database on next use, e.g. after recording a delivery."""
+        self._loaded_at = None
+
+    def state(self, now=None):
+        """Return a JSON-friendly snapshot of the model for inspection."""
+        self._model(None, now)
+        with self._lock:
+            return {
+                location: {
+                    'outstanding': model.outstanding,
+                    'throughput_per_min': round(model.throughput, 3),
+                    'bias_minutes': round(model.bias, 2),
+                    'fulfilment_minutes': round(model.fulfilment, 2) if model.fulfilment is not None else None,
+                    'completed': model.completed,
+                }
+                for location, model in self._locations.items()
+            }
+
+    def stats(self):
+        return dict(self._stats)
+
+    def _model(self, location, now):
+        now = time.time() if now is None else now
+        loaded_at = self._loaded_at
+        if loaded_at is None or now - loaded_at >= self.refresh or now < loaded_at:
+            # One thread reloads; the others keep using the previous state meanwhile
+            if self._refresh_lock.acquire(blocking=loaded_at is None):
+                try:
+                    self._load(now)
+                finally:
+                    self._refresh_lock.release()
+        if location is None:
+            return None
+        with self._lock:
+            model = self._locations.get(location)
+            if model is None:
+                model = self._locations[location] = _LocationModel(min_throughput=self.min_throughput)
+            return model
+
+    def _load(self, now):
+        loaded = self._loader(utc_stamp(now - self.max_age), utc_stamp(now - self.window))
+        if loaded is None:
+            self._stats['load_failures'] += 1
+            return
+        outstanding, completions = loaded
+        per_location = {}
+        for location, actual, promised in completions:
+            per_location.setdefault(location, []).append((actual, promised))
+        locations = {
+            location: _LocationModel(outstanding.get(location, 0), per_location.get(location, ()),
+                                     self.window, self.min_throughput)
+            for location in set(outstanding) | set(per_location)
+        }
+        with self._lock:
+            self._locations = locations
+            self._loaded_at = now
+        self._stats['loads'] += 1
@@ -0,0 +1,42 @@
+import threading
+
+from markupsafe import Markup
+
+
+class FragmentCache:
+    """Rendered template fragments, each kept for one version of its data.
+
+    get() returns the cached markup while the caller's version token matches
+    and re-renders (replacing the old entry) when it changes, so stale
+    fragments never need explicit eviction.
+    """
+
+    def __init__(self):
+        self._fragments = {}  # name -> (version, Markup)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def get(self, name, version, render):
+        entry = self._fragments.get(name)
+        if entry is not None and entry[0] == version:
+            self._stats['hits'] += 1
+            return entry[1]
+        # Concurrent misses may both render; the result is identical either way.
+        markup = Markup(render())
+        with self._lock:
+            self._stats['misses'] += 1
+            self._fragments[name] = (version, markup)
+        return markup
+
+    def invalidate(self, name=None):
+        """Drop one fragment, or all of them."""
+        with self._lock:
+            if name is None:
+                self._fragments.clear()
+            else:
+                self._fragments.pop(name, None)
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats['fragments'] = len(self._fragments)
+        return stats
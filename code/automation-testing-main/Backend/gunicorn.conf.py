@@ -0,0 +1,71 @@
+"""Gunicorn settings for running the backend as a pre-fork, multi-worker server.
+
+    SECRET_KEY=... gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is imported once in the master (preload_app) and forked into
+WEB_WORKERS processes with WEB_THREADS threads each.  Keep DB_POOL_MAX_SIZE
+at or above WEB_THREADS, since each worker has its own connection pool.
+The resolved counts are exported to the app: browsing is admitted on fewer
+than WEB_THREADS threads, and with more than one worker the app keeps
+carts and courier runs in the shared cart server, which is started here
+alongside the workers (CART_STORE_SPAWN).
+
+Signals: HUP starts fresh workers and gracefully retires the old ones;
+TERM stops accepting connections, lets in-flight requests finish within
+GRACEFUL_TIMEOUT and drains the write-behind order queue before exiting.
+Because the app is preloaded, code changes need a full restart (or USR2).
+
+Each worker runs the app's warm-up (database connections, templates, menu)
+before it accepts requests, and logs how long each phase took.  Probe
+/healthz for liveness and /readyz for readiness.
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("WEB_THREADS", "4"))
+worker_class = "gthread"
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+accesslog = os.getenv("ACCESS_LOG", "-")
+
+# Read by the app when it is imported (preload_app imports it after this file)
+os.environ["WEB_WORKERS"] = str(workers)
+os.environ["WEB_THREADS"] = str(threads)
+
+_cart_server = None
+
+
+def on_starting(server):
+    global _cart_server
+    if not os.getenv("SECRET_KEY") and not os.getenv("SECRET_KEY_FILE"):
+        server.log.warning("SECRET_KEY is not set; sessions will not survive a restart")
+    import app as app_module
+    config = app_module.app.config
+    if 'shared' in (config['CART_BACKEND'], config['DISPATCH_BACKEND']) and config['CART_STORE_SPAWN']:
+        # Address and auth key reach the cart server through the inherited environment
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cart_store.py")
+        _cart_server = subprocess.Popen([sys.executable, script, "--serve", config['CART_STORE_ADDRESS']])
+        server.log.info("Started cart server on %s (pid %s)", config['CART_STORE_ADDRESS'], _cart_server.pid)
+
+
+def on_exit(server):
+    if _cart_server is not None:
+        _cart_server.terminate()
+        _cart_server.wait(graceful_timeout)
+
+
+def post_fork(server, worker):
+    import app as app_module
+    app_module.reset_after_fork()
+    app_module.warmup.run()
+
+
+def worker_exit(server, worker):
+    import app as app_module
+    app_module.shutdown(graceful_timeout)
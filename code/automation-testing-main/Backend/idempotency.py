@@ -0,0 +1,85 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+KEY_MAX_LENGTH = 64  # matches orders.idempotency_key
+
+# claim() outcomes
+CLAIMED = 'claimed'
+REPLAY = 'replay'
+IN_PROGRESS = 'in_progress'
+MISMATCH = 'mismatch'
+
+
+def fingerprint(payload):
+    """Stable digest of a request body, so a reused key with a different body is caught."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class IdempotencyCache:
+    """Bounded LRU of idempotency keys and the responses they produced.
+
+    The first request with a (scope, key) pair claims it; repeats get the
+    stored (status, body) back for `ttl` seconds instead of running again.
+    A claim whose request never finishes lapses after `claim_timeout`
+    seconds so the client can retry.  The cache is per process: the
+    database's unique constraint on the key is what catches repeats it has
+    evicted or that land on another worker.
+    """
+
+    def __init__(self, capacity=10000, ttl=86400.0, claim_timeout=30.0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.claim_timeout = claim_timeout
+        self._entries = OrderedDict()  # (scope, key) -> [fingerprint, status, body, expires]
+        self._lock = threading.Lock()
+        self._stats = {'claims': 0, 'replays': 0, 'in_progress': 0, 'mismatches': 0, 'evictions': 0}
+
+    def claim(self, scope, key, digest):
+        """Return (CLAIMED, None), (REPLAY, (status, body)), (IN_PROGRESS, None) or (MISMATCH, None)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((scope, key))
+            if entry is not None and entry[3] > now:
+                if entry[0] != digest:
+                    self._stats['mismatches'] += 1
+                    return MISMATCH, None
+                if entry[1] is None:
+                    self._stats['in_progress'] += 1
+                    return IN_PROGRESS, None
+                self._entries.move_to_end((scope, key))
+                self._stats['replays'] += 1
+                return REPLAY, (entry[1], entry[2])
+            self._stats['claims'] += 1
+            self._store((scope, key), [digest, None, None, now + self.claim_timeout])
+            return CLAIMED, None
+
+    def complete(self, scope, key, status, body):
+        """Record the response for a claimed key."""
+        with self._lock:
+            entry = self._entries.get((scope, key))
+            if entry is not None:
+                entry[1:] = [status, body, time.monotonic() + self.ttl]
+
+    def release(self, scope, key):
+        """Drop a claim whose request failed, so a retry runs again."""
+        with self._lock:
+            entry = self._entries.get((scope, key))
+            if entry is not None and entry[1] is None:
+                del self._entries[(scope, key)]
+
+    def stats(self):
+        """Return counters and the current number of keys held."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['keys'] = len(self._entries)
+        return stats
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
@@ -0,0 +1,130 @@
+import hashlib
+import threading
+import time
+from decimal import Decimal
+
+CENTS = Decimal('0.01')
+
+
+class MenuSnapshot:
+    """Immutable, id-indexed view of menu_items at one catalog version."""
+
+    __slots__ = ('version', 'digest', 'items', 'by_id', 'loaded_at')
+
+    def __init__(self, version, rows, loaded_at):
+        self.version = version
+        self.items = tuple(
+            {'id': int(row['id']), 'name': row['name'], 'category': row['category'],
+             'price': Decimal(str(row['price'])).quantize(CENTS)}
+            for row in rows
+        )
+        self.by_id = {item['id']: item for item in self.items}
+        self.digest = _digest(self.items)
+        self.loaded_at = loaded_at
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, item_id):
+        """Return the menu item for an id (int or numeric string), or None."""
+        try:
+            return self.by_id.get(int(item_id))
+        except (TypeError, ValueError):
+            return None
+
+    def price(self, item_id):
+        """Return the price of an item as a float, or None if it is not on the menu."""
+        item = self.get(item_id)
+        return float(item['price']) if item else None
+
+    def by_category(self, category):
+        """Return the items in one category, in menu order."""
+        return [item for item in self.items if item['category'] == category]
+
+
+def _digest(items):
+    content = "\n".join(f"{i['id']}|{i['name']}|{i['category']}|{i['price']}" for i in items)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class MenuCatalog:
+    """Process-wide menu cache refreshed on TTL expiry or an explicit invalidate().
+
+    `loader` returns the current menu_items rows, or None when the database
+    is unreachable.  The version number only advances when the menu content
+    actually changes, so it can key anything derived from the menu.
+    """
+
+    def __init__(self, loader, ttl=300.0):
+        self._loader = loader
+        self.ttl = ttl
+        self._snapshot = None
+        self._version = 0
+        self._stale = True
+        self._refresh_lock = threading.Lock()
+        self._stats = {'hits': 0, 'loads': 0, 'load_failures': 0}
+
+    def get(self):
+        """Return the current MenuSnapshot, reloading it if stale; None if it cannot be loaded."""
+        snapshot = self._snapshot
+        if snapshot is not None and not self._needs_refresh(snapshot):
+            self._stats['hits'] += 1
+            return snapshot
+        if snapshot is not None and not self._refresh_lock.acquire(blocking=False):
+            # Another thread is already reloading; keep serving the previous version.
+            self._stats['hits'] += 1
+            return snapshot
+        if snapshot is None:
+            self._refresh_lock.acquire()
+        try:
+            if self._snapshot is not None and not self._needs_refresh(self._snapshot):
+                return self._snapshot
+            return self._reload()
+        finally:
+            self._refresh_lock.release()
+
+    def peek(self):
+        """Return the current snapshot if it is fresh, else None; never loads."""
+        snapshot = self._snapshot
+        if snapshot is None or self._needs_refresh(snapshot):
+            return None
+        self._stats['hits'] += 1
+        return snapshot
+
+    def invalidate(self):
+        """Signal that menu_items changed; the next get() reloads."""
+        self._stale = True
+
+    def stats(self):
+        """Return catalog counters plus the current version and size."""
+        snapshot = self._snapshot
+        stats = dict(self._stats)
+        stats.update(version=self._version, items=len(snapshot) if snapshot else 0)
+        return stats
+
+    def _needs_refresh(self, snapshot):
+        return self._stale or time.monotonic() - snapshot.loaded_at >= self.ttl
+
+    def _reload(self):
+        self._stats['loads'] += 1
+        try:
+            rows = self._loader()
+        except Exception:
+            rows = None
+        if rows is None:
+            self._stats['load_failures'] += 1
+            return self._snapshot  # serve the last good menu while the DB is down
+
+        candidate = MenuSnapshot(self._version, rows, time.monotonic())
+        if not len(candidate):
+            # Never pin an empty menu (e.g. before seed data lands) for a whole TTL.
+            return candidate
+        current = self._snapshot
+        if current is None or current.digest != candidate.digest:
+            self._version += 1
+            candidate.version = self._version
+        else:
+            candidate.version = current.version
+        self._snapshot = candidate
+        self._stale = False
+        return candidate
@@ -0,0 +1,230 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                                for key, value in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values (e.g. durations in seconds)."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # per-bucket counts (last slot is +Inf), sum
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, **labels):
+        series = self._values.get(_label_key(self.labelnames, labels))
+        return sum(series[0]) if series else 0
+
+    def render(self):
+        with self._lock:
+            items = [(key, list(series[0]), series[1]) for key, series in self._values.items()]
+        lines = self.header()
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = (('le', _format_value(float(bound))),)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Holds metrics plus collectors that report gauges computed at scrape time."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, name, documentation, collect):
+        """Register a gauge family whose samples come from collect() -> {stat: value}."""
+        self._collectors.append((name, documentation, collect))
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, documentation, collect in self._collectors:
+            try:
+                samples = collect() or {}
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for stat, value in samples.items():
+                if isinstance(value, (int, float)):
+                    lines.append(f'{name}{{stat="{stat}"}} {_format_value(value)}')
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+_STATEMENT = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE)\b.*?\b(?:FROM|INTO|UPDATE)\s+`?(\w+)',
+                        re.IGNORECASE | re.DOTALL)
+_UPDATE = re.compile(r'^\s*UPDATE\s+`?(\w+)', re.IGNORECASE)
+
+
+def statement_label(sql):
+    """Low-cardinality label for a SQL statement, e.g. 'SELECT users' or 'INSERT order_items'."""
+    match = _UPDATE.match(sql)
+    if match:
+        return f"UPDATE {match.group(1)}"
+    match = _STATEMENT.match(sql)
+    if match:
+        return f"{match.group(1).upper()} {match.group(2)}"
+    return sql.split(None, 1)[0].upper() if sql.strip() else 'UNKNOWN'
+
+
+class InstrumentedConnection:
+    """Connection wrapper whose cursors time every statement."""
+
+    def __init__(self, conn, duration, rows):
+        self._conn = conn
+        self._duration = duration
+        self._rows = rows
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._duration, self._rows)
+
+    def close(self):
+        self._conn.close()
+
+
+class InstrumentedCursor:
+    """Cursor wrapper recording per-statement duration and row counts."""
+
+    def __init__(self, cursor, duration, rows):
+        self._cursor = cursor
+        self._duration = duration
+        self._rows = rows
+        self._label = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, sql, params=()):
+        self._label = statement_label(sql)
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, params)
+        finally:
+            self._duration.observe(time.perf_counter() - start, statement=self._label)
+            if not self._label.startswith('SELECT'):
+                self._count(getattr(self._cursor, 'rowcount', 0))
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._count(1 if row is not None else 0)
+        return row
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._count(len(rows))
+        return rows
+
+    def close(self):
+        self._cursor.close()
+
+    def _count(self, rows):
+        if rows and rows > 0:
+            self._rows.inc(rows, statement=self._label)
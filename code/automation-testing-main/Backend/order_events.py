@@ -0,0 +1,159 @@
+import json
+import threading
+from collections import OrderedDict
+
+# Status pushed once an order is handed over; the others come from order_queue
+DELIVERED = 'delivered'
+
+# SSE comment line: keeps proxies from timing out an idle stream and surfaces dead clients
+HEARTBEAT = ": heartbeat\n\n"
+
+
+def format_event(name, data):
+    """Render one Server-Sent Event with a JSON payload."""
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def unsent(sent, events):
+    """Return the parts of `events` a stream has not sent yet, and record them in `sent`.
+
+    `sent` maps order_id -> the fields last sent for it, so an update that
+    arrives both in-process and from the database goes out once.
+    """
+    fresh = []
+    for event in events:
+        last = sent.setdefault(event['order_id'], {})
+        changed = {key: value for key, value in event.items() if key != 'order_id' and last.get(key) != value}
+        if changed:
+            last.update(changed)
+            fresh.append(dict(order_id=event['order_id'], **changed))
+    return fresh
+
+
+class StreamLimitReached(Exception):
+    """Raised when opening a stream would exceed the concurrent stream caps."""
+
+
+class Subscription:
+    """One open stream: the updates not yet sent to it, at most one per order.
+
+    A newer update for an order is merged into the one still waiting, so a
+    slow reader skips intermediate states instead of queueing them.  When
+    more than `max_pending` orders are waiting at once the subscription
+    overflows and the stream tells the client to resync.
+    """
+
+    def __init__(self, user_id, max_pending):
+        self.user_id = user_id
+        self.max_pending = max_pending
+        self.overflowed = False
+        self.closed = False
+        self._pending = OrderedDict()  # order_id -> merged update, oldest first
+        self._cond = threading.Condition()
+
+    def push(self, event):
+        """Queue an update without blocking; returns True if it merged into a waiting one."""
+        with self._cond:
+            if self.closed or self.overflowed:
+                return False
+            waiting = self._pending.get(event['order_id'])
+            if waiting is not None:
+                waiting.update(event)
+            else:
+                self._pending[event['order_id']] = dict(event)
+                if len(self._pending) > self.max_pending:
+                    self.overflowed = True
+                    self._pending.clear()
+            self._cond.notify()
+            return waiting is not None
+
+    def get(self, timeout):
+        """Return the waiting updates, [] if none arrived within `timeout`, None once overflowed or closed."""
+        with self._cond:
+            if not self._pending and not self.overflowed and not self.closed:
+                self._cond.wait(timeout)
+            if self.overflowed or self.closed:
+                return None
+            events = list(self._pending.values())
+            self._pending.clear()
+            return events
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+
+class OrderEvents:
+    """In-process fan-out of order status and ETA updates to each user's open streams.
+
+    publish() never waits on a reader: updates land in each subscription's
+    bounded buffer and the stream writes them out on its own thread.  At
+    most `max_streams` streams are open at once, and `max_streams_per_user`
+    per user.  Fan-out is per process, so it only carries updates made by
+    the stream's own worker; streams also poll the orders table for the
+    changes other workers make.
+    """
+
+    def __init__(self, max_streams=100, max_streams_per_user=2, max_pending=64):
+        self.max_streams = max_streams
+        self.max_streams_per_user = max_streams_per_user
+        self.max_pending = max_pending
+        self._subscriptions = {}  # user_id -> set of Subscription
+        self._count = 0
+        self._lock = threading.Lock()
+        self._stats = {'opened': 0, 'rejected': 0, 'published': 0, 'delivered': 0, 'merged': 0, 'overflowed': 0}
+
+    def subscribe(self, user_id):
+        """Open a subscription for a user's orders, or raise StreamLimitReached."""
+        with self._lock:
+            mine = self._subscriptions.get(user_id, ())
+            if self._count >= self.max_streams or len(mine) >= self.max_streams_per_user:
+                self._stats['rejected'] += 1
+                raise StreamLimitReached(f"{self._count} streams open, {len(mine)} for this user")
+            subscription = Subscription(user_id, self.max_pending)
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+            self._stats['opened'] += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Close a subscription and free its slot (idempotent)."""
+        subscription.close()
+        with self._lock:
+            mine = self._subscriptions.get(subscription.user_id)
+            if mine is None or subscription not in mine:
+                return
+            mine.discard(subscription)
+            if not mine:
+                del self._subscriptions[subscription.user_id]
+            self._count -= 1
+            if subscription.overflowed:
+                self._stats['overflowed'] += 1
+
+    def publish(self, user_id, event):
+        """Send an update ({'order_id': ..., ...}) to every stream the user has open."""
+        with self._lock:
+            self._stats['published'] += 1
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            merged = subscription.push(event)
+            with self._lock:
+                self._stats['merged' if merged else 'delivered'] += 1
+
+    def active(self):
+        """Return the number of open streams."""
+        return self._count
+
+    def close(self):
+        """End every open stream, e.g. before the worker exits."""
+        with self._lock:
+            subscriptions = [s for mine in self._subscriptions.values() for s in mine]
+        for subscription in subscriptions:
+            subscription.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['streams'] = self._count
+        return stats
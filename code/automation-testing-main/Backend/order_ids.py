@@ -0,0 +1,167 @@
+import logging
+import secrets
+import threading
+import time
+import uuid
+from contextlib import closing
+
+PREFIX = 'ORD-'
+KEY_BYTES = 16
+
+# Crockford base32: sorts in the same order as the bytes it encodes.
+_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_DECODE = {char: value for value, char in enumerate(_ALPHABET)}
+_DECODE.update({char.lower(): value for char, value in _DECODE.items()})
+_TEXT_LENGTH = 26
+
+# Legacy "ORD-<8 hex>-<user id>" ids are stored as 00 'L' <4 bytes> <10-byte user id>.
+# Time-ordered keys start with the millisecond clock, whose top byte is non-zero since 2004.
+_LEGACY_MARK = b'\x00L'
+
+logger = logging.getLogger(__name__)
+
+
+class UlidGenerator:
+    """Time-ordered 128-bit order ids: 48-bit millisecond timestamp + 80-bit tail.
+
+    Within one millisecond the tail is incremented rather than redrawn, so the
+    ids one process hands out are strictly increasing (even if the clock steps
+    back), and new rows land at the right edge of the unique index.  Each
+    millisecond starts from a fresh random tail, so two workers collide only
+    with probability ~2**-79.  Call reseed() in a forked child.
+    """
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._tail = 0
+
+    def new_key(self):
+        """Return the next id in its 16-byte storage form."""
+        with self._lock:
+            ms = int(self._clock() * 1000)
+            if ms > self._last_ms:
+                # Top bit clear leaves 2**79 increments before the tail overflows.
+                self._last_ms, self._tail = ms, secrets.randbits(79)
+            else:
+                self._tail += 1
+                if self._tail >> 80:
+                    self._last_ms, self._tail = self._last_ms + 1, secrets.randbits(79)
+            value = (self._last_ms << 80) | self._tail
+        return value.to_bytes(KEY_BYTES, 'big')
+
+    def new(self, user_id=None):
+        """Return the next id in its public "ORD-..." text form."""
+        return key_to_text(self.new_key())
+
+    def reseed(self):
+        """Forget the inherited sequence so a forked child never repeats its parent."""
+        with self._lock:
+            self._last_ms = -1
+
+
+class LegacyGenerator:
+    """The original random "ORD-<8 hex>-<user id>" ids."""
+
+    def new(self, user_id):
+        return f"{PREFIX}{uuid.uuid4().hex[:8]}-{user_id}"
+
+    def reseed(self):
+        pass
+
+
+GENERATORS = {'ulid': UlidGenerator, 'legacy': LegacyGenerator}
+
+
+def make_generator(scheme):
+    """Build the order id generator named by ORDER_ID_SCHEME."""
+    try:
+        return GENERATORS[scheme]()
+    except KeyError:
+        raise ValueError(f"unknown order id scheme: {scheme!r}")
+
+
+def text_to_key(order_id):
+    """Return the 16-byte storage key for an order id; raises ValueError if malformed."""
+    if not isinstance(order_id, str) or not order_id.startswith(PREFIX):
+        raise ValueError(f"invalid order id: {order_id!r}")
+    body = order_id[len(PREFIX):]
+    if len(body) == _TEXT_LENGTH and body[0] in '01234567':
+        value = 0
+        for char in body:
+            if char not in _DECODE:
+                raise ValueError(f"invalid order id: {order_id!r}")
+            value = (value << 5) | _DECODE[char]
+        return value.to_bytes(KEY_BYTES, 'big')
+
+    random_part, _, user_id = body.partition('-')
+    if len(random_part) != 8 or not user_id.isdigit():
+        raise ValueError(f"invalid order id: {order_id!r}")
+    try:
+        return _LEGACY_MARK + bytes.fromhex(random_part) + int(user_id).to_bytes(10, 'big')
+    except (ValueError, OverflowError):
+        raise ValueError(f"invalid order id: {order_id!r}")
+
+
+def key_to_text(key):
+    """Return the "ORD-..." text form of a storage key."""
+    key = bytes(key)
+    if key[:2] == _LEGACY_MARK:
+        return f"{PREFIX}{key[2:6].hex()}-{int.from_bytes(key[6:], 'big')}"
+    value = int.from_bytes(key, 'big')
+    chars = []
+    for _ in range(_TEXT_LENGTH):
+        chars.append(_ALPHABET[value & 31])
+        value >>= 5
+    return PREFIX + ''.join(reversed(chars))
+
+
+def migrate_order_ids(get_connection, dialect, chunk_size=1000, log=logger.info):
+    """Convert orders.order_id from VARCHAR text to 16-byte keys, in committed chunks.
+
+    On MySQL the keys are written to a new BINARY(16) column which then
+    replaces order_id; SQLite stores the keys in place (column types there
+    are advisory).  Safe to re-run.  Run with order writes stopped.  Returns
+    the number of rows converted.
+    """
+    conn = get_connection()
+    if conn is None:
+        raise RuntimeError("database is unreachable")
+    done = 0
+    with closing(conn), closing(conn.cursor(dictionary=True)) as cursor:
+        if dialect == 'mysql':
+            cursor.execute(
+                "SELECT COLUMN_NAME AS name, DATA_TYPE AS type FROM information_schema.COLUMNS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'orders' "
+                "AND COLUMN_NAME IN ('order_id', 'order_key')")
+            columns = {row['name']: row['type'] for row in cursor.fetchall()}
+            if columns.get('order_id') == 'binary':
+                return 0
+            if 'order_key' not in columns:
+                cursor.execute("ALTER TABLE orders ADD COLUMN order_key BINARY(16) NULL")
+            pending = "order_key IS NULL"
+            update = "UPDATE orders SET order_key = %s WHERE id = %s"
+        else:
+            pending = "typeof(order_id) = 'text'"
+            update = "UPDATE orders SET order_id = %s WHERE id = %s"
+
+        after = 0
+        while True:
+            cursor.execute(f"SELECT id, order_id FROM orders WHERE id > %s AND {pending} ORDER BY id LIMIT %s",
+                           (after, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            for row in rows:
+                cursor.execute(update, (text_to_key(row['order_id']), row['id']))
+            conn.commit()
+            after = rows[-1]['id']
+            done += len(rows)
+            log(f"Converted {done} order ids (through id {after})")
+
+        if dialect == 'mysql':
+            cursor.execute(
+                "ALTER TABLE orders DROP INDEX order_id, DROP COLUMN order_id, "
+                "CHANGE COLUMN order_key order_id BINARY(16) NOT NULL, ADD UNIQUE KEY order_id (order_id)")
+    return done
@@ -0,0 +1,198 @@
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+from orders import insert_orders
+
+QUEUED = 'queued'
+PERSISTED = 'persisted'
+FAILED = 'failed'
+
+logger = logging.getLogger(__name__)
+
+
+class OrderWriter:
+    """Write-behind persistence for orders.
+
+    Request threads submit() validated orders onto a bounded queue and
+    return immediately.  A background thread drains the queue in batches of
+    up to `batch_size` (or whatever arrived within `flush_interval` seconds)
+    and writes each batch with multi-row INSERTs and a single commit.  If a
+    batch fails, its orders are retried one by one so a single bad order
+    cannot sink the rest.  `get_connection` returns a DB connection or None;
+    `after_insert(cursor, orders)`, if given, runs in the same transaction;
+    `on_status(order, status)`, if given, is called on every status change.
+    """
+
+    def __init__(self, get_connection, errors, batch_size=50, flush_interval=0.2,
+                 max_queue=1000, status_capacity=10000, log=logger.error, after_insert=None, on_status=None):
+        self._get_connection = get_connection
+        self._after_insert = after_insert
+        self._on_status = on_status
+        self._errors = errors
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._status = OrderedDict()  # order_id -> (status, user_id), oldest first
+        self._status_capacity = status_capacity
+        self._status_lock = threading.Lock()
+        self._log = log
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._stats = {
+            'enqueued': 0,
+            'rejected': 0,
+            'persisted': 0,
+            'failed': 0,
+            'batches': 0,
+            'last_batch_size': 0,
+            'max_depth': 0,
+        }
+
+    def start(self):
+        """Start the background writer thread if it is not already running."""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='order-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, order):
+        """Queue an order for persistence; returns False if the queue is full."""
+        self.start()
+        # Reported before the writer can see the order, so 'queued' never follows 'persisted'
+        self._set_status(order['order_id'], QUEUED, order['user_id'])
+        self._notify(order, QUEUED)
+        try:
+            self._queue.put_nowait(order)
+        except queue.Full:
+            self._forget(order['order_id'])
+            self._notify(order, FAILED)
+            self._stats['rejected'] += 1
+            return False
+        self._stats['enqueued'] += 1
+        self._stats['max_depth'] = max(self._stats['max_depth'], self._queue.qsize())
+        return True
+
+    def status(self, order_id, user_id=None):
+        """Return 'queued', 'persisted' or 'failed' for a tracked order, else None.
+
+        When user_id is given, orders belonging to other users are reported as unknown.
+        """
+        with self._status_lock:
+            entry = self._status.get(order_id)
+        if entry is None or (user_id is not None and entry[1] != user_id):
+            return None
+        return entry[0]
+
+    def flush(self, timeout=None):
+        """Block until every order queued so far has been written or failed."""
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout=None):
+        """Drain the queue and stop the writer thread."""
+        if self._thread is None:
+            return True
+        drained = self.flush(timeout)
+        self._stopping.set()
+        self._thread.join(timeout)
+        return drained
+
+    def stats(self):
+        """Return writer counters plus the current queue depth."""
+        stats = dict(self._stats)
+        stats['depth'] = self._queue.qsize()
+        stats['capacity'] = self._queue.maxsize
+        return stats
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if batch:
+                try:
+                    self._write(batch)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        self._stats['batches'] += 1
+        self._stats['last_batch_size'] = len(batch)
+        if self._commit(batch):
+            return
+        if len(batch) > 1:
+            for order in batch:
+                self._commit([order])
+        else:
+            self._mark(batch, FAILED)
+
+    def _commit(self, orders):
+        """Write orders in one transaction; True on success."""
+        conn = self._get_connection()
+        if conn is None:
+            if len(orders) == 1:
+                self._mark(orders, FAILED)
+            return False
+        with closing(conn), closing(conn.cursor(dictionary=True)) as cursor:
+            try:
+                insert_orders(cursor, orders)
+                if self._after_insert is not None:
+                    self._after_insert(cursor, orders)
+                conn.commit()
+            except self._errors as err:
+                self._log(f"Order write-behind error: {err}")
+                conn.rollback()
+                if len(orders) == 1:
+                    self._mark(orders, FAILED)
+                return False
+        self._mark(orders, PERSISTED)
+        return True
+
+    def _mark(self, orders, status):
+        self._stats[status] += len(orders)
+        for order in orders:
+            self._set_status(order['order_id'], status, order['user_id'])
+            self._notify(order, status)
+
+    def _notify(self, order, status):
+        if self._on_status is not None:
+            self._on_status(order, status)
+
+    def _set_status(self, order_id, status, user_id):
+        with self._status_lock:
+            self._status[order_id] = (status, user_id)
+            self._status.move_to_end(order_id)
+            while len(self._status) > self._status_capacity:
+                self._status.popitem(last=False)
+
+    def _forget(self, order_id):
+        with self._status_lock:
+            self._status.pop(order_id, None)
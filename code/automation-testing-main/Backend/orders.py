@@ -0,0 +1,217 @@
+import base64
+import binascii
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from order_ids import key_to_text, text_to_key
+
+
+class PhaseTimer:
+    """Accumulates wall-clock milliseconds per named phase of one request."""
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def server_timing(self):
+        """Render the phases as a Server-Timing header value."""
+        return ", ".join(f"{name};dur={ms:.2f}" for name, ms in self.phases.items())
+
+
+def count_items(cart_items):
+    """Collapse a list of menu item ids into {item_id: quantity}.
+
+    Raises ValueError (or TypeError) if an id is not an integer.
+    """
+    quantities = {}
+    for item_id in cart_items:
+        item_id = int(item_id)
+        quantities[item_id] = quantities.get(item_id, 0) + 1
+    return quantities
+
+
+def price_items(menu, cursor, item_ids):
+    """Return {item_id: unit price} for a cart in one set-based lookup.
+
+    Prices come from the menu snapshot; ids it does not know yet (e.g. an item
+    added since the last refresh) are resolved with a single IN query.
+    """
+    prices, missing = split_priced(menu, item_ids)
+    if missing:
+        cursor.execute(*menu_prices_statement(missing))
+        for row in cursor.fetchall():
+            prices[int(row['id'])] = float(row['price'])
+    return prices
+
+
+def split_priced(menu, item_ids):
+    """Return ({item_id: price} known to the menu snapshot, [ids it does not know])."""
+    prices, missing = {}, []
+    for item_id in item_ids:
+        price = menu.price(item_id)
+        if price is None:
+            missing.append(item_id)
+        else:
+            prices[item_id] = price
+    return prices, missing
+
+
+def menu_prices_statement(item_ids):
+    """(sql, params) looking up the price of each menu item id."""
+    placeholders = ", ".join(["%s"] * len(item_ids))
+    return f"SELECT id, price FROM menu_items WHERE id IN ({placeholders})", tuple(item_ids)
+
+
+def order_total(prices, quantities):
+    """Total a cart from unit prices and quantities, ignoring unpriced ids."""
+    return round(sum(prices.get(item_id, 0.0) * qty for item_id, qty in quantities.items()), 2)
+
+
+def insert_order_items(cursor, rows):
+    """Insert (orders.id, menu_item_id, quantity) rows with one multi-row INSERT."""
+    if not rows:
+        return
+    cursor.execute(*order_items_statement(rows))
+
+
+def order_items_statement(rows):
+    """(sql, params) for one multi-row order_items INSERT."""
+    placeholders = ", ".join(["(%s, %s, %s)"] * len(rows))
+    return (f"INSERT INTO order_items (order_id, menu_item_id, quantity) VALUES {placeholders}",
+            tuple(value for row in rows for value in row))
+
+
+def orders_statement(orders):
+    """(sql, params) for one multi-row orders INSERT."""
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(orders))
+    return ("INSERT INTO orders (user_id, location, total_price, estimated_delivery_time, order_id, idempotency_key, "
+            f"eta_baseline) VALUES {placeholders}",
+            tuple(value for order in orders for value in (
+                order['user_id'], order['location'], order['total_price'], order['delivery_time'],
+                text_to_key(order['order_id']), order.get('idempotency_key'), order.get('eta_baseline'))))
+
+
+def order_item_rows(orders, row_ids):
+    """(orders.id, menu_item_id, quantity) rows for a batch of inserted orders."""
+    return [
+        (row_ids[order['order_id']], item_id, qty)
+        for order in orders
+        for item_id, qty in order['items'].items()
+    ]
+
+
+def insert_orders(cursor, orders):
+    """Insert a batch of orders and all their items with two multi-row INSERTs.
+
+    Each order is a dict with user_id, location, total_price, delivery_time,
+    order_id, items ({menu_item_id: quantity}) and optionally
+    idempotency_key and eta_baseline.  Returns
+    {order_id: orders.id} for the inserted rows.
+    """
+    cursor.execute(*orders_statement(orders))
+    if len(orders) == 1:
+        row_ids = {orders[0]['order_id']: cursor.lastrowid}
+    else:
+        # Auto-increment ids of a multi-row insert are not guaranteed to be consecutive.
+        placeholders = ", ".join(["%s"] * len(orders))
+        cursor.execute(f"SELECT id, order_id FROM orders WHERE order_id IN ({placeholders})",
+                       tuple(text_to_key(order['order_id']) for order in orders))
+        row_ids = {key_to_text(row['order_id']): row['id'] for row in cursor.fetchall()}
+
+    insert_order_items(cursor, order_item_rows(orders, row_ids))
+    return row_ids
+
+
+def utc_epoch(value):
+    """A naive UTC order_date / delivered_at (datetime, or SQLite's text form) as a time.time() value."""
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+ORDER_COLUMNS = "id, order_id, order_date, location, total_price, estimated_delivery_time"
+
+
+def encode_cursor(row):
+    """Opaque page cursor for the (order_date, id) position just after `row`."""
+    raw = f"{row['order_date']}|{row['id']}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (order_date, id) from encode_cursor(); raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode('utf-8')
+        order_date, row_id = raw.rsplit('|', 1)
+        return order_date, int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"invalid cursor: {token!r}")
+
+
+def fetch_order_page(cursor, user_id, limit, after=None):
+    """Return (orders, next_cursor) for one page of a user's history, newest first.
+
+    Seeks past `after` (a decoded cursor) on the (user_id, order_date, id)
+    index instead of using OFFSET, so every page costs the same no matter
+    how deep it is.  next_cursor is None on the last page.
+    """
+    if after is None:
+        cursor.execute(
+            f"SELECT {ORDER_COLUMNS} FROM orders WHERE user_id = %s "
+            "ORDER BY order_date DESC, id DESC LIMIT %s",
+            (user_id, limit + 1)
+        )
+    else:
+        order_date, row_id = after
+        cursor.execute(
+            f"SELECT {ORDER_COLUMNS} FROM orders WHERE user_id = %s "
+            "AND (order_date < %s OR (order_date = %s AND id < %s)) "
+            "ORDER BY order_date DESC, id DESC LIMIT %s",
+            (user_id, order_date, order_date, row_id, limit + 1)
+        )
+    rows = cursor.fetchall()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def fetch_order_items(cursor, row_ids):
+    """Return {orders.id: [line items]} for a whole page of orders in one query."""
+    items = {row_id: [] for row_id in row_ids}
+    if not row_ids:
+        return items
+    placeholders = ", ".join(["%s"] * len(row_ids))
+    cursor.execute(
+        "SELECT oi.order_id, oi.menu_item_id, oi.quantity, m.name, m.price "
+        "FROM order_items oi JOIN menu_items m ON m.id = oi.menu_item_id "
+        f"WHERE oi.order_id IN ({placeholders}) ORDER BY oi.order_id, oi.id",
+        tuple(row_ids)
+    )
+    for row in cursor.fetchall():
+        items[row['order_id']].append({
+            'menu_item_id': row['menu_item_id'],
+            'name': row['name'],
+            'quantity': row['quantity'],
+            'price': float(row['price'])
+        })
+    return items
+
+
+def order_summary(row, items):
+    """JSON-friendly view of one orders row and its line items."""
+    return {
+        'order_id': key_to_text(row['order_id']),
+        'order_date': str(row['order_date']),
+        'location': row['location'],
+        'total_price': float(row['total_price']),
+        'delivery_time': row['estimated_delivery_time'],
+        'items': items
+    }
@@ -0,0 +1,144 @@
+import logging
+from contextlib import closing
+from datetime import datetime, timezone
+
+HOURLY_TABLE = 'sales_hourly_location'
+DAILY_TABLE = 'sales_daily_item'
+
+logger = logging.getLogger(__name__)
+
+_UPSERT = {
+    'mysql': "ON DUPLICATE KEY UPDATE {updates}",
+    'sqlite': "ON CONFLICT ({keys}) DO UPDATE SET {updates}",
+}
+_NEW_VALUE = {
+    'mysql': "VALUES({column})",
+    'sqlite': "excluded.{column}",
+}
+
+
+def _as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def aggregate(orders, placed_at=None):
+    """Fold orders into rollup deltas.
+
+    Each order needs location, total_price, items ({menu_item_id: quantity})
+    and prices ({menu_item_id: unit price}); its own placed_at wins over the
+    batch-wide one, which defaults to now (UTC).  Returns
+    ({(hour, location): [orders, items, revenue]}, {(day, item_id): [quantity, revenue]}).
+    """
+    default = placed_at or datetime.now(timezone.utc).replace(tzinfo=None)
+    hourly, daily = {}, {}
+    for order in orders:
+        when = _as_datetime(order.get('placed_at') or default)
+        hour = when.strftime('%Y-%m-%d %H:00:00')
+        day = when.strftime('%Y-%m-%d')
+
+        bucket = hourly.setdefault((hour, order['location']), [0, 0, 0.0])
+        bucket[0] += 1
+        bucket[1] += sum(order['items'].values())
+        bucket[2] += float(order['total_price'])
+
+        for item_id, qty in order['items'].items():
+            bucket = daily.setdefault((day, item_id), [0, 0.0])
+            bucket[0] += qty
+            bucket[1] += float(order['prices'].get(item_id, 0.0)) * qty
+    return hourly, daily
+
+
+def _upsert(dialect, table, keys, counters, rows):
+    columns = keys + counters
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * len(rows))
+    updates = ", ".join(f"{c} = {c} + {_NEW_VALUE[dialect].format(column=c)}" for c in counters)
+    sql = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES {placeholders} "
+           + _UPSERT[dialect].format(keys=", ".join(keys), updates=updates))
+    return sql, tuple(value for row in rows for value in row)
+
+
+def rollup_statements(dialect, orders, placed_at=None):
+    """(sql, params) upserts adding a batch of orders to both rollup tables.
+
+    Rows are sorted by key so concurrent transactions lock buckets in the
+    same order and cannot deadlock each other.
+    """
+    hourly, daily = aggregate(orders, placed_at)
+    statements = []
+    if hourly:
+        rows = [(hour, location, n, items, round(revenue, 2))
+                for (hour, location), (n, items, revenue) in sorted(hourly.items())]
+        statements.append(_upsert(dialect, HOURLY_TABLE, ['bucket_hour', 'location'],
+                                  ['order_count', 'item_count', 'revenue'], rows))
+    if daily:
+        rows = [(day, item_id, qty, round(revenue, 2))
+                for (day, item_id), (qty, revenue) in sorted(daily.items())]
+        statements.append(_upsert(dialect, DAILY_TABLE, ['bucket_day', 'menu_item_id'],
+                                  ['quantity', 'revenue'], rows))
+    return statements
+
+
+def apply_rollups(cursor, dialect, orders, placed_at=None):
+    """Add orders to the rollups inside the caller's transaction."""
+    for sql, params in rollup_statements(dialect, orders, placed_at):
+        cursor.execute(sql, params)
+
+
+def backfill(get_connection, dialect, chunk_size=1000, log=logger.info):
+    """Rebuild both rollup tables from order history, one committed chunk at a time.
+
+    Stop order writes first.  Only ids up to the maximum at the start are
+    scanned, but an order whose id was taken before then and that commits
+    after the tables are cleared is counted by both its own rollup upsert
+    and the scan.  Item revenue uses the current menu price, since
+    order_items does not record one.  Orders are bucketed by their UTC
+    order_date, as the live path does.  Returns the number of orders
+    processed.
+    """
+    conn = get_connection()
+    if conn is None:
+        raise RuntimeError("database is unreachable")
+    done = 0
+    with closing(conn), closing(conn.cursor(dictionary=True)) as cursor:
+        if dialect == 'mysql':
+            # MySQL hands TIMESTAMPs back in the session zone; SQLite stores UTC text
+            cursor.execute("SET time_zone = '+00:00'")
+        cursor.execute(f"DELETE FROM {HOURLY_TABLE}")
+        cursor.execute(f"DELETE FROM {DAILY_TABLE}")
+        cursor.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM orders")
+        high = cursor.fetchone()['max_id']
+        conn.commit()
+
+        after = 0
+        while True:
+            cursor.execute(
+                "SELECT id, location, order_date, total_price FROM orders "
+                "WHERE id > %s AND id <= %s ORDER BY id LIMIT %s",
+                (after, high, chunk_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            orders = {row['id']: {'location': row['location'], 'placed_at': row['order_date'],
+                                  'total_price': row['total_price'], 'items': {}, 'prices': {}}
+                      for row in rows}
+            placeholders = ", ".join(["%s"] * len(orders))
+            cursor.execute(
+                "SELECT oi.order_id, oi.menu_item_id, oi.quantity, m.price FROM order_items oi "
+                f"JOIN menu_items m ON m.id = oi.menu_item_id WHERE oi.order_id IN ({placeholders})",
+                tuple(orders)
+            )
+            for item in cursor.fetchall():
+                order = orders[item['order_id']]
+                item_id = item['menu_item_id']
+                order['items'][item_id] = order['items'].get(item_id, 0) + item['quantity']
+                order['prices'][item_id] = item['price']
+
+            apply_rollups(cursor, dialect, list(orders.values()))
+            conn.commit()
+            after = rows[-1]['id']
+            done += len(rows)
+            log(f"Backfilled {done} orders (through id {after} of {high})")
+    return done
@@ -0,0 +1,330 @@
+import math
+import re
+import sqlite3
+import threading
+import time
+
+import mysql.connector
+
+from db_pool import ConnectionPool, DeadlineExceeded
+
+# Every driver error the routes need to treat as "the database said no".
+DB_ERRORS = (mysql.connector.Error, sqlite3.Error)
+# The subset raised when a unique or foreign key constraint rejects a write.
+INTEGRITY_ERRORS = (mysql.connector.IntegrityError, sqlite3.IntegrityError)
+
+
+class MySQLEngine:
+    """MySQL storage behind a ConnectionPool."""
+
+    name = 'mysql'
+
+    def __init__(self, host, user, password, database, **pool_options):
+        # order_date and delivered_at are read and compared as UTC, whatever the server's zone
+        self._params = dict(host=host, user=user, password=password, database=database, time_zone='+00:00')
+        self.pool = ConnectionPool(self._connect, ping=lambda conn: conn.ping(reconnect=False), **pool_options)
+
+    def connect(self, deadline=None):
+        """Borrow a pooled connection; close() hands it back.
+
+        With a `deadline` (time.monotonic()), the pool wait and every later
+        SELECT are capped at the time remaining.
+        """
+        self.pool.fill(deadline)  # keep min_size connections warm
+        conn = self.pool.acquire(deadline)
+        return DeadlineConnection(conn, deadline) if deadline is not None else conn
+
+    def stats(self):
+        return self.pool.stats()
+
+    def close(self):
+        self.pool.close()
+
+    def _connect(self, timeout=None):
+        params = dict(self._params)
+        if timeout is not None:
+            # The driver takes whole seconds; round up so a short remaining deadline still gets a try
+            params['connection_timeout'] = max(1, math.ceil(timeout))
+        return mysql.connector.connect(**params)
+
+
+class DeadlineConnection:
+    """MySQL connection whose cursors stop issuing work once the deadline has passed."""
+
+    def __init__(self, conn, deadline):
+        self._conn = conn
+        self._deadline = deadline
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return DeadlineCursor(self._conn.cursor(*args, **kwargs), self._deadline)
+
+    def close(self):
+        self._conn.close()
+
+
+class DeadlineCursor:
+    """Cursor that refuses statements after the deadline and bounds SELECTs server-side."""
+
+    def __init__(self, cursor, deadline):
+        self._cursor = cursor
+        self._deadline = deadline
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, sql, params=()):
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("request deadline passed before the statement ran")
+        if sql.startswith('SELECT '):
+            # MySQL aborts the query (error 3024) once it runs past the hint
+            sql = f"SELECT /*+ MAX_EXECUTION_TIME({math.ceil(remaining * 1000)}) */ {sql[7:]}"
+        return self._cursor.execute(sql, params)
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteEngine:
+    """Embedded SQLite storage for kiosks and local perf runs.
+
+    Each thread keeps one connection in WAL mode, so readers never block the
+    writer.  sqlite3 caches compiled statements per connection, so the
+    %s -> ? translation below is also cached to keep statements prepared.
+    The schema is bootstrapped from backend.sql on first use.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path, schema_path=None):
+        self.path = path
+        self.schema_path = schema_path
+        self._local = threading.local()
+        self._bootstrap_lock = threading.Lock()
+        self._bootstrapped = False
+        self._stats = {'connections': 0}
+
+    def connect(self, deadline=None):
+        """Return this thread's connection; close() only ends any open transaction.
+
+        With a `deadline` (time.monotonic()), statements still running when
+        it passes are interrupted.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            raw = sqlite3.connect(self.path, timeout=5.0, cached_statements=256)
+            try:
+                raw.execute("PRAGMA journal_mode=WAL")
+                raw.execute("PRAGMA synchronous=NORMAL")
+                raw.execute("PRAGMA foreign_keys=ON")
+                self._bootstrap(raw)
+            except Exception:
+                # Never hand out (or keep) a connection to a half-bootstrapped schema
+                raw.close()
+                raise
+            conn = self._local.conn = SQLiteConnection(raw)
+            self._stats['connections'] += 1
+        if deadline is not None:
+            conn.set_deadline(deadline)
+        return conn
+
+    def stats(self):
+        return dict(self._stats)
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn._raw.close()
+            self._local.conn = None
+
+    def _bootstrap(self, raw):
+        if self._bootstrapped or self.schema_path is None:
+            return
+        with self._bootstrap_lock:
+            if not self._bootstrapped:
+                with open(self.schema_path, encoding='utf-8') as f:
+                    bootstrap_sqlite(raw, f.read())
+                self._bootstrapped = True
+
+
+class SQLiteConnection:
+    """Gives a sqlite3 connection the mysql.connector surface the app uses."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def cursor(self, dictionary=False):
+        return SQLiteCursor(self._raw.cursor(), dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._raw.in_transaction
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def ping(self, reconnect=False):
+        self._raw.execute("SELECT 1")
+
+    def set_deadline(self, deadline):
+        """Interrupt statements (sqlite3.OperationalError) still running at `deadline`."""
+        self._raw.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+
+    def close(self):
+        # The connection is reused by this thread; just never leak a transaction or a deadline.
+        self._raw.set_progress_handler(None, 0)
+        if self._raw.in_transaction:
+            self._raw.rollback()
+
+
+_PLACEHOLDERS = {}
+
+
+def _translate(sql):
+    translated = _PLACEHOLDERS.get(sql)
+    if translated is None:
+        translated = _PLACEHOLDERS[sql] = sql.replace('%s', '?')
+    return translated
+
+
+class SQLiteCursor:
+    """Cursor wrapper accepting %s placeholders and returning dict rows on request."""
+
+    def __init__(self, raw, dictionary):
+        self._raw = raw
+        self._dictionary = dictionary
+
+    def execute(self, sql, params=()):
+        self._raw.execute(_translate(sql), params)
+
+    def executemany(self, sql, seq_of_params):
+        self._raw.executemany(_translate(sql), seq_of_params)
+
+    def fetchone(self):
+        row = self._raw.fetchone()
+        return self._row(row) if row is not None else None
+
+    def fetchall(self):
+        return [self._row(row) for row in self._raw.fetchall()]
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    def close(self):
+        self._raw.close()
+
+    def _row(self, row):
+        if not self._dictionary:
+            return row
+        return {col[0]: value for col, value in zip(self._raw.description, row)}
+
+
+_AUTO_INCREMENT = re.compile(r'\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', re.IGNORECASE)
+_INSERT_TABLE = re.compile(r'^INSERT\s+INTO\s+(\w+)', re.IGNORECASE)
+_CREATE_TABLE = re.compile(r'^CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\((.*)\)$',
+                           re.IGNORECASE | re.DOTALL)
+# First words of table-level constraints, as opposed to column definitions
+_TABLE_CONSTRAINTS = frozenset({'PRIMARY', 'FOREIGN', 'UNIQUE', 'KEY', 'INDEX', 'CONSTRAINT', 'CHECK'})
+
+
+def sqlite_statements(mysql_script):
+    """Translate the CREATE TABLE / CREATE INDEX / INSERT statements of backend.sql for SQLite.
+
+    Server administration (CREATE DATABASE, USE, users and grants) and ad-hoc
+    queries are dropped.
+    """
+    lines = []
+    for line in mysql_script.splitlines():
+        line = re.sub(r'(#|--).*$', '', line)
+        if line.strip():
+            lines.append(line)
+
+    statements = []
+    for statement in "\n".join(lines).split(';'):
+        statement = statement.strip()
+        upper = statement.upper()
+        if upper.startswith('CREATE TABLE'):
+            statement = _AUTO_INCREMENT.sub('INTEGER PRIMARY KEY AUTOINCREMENT', statement)
+            if 'IF NOT EXISTS' not in upper:
+                statement = re.sub(r'^CREATE\s+TABLE', 'CREATE TABLE IF NOT EXISTS', statement, flags=re.IGNORECASE)
+        elif upper.startswith(('CREATE INDEX', 'CREATE UNIQUE INDEX')):
+            if 'IF NOT EXISTS' not in upper:
+                statement = re.sub(r'INDEX', 'INDEX IF NOT EXISTS', statement, count=1, flags=re.IGNORECASE)
+        elif not upper.startswith('INSERT INTO'):
+            continue
+        statements.append(statement)
+    return statements
+
+
+def _column_definitions(create_table):
+    """Return (table, [(column, definition)]) for a CREATE TABLE statement."""
+    match = _CREATE_TABLE.match(create_table)
+    parts, current, depth = [], [], 0
+    for char in match.group(2):
+        if char == ',' and depth == 0:
+            parts.append(''.join(current))
+            current = []
+            continue
+        depth += (char == '(') - (char == ')')
+        current.append(char)
+    parts.append(''.join(current))
+    columns = []
+    for part in (part.strip() for part in parts):
+        name = part.split(None, 1)[0]
+        if name.upper() not in _TABLE_CONSTRAINTS:
+            columns.append((name, part))
+    return match.group(1), columns
+
+
+def bootstrap_sqlite(raw, mysql_script):
+    """Create missing tables, add columns missing from existing ones and seed tables that start out empty.
+
+    Tables come before their indexes in backend.sql, so a column added here
+    exists by the time an index over it is created.
+    """
+    existing = {row[0] for row in raw.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for statement in sqlite_statements(mysql_script):
+        match = _INSERT_TABLE.match(statement)
+        if match is not None:
+            if match.group(1) not in existing:
+                raw.execute(statement)
+            continue
+        if _CREATE_TABLE.match(statement):
+            table, columns = _column_definitions(statement)
+            if table in existing:
+                present = {row[1] for row in raw.execute(f"PRAGMA table_info({table})")}
+                for column, definition in columns:
+                    if column not in present:
+                        raw.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+        raw.execute(statement)
+    raw.commit()
+
+
+def create_engine(config, schema_path=None):
+    """Build the storage engine selected by config['DB_ENGINE']."""
+    if config['DB_ENGINE'] == 'sqlite':
+        return SQLiteEngine(config['SQLITE_PATH'], schema_path)
+    return MySQLEngine(
+        config['MYSQL_HOST'],
+        config['MYSQL_USER'],
+        config['MYSQL_PASSWORD'],
+        config['MYSQL_DB'],
+        min_size=config['DB_POOL_MIN_SIZE'],
+        max_size=config['DB_POOL_MAX_SIZE'],
+        timeout=config['DB_POOL_TIMEOUT'],
+        max_lifetime=config['DB_POOL_MAX_LIFETIME'],
+        validate_on_borrow=config['DB_POOL_VALIDATE_ON_BORROW'],
+        ping_interval=config['DB_POOL_PING_INTERVAL'],
+        connect_timeout=config['DB_CONNECT_TIMEOUT']
+    )
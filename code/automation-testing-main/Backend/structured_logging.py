@@ -0,0 +1,133 @@
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else arrived through `extra=` and becomes a JSON field.
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, then any context or `extra` fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps each record with fields from `context()` (e.g. the current request) unless already set."""
+
+    def __init__(self, context):
+        super().__init__()
+        self._context = context
+
+    def filter(self, record):
+        for key, value in self._context().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Passes only a `rate` share of records logged with extra={'sampled': True}; others always pass."""
+
+    def __init__(self, rate, draw=random.random):
+        super().__init__()
+        self.rate = rate
+        self._draw = draw
+
+    def filter(self, record):
+        return not getattr(record, 'sampled', False) or self._draw() < self.rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that never waits: when the queue is full the record is dropped and counted.
+
+    Only the message arguments and any traceback are rendered on the
+    calling thread; JSON encoding and the write happen on the listener.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Queue-backed JSON logging for a logger tree (the root logger by default).
+
+    Callers only filter and enqueue; a listener thread formats and writes
+    to `stream`.  At most `queue_size` records wait at once, after which new
+    ones are dropped rather than blocking the caller.  Call after_fork() in a
+    forked child, since the listener thread does not survive the fork.
+    """
+
+    def __init__(self, logger_name=None, level=logging.INFO, stream=None, queue_size=10000,
+                 sample_rate=1.0, context=None):
+        self.queue_size = queue_size
+        self.handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+        self.handler.addFilter(SamplingFilter(sample_rate))
+        if context is not None:
+            self.handler.addFilter(ContextFilter(context))
+        self.output = logging.StreamHandler(stream or sys.stdout)
+        self.output.setFormatter(JsonFormatter())
+        self.listener = QueueListener(self.handler.queue, self.output)
+
+        self.logger = logging.getLogger(logger_name)
+        self.logger.setLevel(level)
+        self.logger.addHandler(self.handler)
+
+    def start(self):
+        """Start the listener thread."""
+        if self.listener._thread is None:
+            self.listener.start()
+
+    def stop(self):
+        """Write out everything queued so far and stop the listener (idempotent)."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def after_fork(self):
+        """Give a forked child its own queue and listener thread."""
+        self.handler.queue = self.listener.queue = queue.Queue(self.queue_size)
+        self.listener._thread = None
+        self.start()
+
+    def close(self):
+        """Stop and detach from the logger."""
+        self.stop()
+        self.logger.removeHandler(self.handler)
+
+    def stats(self):
+        return {'queued': self.handler.queue.qsize(), 'dropped': self.handler.dropped}
@@ -0,0 +1,47 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app, SCHEMA_PATH, calculate_delivery_time
+from dispatch import DispatchScheduler
+from eta import EtaEngine
+from idempotency import IdempotencyCache
+from menu_catalog import MenuCatalog
+from storage import SQLiteEngine
+from user_cache import UserLookupCache
+
+@pytest.fixture
+def engine(tmp_path):
+    """A fresh SQLite database built from backend.sql."""
+    engine = SQLiteEngine(str(tmp_path / 'kiosk.db'), SCHEMA_PATH)
+    yield engine
+    engine.close()
+
+@pytest.fixture
+def app_state():
+    """Fresh per-process caches and models, so no test sees another's menu, users, queue or keys."""
+    with patch.object(app_module, 'menu_catalog', MenuCatalog(app_module._load_menu_items)), \
+            patch.object(app_module, 'user_cache', UserLookupCache()), \
+            patch.object(app_module, 'eta_engine', EtaEngine(calculate_delivery_time, app_module._load_eta_state)), \
+            patch.object(app_module, 'dispatcher', DispatchScheduler(app_module.LOCATION_TIMES.get)), \
+            patch.object(app_module, 'idempotent_orders', IdempotencyCache()):
+        yield app_module
+
+@pytest.fixture
+def sqlite_client(engine, app_state):
+    """Run the app against a fresh SQLite database instead of MySQL."""
+    app.config['TESTING'] = True
+    with patch.object(app_module, '_db_engine', engine):
+        with app.test_client() as client:
+            yield client
+
+@pytest.fixture
+def customer(sqlite_client):
+    """sqlite_client signed in as the seeded user 1."""
+    with sqlite_client.session_transaction() as sess:
+        sess['user_id'] = 1
+    return sqlite_client
@@ -0,0 +1,218 @@
+import asyncio
+import pytest
+import sqlite3
+import sys
+import os
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from admission import AdmissionController, AsyncAdmissionController, Overloaded
+from app import app, SCHEMA_PATH
+from db_pool import ConnectionPool, DeadlineExceeded, PoolExhausted
+from storage import DeadlineCursor, SQLiteEngine
+
+def make_controller(**kwargs):
+    options = dict(queue_size=8, max_wait=0.05, retry_after=3)
+    options.update(kwargs)
+    return AdmissionController(3, {'orders': 3, 'browse': 2}, **options)
+
+def test_browse_limit_leaves_room_for_orders():
+    """Test that browsing cannot take the slots held back for orders."""
+    controller = make_controller()
+    controller.admit('browse')
+    controller.admit('browse')
+    with pytest.raises(Overloaded) as excinfo:
+        controller.admit('browse')
+    assert excinfo.value.retry_after == 3
+    controller.admit('orders')
+    stats = controller.stats()
+    assert stats['running_browse'] == 2 and stats['running_orders'] == 1
+    assert stats['timed_out'] == 1
+
+def test_default_limits_bind_below_server_threads():
+    """Test that, by default, browsing saturates before the worker's threads do, leaving one for orders."""
+    assert app.config['ADMISSION_CAPACITY'] == app.config['DB_POOL_MAX_SIZE']
+    controller = AdmissionController(
+        app.config['ADMISSION_CAPACITY'],
+        {'orders': app.config['ADMISSION_CAPACITY'], 'browse': app.config['ADMISSION_BROWSE_LIMIT']},
+        max_wait=5, no_wait=app_module.admission.no_wait
+    )
+    threads = min(app.config['WEB_THREADS'], app.config['DB_POOL_MAX_SIZE'])
+    for _ in range(threads - 1):
+        controller.admit('browse')
+    start = time.monotonic()
+    with pytest.raises(Overloaded):
+        controller.admit('browse')
+    assert time.monotonic() - start < 0.5
+    controller.admit('orders')
+
+def test_browse_fails_fast_at_its_limit():
+    """Test that a no_wait class is rejected at once instead of holding its thread while it waits."""
+    controller = make_controller(max_wait=5, no_wait=('browse',))
+    controller.admit('browse')
+    controller.admit('browse')
+    start = time.monotonic()
+    with pytest.raises(Overloaded):
+        controller.admit('browse')
+    assert time.monotonic() - start < 0.5
+    assert controller.stats()['rejected'] == 1 and controller.stats()['waiting_browse'] == 0
+
+def test_full_queue_sheds_immediately():
+    """Test that a class with a full wait queue is rejected without waiting."""
+    controller = make_controller(queue_size=0, max_wait=5)
+    for _ in range(3):
+        controller.admit('orders')
+    start = time.monotonic()
+    with pytest.raises(Overloaded):
+        controller.admit('orders')
+    assert time.monotonic() - start < 0.5
+    assert controller.stats()['rejected'] == 1
+
+def test_deadline_bounds_the_wait():
+    """Test that a request never queues past its own deadline."""
+    controller = make_controller(max_wait=5)
+    for _ in range(3):
+        controller.admit('orders')
+    start = time.monotonic()
+    with pytest.raises(Overloaded):
+        controller.admit('orders', deadline=time.monotonic() + 0.05)
+    assert time.monotonic() - start < 1
+
+def test_orders_are_admitted_before_browsing():
+    """Test that a freed slot goes to a waiting order ahead of a waiting page view."""
+    controller = AdmissionController(1, {'orders': 1, 'browse': 1}, max_wait=2)
+    controller.admit('browse')
+    admitted = []
+
+    def wait_for(route_class):
+        controller.admit(route_class)
+        admitted.append(route_class)
+        controller.release(route_class)
+
+    browse = threading.Thread(target=wait_for, args=('browse',))
+    browse.start()
+    while not controller.stats()['waiting_browse']:
+        time.sleep(0.001)
+    orders = threading.Thread(target=wait_for, args=('orders',))
+    orders.start()
+    while not controller.stats()['waiting_orders']:
+        time.sleep(0.001)
+
+    controller.release('browse')
+    browse.join()
+    orders.join()
+    assert admitted == ['orders', 'browse']
+    assert controller.stats()['running'] == 0
+
+def test_async_controller_waits_on_the_event_loop():
+    """Test that coroutines queue per class on the loop, time out, and take a freed slot."""
+    controller = AsyncAdmissionController({'orders': 2, 'browse': 1}, max_wait=0.05, retry_after=4)
+
+    async def scenario():
+        await controller.admit('browse')
+        await controller.admit('orders')
+        with pytest.raises(Overloaded) as excinfo:
+            await controller.admit('browse')
+        assert excinfo.value.retry_after == 4
+        with pytest.raises(Overloaded):
+            await controller.admit('browse', deadline=time.monotonic() - 1)
+        # A waiter gets the slot as soon as it is released
+        waiter = asyncio.ensure_future(controller.admit('browse', deadline=time.monotonic() + 5))
+        await asyncio.sleep(0)
+        controller.release('browse')
+        await waiter
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats['running_browse'] == 1 and stats['running_orders'] == 1
+    assert stats['timed_out'] == 2
+
+def test_pool_wait_respects_deadline():
+    """Test that a caller deadline shortens the pool wait and is reported as such."""
+    pool = ConnectionPool(lambda timeout: object(), lambda conn: None, max_size=1, timeout=5)
+    held = pool.acquire()
+    with pytest.raises(DeadlineExceeded):
+        pool.acquire(deadline=time.monotonic() + 0.05)
+    # The pool's own, shorter timeout is still PoolExhausted
+    pool.timeout = 0.01
+    with pytest.raises(PoolExhausted):
+        pool.acquire(deadline=time.monotonic() + 5)
+    held.close()
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=()):
+        self.statements.append(sql)
+
+def test_deadline_cursor_bounds_selects():
+    """Test that SELECTs carry the remaining time as a MAX_EXECUTION_TIME hint."""
+    raw = RecordingCursor()
+    cursor = DeadlineCursor(raw, time.monotonic() + 2)
+    cursor.execute("SELECT id FROM users WHERE scu_email = %s", ('a@scu.edu',))
+    cursor.execute("INSERT INTO orders (user_id) VALUES (%s)", (1,))
+    hinted, insert = raw.statements
+    assert hinted.startswith("SELECT /*+ MAX_EXECUTION_TIME(")
+    assert 1000 < int(hinted.split('(')[1].split(')')[0]) <= 2000
+    assert hinted.endswith("id FROM users WHERE scu_email = %s")
+    assert insert.startswith("INSERT")
+
+    with pytest.raises(DeadlineExceeded):
+        DeadlineCursor(raw, time.monotonic() - 1).execute("SELECT 1")
+
+def test_sqlite_statement_interrupted_at_deadline(tmp_path):
+    """Test that a runaway SQLite query is interrupted when the deadline passes."""
+    engine = SQLiteEngine(str(tmp_path / 'deadline.db'), SCHEMA_PATH)
+    conn = engine.connect(deadline=time.monotonic() + 0.05)
+    cursor = conn.cursor()
+    with pytest.raises(sqlite3.OperationalError):
+        cursor.execute("WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) SELECT COUNT(*) FROM n")
+    conn.close()
+    # Once handed back, the connection carries no deadline
+    cursor = engine.connect().cursor()
+    cursor.execute("SELECT COUNT(*) FROM menu_items")
+    engine.close()
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['name'] = 'Test User'
+        yield client
+
+def test_overloaded_routes_answer_503(client):
+    """Test that shed requests get a fast 503 with Retry-After while exempt routes still work."""
+    saturated = AdmissionController(1, {'orders': 1, 'browse': 1}, max_wait=0, retry_after=7)
+    saturated.admit('orders')
+    with patch.object(app_module, 'admission', saturated):
+        response = client.get('/index')
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '7'
+        assert client.post('/place_order', json={'cart_items': [1], 'location': 'scdi'}).status_code == 503
+        metrics = client.get('/metrics')
+    assert metrics.status_code == 200
+    assert b'http_requests_shed_total{reason="overloaded"}' in metrics.data
+
+class ExpiredEngine:
+    name = 'mysql'
+
+    def connect(self, deadline=None):
+        assert deadline is not None
+        raise DeadlineExceeded("request deadline passed while waiting for a connection")
+
+def test_deadline_exceeded_answers_503(client):
+    """Test that running out of request deadline on the database is a 503, not a timeout."""
+    with patch.object(app_module, '_db_engine', ExpiredEngine()):
+        response = client.get('/orders')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(app.config['ADMISSION_RETRY_AFTER'])
+
+if __name__ == '__main__':
+    pytest.main()
@@ -40,7 +40,7 @@ def test_successful_login(client):
     with patch('app.get_db_connection') as mock_db:
         # Using sample data: Ritika Verma, rverma@scu.edu, 1234567890
         mock_cursor = MagicMock()
-        mock_cursor.fetchone.return_value = {'id': 1, 'name': 'Ritika Verma'}
+        mock_cursor.fetchone.return_value = {'id': 1, 'name': 'Ritika Verma', 'scu_id': '1234567890'}
         mock_db.return_value.cursor.return_value = mock_cursor
         
         response = client.post('/', data={
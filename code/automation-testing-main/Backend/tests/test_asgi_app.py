@@ -0,0 +1,164 @@
+import pytest
+import sys
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from unittest.mock import patch
+
+pytest.importorskip('quart')
+pytest.importorskip('aiomysql')
+pytest.importorskip('asgiref')
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asgi_app
+from admission import AsyncAdmissionController
+from app import calculate_delivery_time
+from cart_store import MemoryCartBackend
+from dispatch import DispatchScheduler
+from eta import EtaEngine
+from idempotency import IdempotencyCache
+from menu_catalog import MenuCatalog
+from order_events import OrderEvents
+
+MENU = [{'id': 1, 'name': 'Cereal', 'category': 'Breakfast', 'price': Decimal('5.00')},
+        {'id': 2, 'name': 'Pancakes', 'category': 'Breakfast', 'price': Decimal('8.00')}]
+
+@pytest.fixture
+def client():
+    asgi_app.asgi.config['TESTING'] = True
+    with patch.object(asgi_app, 'menu_catalog', MenuCatalog(lambda: list(MENU))), \
+            patch.object(asgi_app.sync_app, 'cart_store', MemoryCartBackend()):
+        yield asgi_app.asgi.test_client()
+
+def test_cart_endpoints_async(client):
+    """Test add, remove and total on the coroutine routes."""
+    async def scenario():
+        await client.post('/add_to_cart', json={'item_id': 1, 'name': 'Cereal', 'price': 5})
+        await client.post('/add_to_cart', json={'item_id': 2, 'name': 'Pancakes', 'price': 8})
+        total = await (await client.get('/cart_total')).get_json()
+        await client.post('/remove_from_cart', json={'item_id': 1})
+        remaining = await (await client.get('/cart_total')).get_json()
+        invalid = await client.post('/add_to_cart', json={'item_id': 99, 'name': 'Nope', 'price': 1})
+        missing = await client.post('/remove_from_cart', json={'name': 'Cereal'})
+        return total, remaining, invalid.status_code, missing.status_code
+
+    total, remaining, invalid_status, missing_status = asyncio.run(scenario())
+    assert total == {'total': 13.0}
+    assert remaining == {'total': 8.0}
+    assert invalid_status == missing_status == 400
+
+def test_place_order_validation_async(client):
+    """Test that invalid orders are rejected before any database work."""
+    async def scenario():
+        unauthorized = await client.post('/place_order', json={'cart_items': [1], 'location': 'scdi'})
+        async with client.session_transaction() as sess:
+            sess['user_id'] = 1
+        bad_location = await client.post('/place_order', json={'cart_items': [1], 'location': 'Nowhere'})
+        empty = await client.post('/place_order', json={'cart_items': [], 'location': 'scdi'})
+        return unauthorized.status_code, bad_location.status_code, empty.status_code
+
+    assert asyncio.run(scenario()) == (401, 400, 400)
+
+class FakeCursor:
+    """aiomysql cursor stand-in: records statements, knows no menu items beyond the snapshot."""
+
+    def __init__(self):
+        self.statements = []
+        self.lastrowid = 0
+
+    async def execute(self, sql, params=()):
+        self.statements.append(sql)
+        if sql.startswith('INSERT INTO orders '):
+            self.lastrowid += 1
+
+    async def fetchall(self):
+        return []
+
+    async def fetchone(self):
+        return None
+
+class FakeConnection:
+    def __init__(self):
+        self.commits = 0
+
+    async def begin(self):
+        pass
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+@pytest.fixture
+def database():
+    """Replace the aiomysql pool with one recording connection and cursor."""
+    conn, cursor = FakeConnection(), FakeCursor()
+
+    @asynccontextmanager
+    async def db_cursor():
+        yield conn, cursor
+
+    sync_app = asgi_app.sync_app
+    with patch.object(asgi_app, 'db_cursor', db_cursor), \
+            patch.object(sync_app, 'eta_engine', EtaEngine(calculate_delivery_time, lambda *cutoffs: ({}, []))), \
+            patch.object(sync_app, 'dispatcher', DispatchScheduler(sync_app.LOCATION_TIMES.get)), \
+            patch.object(sync_app, 'idempotent_orders', IdempotencyCache()), \
+            patch.object(sync_app, 'order_events', OrderEvents()):
+        yield conn, cursor
+
+def test_place_order_shares_the_sync_pipeline(client, database):
+    """Test that the async route rejects unknown items, publishes events and replays idempotent retries."""
+    conn, cursor = database
+    sync_app = asgi_app.sync_app
+    events = sync_app.order_events.subscribe(1)
+
+    async def scenario():
+        async with client.session_transaction() as sess:
+            sess['user_id'] = 1
+        unknown = await client.post('/place_order', json={'cart_items': [1, 99], 'location': 'scdi'})
+        headers = {'Idempotency-Key': 'retry-me'}
+        first = await client.post('/place_order', json={'cart_items': [1, 2], 'location': 'scdi'}, headers=headers)
+        again = await client.post('/place_order', json={'cart_items': [1, 2], 'location': 'scdi'}, headers=headers)
+        return unknown, first, again, await first.get_json(), await again.get_json()
+
+    unknown, first, again, placed, replayed = asyncio.run(scenario())
+    assert unknown.status_code == 400
+    assert placed == replayed and again.headers['Idempotent-Replayed'] == 'true'
+    assert 'commit;dur=' in first.headers['Server-Timing']
+    # One price lookup for the unknown id, then one order: orders, order_items and both rollups
+    assert [sql.split()[0] for sql in cursor.statements] == ['SELECT', 'INSERT', 'INSERT', 'INSERT', 'INSERT']
+    assert conn.commits == 1
+    assert events.get(0) == [{'order_id': placed['order_id'], 'status': 'persisted',
+                              'eta_minutes': placed['delivery_time']}]
+    assert sync_app.eta_engine.state()['scdi']['outstanding'] == 1
+    assert [run['order_ids'] for run in sync_app.dispatcher.runs()] == [[placed['order_id']]]
+
+def test_async_routes_are_admission_controlled(client):
+    """Test that the coroutine routes are shed by their own event-loop controller."""
+    saturated = AsyncAdmissionController({'orders': 0, 'browse': 0}, max_wait=0, retry_after=7)
+
+    async def scenario():
+        busy = await client.get('/cart_total')
+        metrics = await client.get('/metrics')
+        return busy, metrics
+
+    with patch.object(asgi_app, 'admission', saturated):
+        busy, metrics = asyncio.run(scenario())
+    assert busy.status_code == 503 and busy.headers['Retry-After'] == '7'
+    assert metrics.status_code == 200
+
+def test_async_admission_is_sized_to_the_pool():
+    """Test that async limits follow the aiomysql pool, not the Flask controller's thread budget."""
+    assert asgi_app.admission.limits == {'orders': asgi_app.asgi.config['DB_POOL_MAX_SIZE'],
+                                         'browse': asgi_app.asgi.config['DB_POOL_MAX_SIZE'] - 1}
+
+def test_other_routes_fall_through_to_flask():
+    """Test that only the ported routes are claimed by the async app."""
+    assert {'/', '/index', '/place_order', '/add_to_cart', '/cart_total'} <= asgi_app.ASYNC_PATHS
+    assert '/orders' not in asgi_app.ASYNC_PATHS
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,89 @@
+import pytest
+import sys
+import os
+import gzip
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app
+from assets import IMMUTABLE, AssetManifest
+
+@pytest.fixture
+def manifest(tmp_path):
+    (tmp_path / 'SCU.jpg').write_bytes(b'\xff\xd8jpeg-bytes')
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'css' / 'site.css').write_text('body { color: black; }\n' * 200)
+    return AssetManifest(str(tmp_path)).build()
+
+@pytest.fixture
+def client(manifest):
+    app.config['TESTING'] = True
+    with patch.object(app_module, 'assets', manifest):
+        with app.test_client() as client:
+            yield client
+
+def test_manifest_fingerprints_content(manifest, tmp_path):
+    """Test that URLs carry a content hash that changes with the file."""
+    url = manifest.url('SCU.jpg')
+    assert url.startswith('/assets/') and url.endswith('/SCU.jpg')
+    assert manifest.url('css/site.css').endswith('/css/site.css')
+    assert manifest.url('missing.png') == '/static/missing.png'
+
+    (tmp_path / 'SCU.jpg').write_bytes(b'\xff\xd8other-bytes')
+    assert AssetManifest(str(tmp_path)).build().url('SCU.jpg') != url
+
+def test_missing_static_folder_falls_back(tmp_path):
+    """Test that a tree without static/ keeps plain static URLs."""
+    manifest = AssetManifest(str(tmp_path / 'static')).build()
+    assert len(manifest) == 0
+    assert manifest.url('SCU.jpg') == '/static/SCU.jpg'
+
+def test_hashed_asset_is_immutable(client, manifest):
+    """Test that fingerprinted assets are served with far-future caching."""
+    response = client.get(manifest.url('SCU.jpg'))
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == IMMUTABLE
+    assert response.data == b'\xff\xd8jpeg-bytes'
+    assert client.get('/assets/000000000000/SCU.jpg').status_code == 404
+
+def test_text_asset_precompressed(client, manifest):
+    """Test that text assets are served from their pre-compressed variant."""
+    response = client.get(manifest.url('css/site.css'), headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == b'body { color: black; }\n' * 200
+
+def test_html_compressed_and_revalidated(client):
+    """Test that pages are gzip-encoded on request and answer If-None-Match with 304."""
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert b'SCU' in gzip.decompress(response.data)
+
+    etag = response.headers['ETag']
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+def test_identity_without_accept_encoding(client):
+    """Test that clients that do not ask for compression get the plain body."""
+    response = client.get('/')
+    assert 'Content-Encoding' not in response.headers
+    assert b'SCU' in response.data
+
+def test_session_pages_are_private(customer):
+    """Test that per-user pages keep their ETag but are kept out of shared caches, unlike the public menu."""
+    with customer.session_transaction() as sess:
+        sess['name'] = 'Admin User'
+    response = customer.get('/index')
+    assert response.status_code == 200 and response.headers['ETag']
+    assert 'private' in response.headers['Cache-Control']
+    assert 'Cookie' in response.headers['Vary']
+
+    response = customer.get('/api/menu')
+    assert response.headers['Cache-Control'].startswith('public')
+    assert 'private' not in response.headers['Cache-Control']
+
+if __name__ == '__main__':
+    pytest.main()
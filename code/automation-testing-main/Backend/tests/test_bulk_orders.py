@@ -0,0 +1,97 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app, calculate_delivery_time
+from eta import EtaEngine
+
+@pytest.fixture
+def client(customer):
+    return customer
+
+def count_rows(table):
+    conn = app_module.get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(f"SELECT COUNT(*) AS n FROM {table}")
+    return cursor.fetchone()['n']
+
+def test_bulk_orders_single_transaction(client):
+    """Test that a batch is written with multi-row inserts and one commit."""
+    entries = [{'location': 'scdi', 'cart_items': [1, 2, 2]} for _ in range(10)]
+    with patch.object(app_module.DB_QUERY_DURATION, 'observe') as observe:
+        response = client.post('/bulk_orders', json={'orders': entries})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['placed'] == 10 and body['failed'] == 0
+
+    statements = [call.kwargs['statement'] for call in observe.call_args_list]
+    assert statements.count('INSERT orders') == 1
+    assert statements.count('INSERT order_items') == 1
+    assert count_rows('orders') == 10
+    assert count_rows('order_items') == 20
+
+    # Later orders in the batch queue behind earlier ones at the same location
+    times = [result['delivery_time'] for result in body['orders']]
+    assert times == sorted(times) and times[-1] > times[0]
+
+def test_bulk_orders_borrow_one_connection_at_a_time(client):
+    """Test that ETAs are quoted before the batch's connection is borrowed, not on a nested one."""
+    borrowed, peak = [0], [0]
+    borrow = app_module.get_db_connection
+
+    def tracked():
+        conn = borrow()
+        borrowed[0] += 1
+        peak[0] = max(peak[0], borrowed[0])
+        close = conn.close
+
+        def release():
+            borrowed[0] -= 1
+            close()
+        conn.close = release
+        return conn
+
+    # Reloading on every quote makes any nested borrow show up
+    eta = EtaEngine(calculate_delivery_time, app_module._load_eta_state, refresh=0)
+    entries = [{'location': 'scdi', 'cart_items': [1]}, {'location': 'scdi', 'cart_items': [999]}]
+    with patch.object(app_module, 'eta_engine', eta), patch.object(app_module, 'get_db_connection', tracked):
+        response = client.post('/bulk_orders', json={'orders': entries})
+    assert response.get_json()['placed'] == 1
+    assert peak[0] == 1
+    # The rejected entry no longer counts in the queue
+    assert eta.state()['scdi']['outstanding'] == 1
+
+def test_bulk_orders_reports_per_order_errors(client):
+    """Test that invalid entries are reported while valid ones are placed."""
+    response = client.post('/bulk_orders', json={'orders': [
+        {'location': 'scdi', 'cart_items': [1]},
+        {'location': 'Nowhere', 'cart_items': [1]},
+        {'location': 'scdi', 'cart_items': []},
+        {'location': 'scdi', 'cart_items': [999]},
+        {'location': 'Lucas Hall', 'cart_items': ['x']},
+    ]})
+    assert response.status_code == 200
+    results = response.get_json()['orders']
+    assert 'order_id' in results[0]
+    assert [r.get('error') for r in results[1:]] == [
+        'Invalid location', 'Cart is empty', 'Invalid menu item', 'Invalid menu item']
+    assert count_rows('orders') == 1
+
+def test_bulk_orders_limits(client):
+    """Test empty and oversized batches are rejected."""
+    assert client.post('/bulk_orders', json={'orders': []}).status_code == 400
+    with patch.dict(app.config, {'BULK_ORDER_MAX': 2}):
+        entries = [{'location': 'scdi', 'cart_items': [1]}] * 3
+        assert client.post('/bulk_orders', json={'orders': entries}).status_code == 413
+
+def test_bulk_orders_requires_login():
+    """Test that bulk ordering requires a session."""
+    with app.test_client() as client:
+        assert client.post('/bulk_orders', json={'orders': []}).status_code == 401
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,91 @@
+import pytest
+import sys
+import os
+import threading
+from decimal import Decimal
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app
+from cart_store import MemoryCartBackend, SharedCartBackend, make_cart_server
+from menu_catalog import MenuCatalog
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def test_running_total_tracks_adds_and_removes():
+    """Test that the cart total is maintained as items are added and removed."""
+    carts = MemoryCartBackend()
+    carts.add('c1', 1, 500)
+    carts.add('c1', 1, 500)
+    assert carts.add('c1', 7, 1250) == 2250
+    assert carts.items('c1') == {1: 2, 7: 1}
+    assert carts.remove('c1', 1) == 1250
+    assert carts.remove('c1', 99) == 1250
+    assert carts.total('c1') == 1250
+    assert carts.total('missing') == 0
+
+def test_least_recently_used_cart_is_evicted():
+    """Test that the memory backend stays bounded by max_carts."""
+    carts = MemoryCartBackend(max_carts=2)
+    carts.add('a', 1, 100)
+    carts.add('b', 1, 100)
+    carts.total('a')  # touch a so b is the oldest
+    carts.add('c', 1, 100)
+    assert carts.count() == 2
+    assert carts.total('b') == 0
+    assert carts.total('a') == 100
+
+def test_shared_backend_against_local_server():
+    """Test the shared backend against a cart server running in this process."""
+    server = make_cart_server(('127.0.0.1', 0), b'test-key')
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    first = SharedCartBackend(server.address, b'test-key')
+    second = SharedCartBackend(server.address, b'test-key')
+    first.add('c1', 3, 750)
+    assert second.add('c1', 3, 750) == 1500
+    assert second.items('c1') == {3: 2}
+    first.clear('c1')
+    assert second.total('c1') == 0
+
+def test_cookie_carries_only_cart_handle(client):
+    """Test that the session holds a cart handle rather than the cart itself."""
+    catalog = MenuCatalog(lambda: [{'id': 1, 'name': 'Cereal', 'category': 'Breakfast', 'price': Decimal('5.00')}])
+    with patch('app.menu_catalog', catalog):
+        for _ in range(3):
+            client.post('/add_to_cart', json={'item_id': 1, 'name': 'Cereal', 'price': 5.0})
+
+    with client.session_transaction() as sess:
+        assert 'cart' not in sess
+        assert 'cart_id' in sess
+    assert client.get('/cart_total').get_json()['total'] == 15.0
+
+    client.post('/remove_from_cart', json={'item_id': '1'})
+    assert client.get('/cart_total').get_json()['total'] == 0
+
+def test_malformed_cart_requests_answer_400(client):
+    """Test that a missing item_id or price is a client error rather than a 500."""
+    assert client.post('/add_to_cart', json={'name': 'Cereal', 'price': 5.0}).status_code == 400
+    assert client.post('/remove_from_cart', json={}).status_code == 400
+    assert client.post('/remove_from_cart', data='item_id=1').status_code == 400
+    # Without a menu the client's price is used, so it has to be there
+    with patch('app.menu_catalog', MenuCatalog(lambda: None)):
+        assert client.post('/add_to_cart', json={'item_id': 1}).status_code == 400
+    assert client.get('/cart_total').get_json()['total'] == 0
+
+def test_legacy_cookie_cart_is_migrated(client):
+    """Test that carts from the old cookie format move into the cart store."""
+    with client.session_transaction() as sess:
+        sess['cart'] = [{'id': 2, 'name': 'Pancakes', 'price': 8.0}]
+
+    assert client.get('/cart_total').get_json()['total'] == 8.0
+    with client.session_transaction() as sess:
+        assert 'cart' not in sess
+
+if __name__ == '__main__':
+    pytest.main()
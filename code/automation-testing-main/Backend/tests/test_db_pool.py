@@ -0,0 +1,135 @@
+import pytest
+import sys
+import os
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db_pool import ConnectionPool, DeadlineExceeded, PoolExhausted
+from storage import MySQLEngine
+
+class FakeConnection:
+    """Minimal stand-in for a MySQL connection."""
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+        self.in_transaction = False
+        self.rollbacks = 0
+
+    def close(self):
+        self.closed = True
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+def ping(conn):
+    if not conn.healthy:
+        raise ConnectionError("server has gone away")
+
+def make_pool(**kwargs):
+    opened = []
+    def connect(timeout=None):
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+    return ConnectionPool(connect, ping, **kwargs), opened
+
+def test_connection_is_reused_after_close():
+    """Test that closing a pooled connection returns it for the next checkout."""
+    pool, opened = make_pool(max_size=2)
+    conn = pool.acquire()
+    conn.close()
+    pool.acquire().close()
+    assert len(opened) == 1
+    assert not opened[0].closed
+    assert pool.stats()['checkouts'] == 2
+
+def test_exhausted_pool_times_out():
+    """Test that checkout fails fast once max_size connections are in use."""
+    pool, _ = make_pool(max_size=1, timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolExhausted):
+        pool.acquire()
+    stats = pool.stats()
+    assert stats['exhausted'] == 1
+    assert stats['waits'] == 1
+    held.close()
+
+def test_waiter_gets_released_connection():
+    """Test that a blocked checkout is served as soon as a connection is returned."""
+    pool, opened = make_pool(max_size=1, timeout=2)
+    held = pool.acquire()
+    threading.Timer(0.05, held.close).start()
+    conn = pool.acquire()
+    conn.close()
+    assert len(opened) == 1
+    assert pool.stats()['waits'] == 1
+
+def test_broken_connection_is_replaced_on_borrow():
+    """Test that validate-on-borrow discards a connection that fails its ping."""
+    pool, opened = make_pool(validate_on_borrow=True)
+    conn = pool.acquire()
+    conn.close()
+    opened[0].healthy = False
+    pool.acquire().close()
+    assert opened[0].closed
+    assert len(opened) == 2
+    assert pool.stats()['discarded'] == 1
+
+def test_expired_connection_is_retired():
+    """Test that connections older than max_lifetime are closed instead of reused."""
+    pool, opened = make_pool(max_lifetime=0)
+    pool.acquire().close()
+    assert opened[0].closed
+    assert pool.stats()['size'] == 0
+
+def test_open_transaction_rolled_back_on_return():
+    """Test that an uncommitted transaction does not leak to the next borrower."""
+    pool, opened = make_pool()
+    conn = pool.acquire()
+    opened[0].in_transaction = True
+    conn.close()
+    assert opened[0].rollbacks == 1
+
+def test_fill_opens_min_size():
+    """Test that fill() pre-opens min_size connections."""
+    pool, opened = make_pool(min_size=3, max_size=5)
+    pool.fill()
+    assert len(opened) == 3
+    assert pool.stats()['idle'] == 3
+
+def test_connect_timeout_follows_deadline():
+    """Test that opening a connection is capped by connect_timeout and the caller's deadline."""
+    timeouts = []
+    def connect(timeout):
+        timeouts.append(timeout)
+        return FakeConnection()
+    pool = ConnectionPool(connect, ping, min_size=0, max_size=3, connect_timeout=5)
+    pool.acquire()
+    pool.acquire(deadline=time.monotonic() + 1)
+    assert timeouts[0] == 5 and 0 < timeouts[1] <= 1
+    # Past the deadline nothing is opened, and the slot is given back
+    with pytest.raises(DeadlineExceeded):
+        pool.acquire(deadline=time.monotonic() - 1)
+    assert len(timeouts) == 2 and pool.stats()['size'] == 2
+
+def test_fill_stops_at_deadline():
+    """Test that fill() does not open connections for a request already out of time."""
+    pool, opened = make_pool(min_size=2, max_size=5)
+    pool.fill(deadline=time.monotonic() - 1)
+    assert opened == [] and pool.stats()['size'] == 0
+
+def test_mysql_connect_passes_connection_timeout():
+    """Test that the remaining time reaches the driver as whole seconds."""
+    engine = MySQLEngine('db', 'user', 'secret', 'scu', min_size=0, connect_timeout=5)
+    with patch('storage.mysql.connector.connect') as connect:
+        engine.pool.acquire(deadline=time.monotonic() + 2.5)
+        assert connect.call_args.kwargs['connection_timeout'] == 3
+        engine.pool.acquire()
+        assert connect.call_args.kwargs['connection_timeout'] == 5
+
+if __name__ == '__main__':
+    pytest.main()
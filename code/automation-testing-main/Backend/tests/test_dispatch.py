@@ -0,0 +1,122 @@
+import pytest
+import sys
+import os
+import threading
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app, LOCATION_TIMES, calculate_delivery_time
+from cart_store import make_cart_server
+from dispatch import DispatchScheduler, SharedDispatchScheduler
+
+def make_scheduler(**kwargs):
+    return DispatchScheduler(LOCATION_TIMES.get, **kwargs)
+
+def test_lone_order_waits_at_most_max_wait():
+    """Test that a run departs max_wait after its first order is ready."""
+    scheduler = make_scheduler(max_wait=120)
+    # scdi is 3 minutes away, so a 13 minute ETA is ready for pickup at 10 minutes
+    assert scheduler.assign('A', 'scdi', 13, now=0) == 15
+    [run] = scheduler.runs(now=0)
+    assert run['status'] == 'open'
+    assert run['departs_in_seconds'] == 720
+
+def test_orders_ready_before_departure_share_a_run():
+    """Test that nearby orders join the open run and later ones start a new run."""
+    scheduler = make_scheduler(max_wait=120)
+    scheduler.assign('A', 'scdi', 13, now=0)
+    assert scheduler.assign('B', 'scdi', 14, now=0) == 15
+    assert scheduler.assign('C', 'scdi', 16, now=0) == 18
+    assert scheduler.assign('D', 'Lucas Hall', 17, now=0) == 19
+    runs = scheduler.runs(now=0)
+    assert [run['order_ids'] for run in runs] == [['A', 'B'], ['C'], ['D']]
+    assert [run['status'] for run in runs] == ['scheduled', 'open', 'open']
+    assert [run['order_ids'] for run in scheduler.runs('Lucas Hall', now=0)] == [['D']]
+
+def test_full_run_leaves_when_last_order_is_ready():
+    """Test that reaching max_batch closes the run and stops waiting."""
+    scheduler = make_scheduler(max_wait=300, max_batch=2)
+    assert scheduler.assign('A', 'scdi', 13, now=0) == 18
+    assert scheduler.assign('B', 'scdi', 14, now=0) == 14
+    assert scheduler.assign('C', 'scdi', 14, now=0) == 19
+    runs = scheduler.runs(now=0)
+    assert [run['order_ids'] for run in runs] == [['A', 'B'], ['C']]
+    assert runs[0]['departs_in_seconds'] == 660
+    # A was quoted 18 minutes, but its run now leaves as soon as B is ready
+    assert scheduler.delivery_eta('A', now=0) == 14
+    assert scheduler.delivery_eta('unknown', now=0) is None
+    assert scheduler.stats() == {'open_runs': 1, 'tracked_runs': 2, 'runs_created': 2, 'orders_assigned': 3}
+
+def test_departed_runs_are_closed_and_forgotten():
+    """Test that orders after a departure start a new run and old runs expire."""
+    scheduler = make_scheduler(max_wait=60, retention=600)
+    scheduler.assign('A', 'scdi', 3, now=0)
+    scheduler.assign('B', 'scdi', 3, now=90)
+    assert [run['status'] for run in scheduler.runs(now=90)] == ['departed', 'open']
+    assert [run['order_ids'] for run in scheduler.runs(now=661)] == [['B']]
+
+def test_discard_removes_unpersisted_orders():
+    """Test that a failed order is taken off its run and empty runs are dropped."""
+    scheduler = make_scheduler()
+    scheduler.assign('A', 'scdi', 13, now=0)
+    scheduler.assign('B', 'scdi', 13, now=0)
+    scheduler.discard('B')
+    assert [run['order_ids'] for run in scheduler.runs(now=0)] == [['A']]
+    scheduler.discard('A')
+    scheduler.discard('A')
+    assert scheduler.runs(now=0) == []
+    assert scheduler.stats()['open_runs'] == 0
+
+def test_workers_share_runs_through_cart_server():
+    """Test that orders taken by different workers join the same run in the cart server."""
+    server = make_cart_server(('127.0.0.1', 0), b'test-key')
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    first, second = (SharedDispatchScheduler(server.address, b'test-key', LOCATION_TIMES, 5, max_wait=120)
+                     for _ in range(2))
+    assert first.assign('A', 'scdi', 13, now=0) == 15
+    assert second.assign('B', 'scdi', 14, now=0) == 15
+    [run] = second.runs(now=0)
+    assert run['order_ids'] == ['A', 'B']
+    first.discard('B')
+    assert second.delivery_eta('B', now=0) is None
+    assert first.stats()['orders_assigned'] == 1
+
+@pytest.fixture
+def client(sqlite_client):
+    with patch.object(app_module, 'dispatcher', make_scheduler(max_wait=300)):
+        yield sqlite_client
+
+def test_placed_orders_are_batched(client):
+    """Test that orders for the same location are quoted the same run departure."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    first = client.post('/place_order', json={'cart_items': [1], 'location': 'Lucas Hall'}).get_json()
+    second = client.post('/place_order', json={'cart_items': [2], 'location': 'Lucas Hall'}).get_json()
+    # Kitchen estimates differ by one queue slot; both leave with the same courier
+    assert first['delivery_time'] == second['delivery_time'] == calculate_delivery_time('Lucas Hall', 1) + 5
+
+    [run] = client.get('/dispatch/runs?location=Lucas Hall').get_json()['runs']
+    assert run['order_ids'] == [first['order_id'], second['order_id']]
+    assert client.get('/dispatch/runs?location=Nowhere').status_code == 400
+
+def test_dispatch_runs_requires_login(client):
+    """Test that courier runs are not exposed anonymously."""
+    assert client.get('/dispatch/runs').status_code == 401
+
+def test_dispatch_runs_couriers_only(client):
+    """Test that customers cannot list runs, which carry other users' order ids."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    with patch.dict(app.config, {'COURIER_USER_IDS': {9}}):
+        client.post('/place_order', json={'cart_items': [1], 'location': 'Lucas Hall'})
+        assert client.get('/dispatch/runs').status_code == 403
+        with client.session_transaction() as sess:
+            sess['user_id'] = 9
+        [run] = client.get('/dispatch/runs').get_json()['runs']
+    assert len(run['order_ids']) == 1
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,164 @@
+import pytest
+import sys
+import os
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, calculate_delivery_time
+from eta import EtaEngine, utc_stamp
+
+class OrdersTable:
+    """Loader standing in for the orders table that every worker shares."""
+
+    def __init__(self):
+        self.outstanding = {}
+        self.completions = []
+        self.calls = []
+
+    def __call__(self, opened_after, delivered_after):
+        self.calls.append((opened_after, delivered_after))
+        return dict(self.outstanding), list(self.completions)
+
+def make_engine(loader=None, **kwargs):
+    return EtaEngine(calculate_delivery_time, loader or OrdersTable(), **kwargs)
+
+def test_empty_queue_matches_static_estimate():
+    """Test that an idle location quotes the static estimate."""
+    engine = make_engine()
+    assert engine.estimate('scdi', 1, now=0) == calculate_delivery_time('scdi', 1)
+    assert engine.estimate('Lucas Hall', 6, now=0) == calculate_delivery_time('Lucas Hall', 6)
+
+def test_queue_depth_is_shared_between_workers():
+    """Test that orders outstanding in the database push out every worker's ETAs."""
+    table = OrdersTable()
+    table.outstanding['scdi'] = 2
+    first, second = make_engine(table, min_throughput=0.5), make_engine(table, min_throughput=0.5)
+    static = calculate_delivery_time('scdi', 1)
+    assert first.estimate('scdi', 1, now=0) == second.estimate('scdi', 1, now=0) == static + 4
+    # Other locations are unaffected
+    assert first.estimate('Lucas Hall', 1, now=0) == calculate_delivery_time('Lucas Hall', 1)
+
+def test_local_orders_count_until_next_reload():
+    """Test that a burst queues behind itself between reloads, and a reload replaces the local count."""
+    table = OrdersTable()
+    engine = make_engine(table, min_throughput=0.5, refresh=5)
+    static = calculate_delivery_time('scdi', 1)
+    engine.order_placed('scdi', now=0)
+    engine.order_placed('scdi', now=1)
+    assert engine.estimate('scdi', 1, now=2) == static + 4
+    engine.discard('scdi')
+    assert engine.estimate('scdi', 1, now=3) == static + 2
+    assert len(table.calls) == 1
+
+    table.outstanding['scdi'] = 3
+    assert engine.estimate('scdi', 1, now=6) == static + 6
+    assert len(table.calls) == 2
+
+def test_completions_set_throughput_and_bias():
+    """Test that recent deliveries raise throughput and shift ETAs by how late they ran."""
+    table = OrdersTable()
+    static = calculate_delivery_time('scdi', 1)
+    # Ten deliveries in the last 10 minutes, each 4 minutes later than promised
+    table.completions = [('scdi', static + 4, static)] * 10
+    engine = make_engine(table, window=600)
+    state = engine.state(now=0)['scdi']
+    assert state['completed'] == 10
+    assert state['throughput_per_min'] == 1.0
+    assert state['bias_minutes'] == pytest.approx(4)
+    assert engine.estimate('scdi', 1, now=0) == static + 4
+    # The baseline stored with the order leaves the correction out
+    assert engine.baseline('scdi', 1, now=0) == static
+
+def test_correction_is_not_fed_back_into_itself():
+    """Test that lateness learned against stored baselines settles at the true lateness, not half of it."""
+    table = OrdersTable()
+    engine = make_engine(table, refresh=0)
+    static = calculate_delivery_time('scdi', 1)
+    # Every delivery really takes 4 minutes longer than the model's baseline
+    for now in range(5):
+        baseline = engine.baseline('scdi', 1, now=now)
+        table.completions = [('scdi', baseline + 4, baseline)] * 10
+    assert engine.estimate('scdi', 1, now=5) == static + 4
+
+def test_recompute_prices_open_orders_in_one_pass():
+    """Test that open orders get their baseline plus the location's correction, less the time elapsed."""
+    table = OrdersTable()
+    table.completions = [('scdi', 12, 10)]
+    engine = make_engine(table)
+    etas = engine.recompute([('ORD-A', 'scdi', 0, 20), ('ORD-B', 'Lucas Hall', 0, 20), ('ORD-C', 'scdi', 0, 3)],
+                            now=300)
+    # 20 + 2 - 5; no deliveries at Lucas Hall yet; never below a minute
+    assert etas == {'ORD-A': 17, 'ORD-B': 15, 'ORD-C': 1}
+    assert len(table.calls) == 1
+
+def test_cutoffs_passed_to_loader():
+    """Test that the loader is asked for orders opened within max_age and deliveries within the window."""
+    table = OrdersTable()
+    make_engine(table, window=600, max_age=3600).estimate('scdi', 1, now=7200)
+    assert table.calls == [('1970-01-01 01:00:00', '1970-01-01 01:50:00')]
+
+def test_unreachable_database_keeps_last_state():
+    """Test that a failed reload keeps quoting from the last state that loaded."""
+    table = OrdersTable()
+    table.outstanding['scdi'] = 1
+    answers = iter([table(None, None), None])
+    engine = make_engine(lambda *cutoffs: next(answers), min_throughput=1.0, refresh=0)
+    static = calculate_delivery_time('scdi', 1)
+    assert engine.estimate('scdi', 1, now=0) == static + 1
+    assert engine.estimate('scdi', 1, now=1) == static + 1
+    assert engine.stats() == {'loads': 1, 'load_failures': 1}
+
+@pytest.fixture
+def client(sqlite_client):
+    with patch.dict(app.config, {'COURIER_USER_IDS': {9}}):
+        yield sqlite_client
+
+def login(client, user_id):
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+
+def test_delivered_endpoint_couriers_only(client):
+    """Test that only couriers can mark an order delivered, and only once."""
+    login(client, 1)
+    order_id = client.post('/place_order', json={'cart_items': [1], 'location': 'scdi'}).get_json()['order_id']
+    assert client.get('/eta/state').get_json()['scdi']['outstanding'] == 1
+    # Not even the order's own customer may report it delivered
+    assert client.post(f'/orders/{order_id}/delivered').status_code == 403
+
+    login(client, 9)
+    assert client.post('/orders/ORD-00000000000000000000000000/delivered').status_code == 404
+    response = client.post(f'/orders/{order_id}/delivered')
+    assert response.status_code == 200
+    assert response.get_json()['order_id'] == order_id
+    assert client.post(f'/orders/{order_id}/delivered').status_code == 409
+
+    state = client.get('/eta/state').get_json()['scdi']
+    assert state['outstanding'] == 0 and state['completed'] == 1
+
+def test_delivery_lateness_measured_against_baseline(client, engine):
+    """Test that a delivery teaches the model its lateness over the stored baseline, not over the quoted ETA."""
+    login(client, 1)
+    order_id = client.post('/place_order', json={'cart_items': [1], 'location': 'scdi'}).get_json()['order_id']
+    conn = engine.connect()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT eta_baseline FROM orders")
+    baseline = cursor.fetchone()['eta_baseline']
+    assert baseline == calculate_delivery_time('scdi', 1)
+    # Placed baseline + 6 minutes ago, and quoted with a correction that must not count as lateness
+    cursor.execute("UPDATE orders SET order_date = %s, estimated_delivery_time = %s",
+                   (utc_stamp(time.time() - (baseline + 6) * 60), baseline + 30))
+    conn.commit()
+    conn.close()
+
+    login(client, 9)
+    assert client.post(f'/orders/{order_id}/delivered').status_code == 200
+    assert client.get('/eta/state').get_json()['scdi']['bias_minutes'] == pytest.approx(6, abs=0.1)
+
+def test_eta_state_requires_login(client):
+    """Test that the ETA model is not exposed anonymously."""
+    assert client.get('/eta/state').status_code == 401
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,66 @@
+import pytest
+import sys
+import os
+from decimal import Decimal
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app
+from fragment_cache import FragmentCache
+from menu_catalog import MenuCatalog
+
+def test_fragment_rendered_once_per_version():
+    """Test that a fragment is only re-rendered when its version changes."""
+    cache = FragmentCache()
+    renders = []
+
+    def render():
+        renders.append(1)
+        return f"<p>{len(renders)}</p>"
+
+    assert cache.get('menu', 'v1', render) == '<p>1</p>'
+    assert cache.get('menu', 'v1', render) == '<p>1</p>'
+    assert cache.get('menu', 'v2', render) == '<p>2</p>'
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'fragments': 1}
+
+    cache.invalidate('menu')
+    assert cache.get('menu', 'v2', render) == '<p>3</p>'
+
+@pytest.fixture
+def menu_rows():
+    return [{'id': 1, 'name': 'Cereal', 'category': 'Breakfast', 'price': Decimal('5.00')}]
+
+@pytest.fixture
+def client(menu_rows):
+    app.config['TESTING'] = True
+    with patch.object(app_module, 'menu_catalog', MenuCatalog(lambda: list(menu_rows))), \
+            patch.object(app_module, 'fragment_cache', FragmentCache()):
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess['user_id'] = 1
+                sess['name'] = 'Ritika Verma'
+            yield client
+
+def test_index_reuses_menu_fragment(client):
+    """Test that repeat page views reuse the rendered menu."""
+    first = client.get('/index')
+    second = client.get('/index')
+    assert first.status_code == 200
+    assert b'Cereal' in first.data and b'$5.00' in first.data
+    assert first.data == second.data
+    assert app_module.fragment_cache.stats() == {'hits': 1, 'misses': 1, 'fragments': 1}
+
+def test_menu_change_rerenders_fragment(client, menu_rows):
+    """Test that a menu change shows up on the next page view."""
+    client.get('/index')
+    menu_rows.append({'id': 2, 'name': 'Pancakes', 'category': 'Breakfast', 'price': Decimal('8.00')})
+    app_module.menu_catalog.invalidate()
+
+    response = client.get('/index')
+    assert b'Pancakes' in response.data
+    assert app_module.fragment_cache.stats()['misses'] == 2
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,102 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app
+from idempotency import CLAIMED, IN_PROGRESS, MISMATCH, REPLAY, IdempotencyCache, fingerprint
+
+def test_claim_complete_replay():
+    """Test the claim / in-progress / replay / mismatch lifecycle of one key."""
+    cache = IdempotencyCache()
+    digest = fingerprint({'location': 'scdi', 'items': [(1, 2)]})
+    assert cache.claim(1, 'k', digest) == (CLAIMED, None)
+    assert cache.claim(1, 'k', digest) == (IN_PROGRESS, None)
+    cache.complete(1, 'k', 200, {'order_id': 'ORD-1'})
+    assert cache.claim(1, 'k', digest) == (REPLAY, (200, {'order_id': 'ORD-1'}))
+    assert cache.claim(1, 'k', fingerprint({'location': 'scdi', 'items': [(1, 3)]})) == (MISMATCH, None)
+    # Keys are scoped per user
+    assert cache.claim(2, 'k', digest) == (CLAIMED, None)
+    assert cache.stats()['replays'] == 1
+
+def test_released_claim_can_be_retried():
+    """Test that a failed attempt does not block the client's retry."""
+    cache = IdempotencyCache()
+    cache.claim(1, 'k', 'd')
+    cache.release(1, 'k')
+    assert cache.claim(1, 'k', 'd') == (CLAIMED, None)
+    # A completed key is never released
+    cache.complete(1, 'k', 200, {})
+    cache.release(1, 'k')
+    assert cache.claim(1, 'k', 'd')[0] == REPLAY
+
+def test_cache_is_bounded_and_expires():
+    """Test LRU eviction and TTL expiry of remembered keys."""
+    cache = IdempotencyCache(capacity=2, ttl=0)
+    for key in ('a', 'b', 'c'):
+        cache.claim(1, key, 'd')
+        cache.complete(1, key, 200, {})
+    stats = cache.stats()
+    assert stats['keys'] == 2 and stats['evictions'] == 1
+    assert cache.claim(1, 'c', 'd') == (CLAIMED, None)
+
+@pytest.fixture
+def client(customer):
+    return customer
+
+def count_orders(engine):
+    cursor = engine.connect().cursor()
+    cursor.execute("SELECT COUNT(*) FROM orders")
+    return cursor.fetchone()[0]
+
+def place(client, key, cart_items=(1, 2)):
+    return client.post('/place_order', json={'cart_items': list(cart_items), 'location': 'scdi'},
+                       headers={'Idempotency-Key': key})
+
+def test_retry_replays_original_order(client, engine):
+    """Test that a retried submission returns the first response and writes nothing."""
+    first = place(client, 'retry-1')
+    assert first.status_code == 200
+    assert 'Idempotent-Replayed' not in first.headers
+
+    replays = app_module.IDEMPOTENT_REPLAYS.value(source='cache')
+    with patch.object(app_module, 'get_db_connection') as get_db_connection:
+        again = place(client, 'retry-1')
+    get_db_connection.assert_not_called()
+    assert again.status_code == 200
+    assert again.headers['Idempotent-Replayed'] == 'true'
+    assert again.get_json() == first.get_json()
+    assert count_orders(engine) == 1
+    assert app_module.IDEMPOTENT_REPLAYS.value(source='cache') == replays + 1
+    assert b'idempotent_replays_total{source="cache"}' in client.get('/metrics').data
+
+    # A new key is a new order
+    assert place(client, 'retry-2').get_json()['order_id'] != first.get_json()['order_id']
+    assert count_orders(engine) == 2
+
+def test_key_reused_for_different_cart(client, engine):
+    """Test that reusing a key with a different cart is rejected."""
+    place(client, 'reused')
+    assert place(client, 'reused', cart_items=(3,)).status_code == 422
+    assert count_orders(engine) == 1
+
+def test_unique_constraint_catches_evicted_keys(client, engine):
+    """Test that a repeat the cache no longer knows is stopped by the database."""
+    first = place(client, 'evicted').get_json()
+    with patch.object(app_module, 'idempotent_orders', IdempotencyCache()):
+        again = place(client, 'evicted')
+    assert again.status_code == 200
+    assert again.get_json() == first
+    assert again.headers['Idempotent-Replayed'] == 'true'
+    assert count_orders(engine) == 1
+    assert b'idempotent_replays_total{source="database"} 1' in client.get('/metrics').data
+
+def test_invalid_key_rejected(client):
+    """Test that over-long keys are refused before anything is placed."""
+    assert place(client, 'x' * 65).status_code == 400
+
+if __name__ == '__main__':
+    pytest.main()
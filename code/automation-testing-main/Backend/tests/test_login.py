@@ -25,7 +25,7 @@ def test_login_success(client):
     with patch('app.get_db_connection') as mock_db:
         mock_cursor = MagicMock()
         # Using sample data for Ritika Verma:
-        mock_cursor.fetchone.return_value = {'id': 1, 'name': 'Ritika Verma'}
+        mock_cursor.fetchone.return_value = {'id': 1, 'name': 'Ritika Verma', 'scu_id': '1234567890'}
         mock_db.return_value.cursor.return_value = mock_cursor
         
         response = client.post('/', data={
@@ -69,7 +69,7 @@ def test_session_creation(client):
     """Test session creation after successful login using sample data (Ritika Verma)."""
     with patch('app.get_db_connection') as mock_db:
         mock_cursor = MagicMock()
-        mock_cursor.fetchone.return_value = {'id': 1, 'name': 'Ritika Verma'}
+        mock_cursor.fetchone.return_value = {'id': 1, 'name': 'Ritika Verma', 'scu_id': '1234567890'}
         mock_db.return_value.cursor.return_value = mock_cursor
         
         client.post('/', data={
@@ -85,7 +85,7 @@ def test_redirect_after_login(client):
     """Test redirection after successful login using sample data (Ritika Verma)."""
     with patch('app.get_db_connection') as mock_db:
         mock_cursor = MagicMock()
-        mock_cursor.fetchone.return_value = {'id': 1, 'name': 'Ritika Verma'}
+        mock_cursor.fetchone.return_value = {'id': 1, 'name': 'Ritika Verma', 'scu_id': '1234567890'}
         mock_db.return_value.cursor.return_value = mock_cursor
         
         response = client.post('/', data={
@@ -0,0 +1,83 @@
+import pytest
+import sys
+import os
+from decimal import Decimal
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app
+from menu_catalog import MenuCatalog
+
+@pytest.fixture
+def menu_rows():
+    return [
+        {'id': 1, 'name': 'Cereal', 'category': 'Breakfast', 'price': Decimal('5.00')},
+        {'id': 7, 'name': 'Burrito Bowl', 'category': 'Lunch', 'price': Decimal('12.50')},
+        {'id': 18, 'name': 'Water', 'category': 'Drinks', 'price': Decimal('2.00')},
+    ]
+
+@pytest.fixture
+def loads():
+    return []
+
+@pytest.fixture
+def client(menu_rows, loads):
+    def loader():
+        loads.append(1)
+        return list(menu_rows)
+
+    app.config['TESTING'] = True
+    with patch.object(app_module, 'menu_catalog', MenuCatalog(loader)):
+        with app.test_client() as client:
+            yield client
+
+def test_menu_api_lists_items(client):
+    """Test the full menu and a category filter."""
+    response = client.get('/api/menu')
+    assert response.status_code == 200
+    assert [item['name'] for item in response.get_json()['items']] == ['Cereal', 'Burrito Bowl', 'Water']
+    assert response.headers['Cache-Control'].startswith('public')
+    assert 's-maxage=' in response.headers['Cache-Control']
+
+    lunch = client.get('/api/menu?category=Lunch').get_json()['items']
+    assert lunch == [{'id': 7, 'name': 'Burrito Bowl', 'category': 'Lunch', 'price': 12.5}]
+    assert client.get('/api/menu?category=Brunch').status_code == 400
+
+def test_menu_api_conditional_get(client, loads):
+    """Test that a matching If-None-Match gets an empty 304 without touching the DB."""
+    etag = client.get('/api/menu').headers['ETag']
+    assert not etag.startswith('W/')
+
+    response = client.get('/api/menu', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+    assert len(loads) == 1
+
+    # Each filter is its own representation
+    assert client.get('/api/menu?category=Lunch', headers={'If-None-Match': etag}).status_code == 200
+
+def test_menu_api_etag_changes_with_menu(client, menu_rows):
+    """Test that a price change produces a new tag."""
+    etag = client.get('/api/menu').headers['ETag']
+    menu_rows[0] = dict(menu_rows[0], price=Decimal('5.50'))
+    app_module.menu_catalog.invalidate()
+
+    response = client.get('/api/menu', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+def test_menu_api_gzip_weakens_etag(client):
+    """Test that compressed responses carry a weak tag that still revalidates."""
+    with patch.dict(app.config, {'COMPRESS_MIN_SIZE': 0}):
+        response = client.get('/api/menu', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        etag = response.headers['ETag']
+        assert etag.startswith('W/')
+        response = client.get('/api/menu', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert response.status_code == 304
+
+if __name__ == '__main__':
+    pytest.main()
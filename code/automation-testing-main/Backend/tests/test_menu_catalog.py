@@ -0,0 +1,110 @@
+import pytest
+import sys
+import os
+from decimal import Decimal
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app
+from menu_catalog import MenuCatalog
+
+MENU_ROWS = [
+    {'id': 1, 'name': 'Cereal', 'category': 'Breakfast', 'price': Decimal('5.00')},
+    {'id': 7, 'name': 'Burrito Bowl', 'category': 'Lunch', 'price': Decimal('12.50')},
+]
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def menu():
+    """Swap in a catalog backed by static rows instead of the database."""
+    catalog = MenuCatalog(lambda: list(MENU_ROWS))
+    with patch.object(app_module, 'menu_catalog', catalog):
+        yield catalog
+
+def test_catalog_loads_once_until_invalidated():
+    """Test that the catalog only hits the loader again after invalidate()."""
+    calls = []
+    def loader():
+        calls.append(1)
+        return list(MENU_ROWS)
+    catalog = MenuCatalog(loader)
+    first = catalog.get()
+    assert catalog.get() is first
+    assert len(calls) == 1
+    catalog.invalidate()
+    catalog.get()
+    assert len(calls) == 2
+
+def test_catalog_version_changes_only_with_content():
+    """Test that reloading identical rows keeps the version; changed rows bump it."""
+    rows = list(MENU_ROWS)
+    catalog = MenuCatalog(lambda: rows)
+    version = catalog.get().version
+    catalog.invalidate()
+    assert catalog.get().version == version
+    rows[0] = dict(rows[0], price=Decimal('5.50'))
+    catalog.invalidate()
+    assert catalog.get().version == version + 1
+
+def test_catalog_ttl_expiry_reloads():
+    """Test that a zero TTL reloads on every access."""
+    calls = []
+    catalog = MenuCatalog(lambda: calls.append(1) or list(MENU_ROWS), ttl=0)
+    catalog.get()
+    catalog.get()
+    assert len(calls) == 2
+
+def test_catalog_serves_last_good_menu_when_db_down():
+    """Test that a failed reload keeps the previous snapshot."""
+    rows = [list(MENU_ROWS)]
+    catalog = MenuCatalog(lambda: rows[0])
+    snapshot = catalog.get()
+    rows[0] = None
+    catalog.invalidate()
+    assert catalog.get() is snapshot
+    assert catalog.stats()['load_failures'] == 1
+
+def test_snapshot_lookup_accepts_string_ids():
+    """Test that ids posted by the frontend as strings resolve to menu items."""
+    snapshot = MenuCatalog(lambda: list(MENU_ROWS)).get()
+    assert snapshot.price('7') == 12.5
+    assert snapshot.get('not-an-id') is None
+    assert [i['name'] for i in snapshot.by_category('Breakfast')] == ['Cereal']
+
+def test_index_renders_from_catalog_without_db(client, menu):
+    """Test that the menu page is served from the catalog, not a per-request query."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+        sess['name'] = 'Ritika Verma'
+
+    menu.get()
+    with patch('app.get_db_connection') as mock_db:
+        response = client.get('/index')
+        assert response.status_code == 200
+        assert b'Burrito Bowl' in response.data
+        mock_db.assert_not_called()
+
+def test_add_to_cart_uses_catalog_price(client, menu):
+    """Test that the cart stores the catalog price, not the client-supplied one."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+        sess['name'] = 'Ritika Verma'
+
+    client.post('/add_to_cart', json={'item_id': '7', 'name': 'Burrito Bowl', 'price': 0.01})
+    response = client.get('/cart_total')
+    assert response.get_json()['total'] == 12.5
+
+def test_add_to_cart_rejects_unknown_item(client, menu):
+    """Test that items not on the menu cannot be added to the cart."""
+    response = client.post('/add_to_cart', json={'item_id': 999, 'name': 'Free Lunch', 'price': 0})
+    assert response.status_code == 400
+
+if __name__ == '__main__':
+    pytest.main()
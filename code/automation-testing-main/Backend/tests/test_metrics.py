@@ -0,0 +1,70 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app, SCHEMA_PATH
+from menu_catalog import MenuCatalog
+from metrics import Registry, statement_label
+from storage import SQLiteEngine
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def test_histogram_exposition_format():
+    """Test cumulative buckets, sum and count in the text format."""
+    registry = Registry()
+    histogram = registry.histogram('job_seconds', 'Job time.', ('job',), buckets=(0.1, 1.0))
+    histogram.observe(0.05, job='a')
+    histogram.observe(0.5, job='a')
+    histogram.observe(5, job='a')
+    text = registry.render()
+    assert '# TYPE job_seconds histogram' in text
+    assert 'job_seconds_bucket{job="a",le="0.1"} 1' in text
+    assert 'job_seconds_bucket{job="a",le="1.0"} 2' in text
+    assert 'job_seconds_bucket{job="a",le="+Inf"} 3' in text
+    assert 'job_seconds_count{job="a"} 3' in text
+
+def test_label_values_are_escaped():
+    """Test that quotes in label values cannot break the exposition format."""
+    registry = Registry()
+    registry.counter('hits_total', 'Hits.', ('path',)).inc(path='say "hi"')
+    assert 'hits_total{path="say \\"hi\\""} 1' in registry.render()
+
+def test_statement_labels_are_low_cardinality():
+    """Test that statements are labelled by verb and table, not literal SQL."""
+    assert statement_label("SELECT id, name FROM users WHERE scu_email = %s") == 'SELECT users'
+    assert statement_label("INSERT INTO order_items (order_id) VALUES (%s), (%s)") == 'INSERT order_items'
+    assert statement_label("UPDATE orders SET estimated_delivery_time = %s") == 'UPDATE orders'
+
+def test_metrics_endpoint_reports_requests_queries_and_orders(client, tmp_path):
+    """Test that a real order shows up in request, query and per-location metrics."""
+    engine = SQLiteEngine(str(tmp_path / 'metrics.db'), SCHEMA_PATH)
+    with patch.object(app_module, '_db_engine', engine), \
+            patch.object(app_module, 'menu_catalog', MenuCatalog(app_module._load_menu_items)):
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+            sess['name'] = 'Admin User'
+        response = client.post('/place_order', json={'cart_items': [1], 'location': 'Kenna Hall'})
+        assert response.status_code == 200
+
+        response = client.get('/metrics')
+    engine.close()
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    text = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{endpoint="place_order",method="POST",status="200"}' in text
+    assert 'db_query_duration_seconds_count{statement="INSERT orders"}' in text
+    assert 'db_query_rows_total{statement="SELECT menu_items"}' in text
+    assert 'orders_placed_total{location="Kenna Hall"}' in text
+    assert 'http_requests_in_flight{endpoint="metrics"} 1' in text
+
+if __name__ == '__main__':
+    pytest.main()
@@ -1,11 +1,14 @@
 import pytest
 import sys
 import os
+from decimal import Decimal
 from unittest.mock import patch, MagicMock
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app import app
+from app import app, calculate_delivery_time
+from eta import EtaEngine
+from menu_catalog import MenuCatalog
 
 @pytest.fixture
 def client():
@@ -13,6 +16,17 @@ def client():
     with app.test_client() as client:
         yield client
 
+def menu():
+    """A catalog with the two items the mocked-DB tests order."""
+    return MenuCatalog(lambda: [
+        {'id': 1, 'name': 'Cereal', 'category': 'Breakfast', 'price': Decimal('5.00')},
+        {'id': 2, 'name': 'Pancakes', 'category': 'Breakfast', 'price': Decimal('8.00')},
+    ])
+
+def idle_eta():
+    """An ETA model with an empty queue, so its loader never reads through the mocked connection."""
+    return EtaEngine(calculate_delivery_time, lambda opened_after, delivered_after: ({}, []))
+
 def test_add_to_cart(client):
     """Test adding items to the cart."""
     with client.session_transaction() as sess:
@@ -61,7 +75,8 @@ def test_place_order_success(client):
         sess['user_id'] = 1
         sess['name'] = 'Ritika Verma'
     
-    with patch('app.get_db_connection') as mock_db:
+    with patch('app.menu_catalog', menu()), patch('app.eta_engine', idle_eta()), \
+            patch('app.get_db_connection') as mock_db:
         mock_cursor = MagicMock()
         mock_cursor.lastrowid = 1
         mock_db.return_value.cursor.return_value = mock_cursor
@@ -119,5 +134,45 @@ def test_estimated_delivery_time(client):
     # Expected delivery time: base 10 + Lucas Hall time (7) + extra for 5 items (10) = 27 minutes.
     assert data['delivery_time'] == 27
 
+def test_place_order_single_transaction(client):
+    """Test that an order is written with one items INSERT and a single commit."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+        sess['name'] = 'Ritika Verma'
+
+    with patch('app.menu_catalog', menu()), patch('app.eta_engine', idle_eta()), \
+            patch('app.get_db_connection') as mock_db:
+        mock_cursor = MagicMock()
+        mock_cursor.lastrowid = 42
+        mock_db.return_value.cursor.return_value = mock_cursor
+
+        response = client.post('/place_order', json={
+            'cart_items': ['1', 2, 1],
+            'location': 'Lucas Hall'
+        })
+
+        assert response.status_code == 200
+        assert mock_db.return_value.commit.call_count == 1
+        statements = [c.args[0] for c in mock_cursor.execute.call_args_list]
+        assert len(statements) == 4  # orders, order_items, then the two sales rollups
+        assert 'sales_hourly_location' in statements[2] and 'sales_daily_item' in statements[3]
+        order_params = mock_cursor.execute.call_args_list[0].args[1]
+        assert order_params[2] == 18.0  # 2 x Cereal + 1 x Pancakes
+        assert order_params[3] == response.get_json()['delivery_time']
+        assert mock_cursor.execute.call_args_list[1].args[1] == (42, 1, 2, 42, 2, 1)
+        assert 'commit;dur=' in response.headers['Server-Timing']
+
+def test_place_order_invalid_item_id(client):
+    """Test that a non-numeric menu item id is rejected before touching the DB."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+        sess['name'] = 'Ritika Verma'
+
+    response = client.post('/place_order', json={
+        'cart_items': ['1; DROP TABLE orders'],
+        'location': 'Lucas Hall'
+    })
+    assert response.status_code == 400
+
 if __name__ == '__main__':
     pytest.main()
@@ -0,0 +1,156 @@
+import json
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app
+from order_events import OrderEvents, StreamLimitReached, format_event, unsent
+
+def test_updates_fan_out_to_the_owner_only():
+    """Test that each user's streams get their own orders' updates and nobody else's."""
+    events = OrderEvents()
+    first, second = events.subscribe(1), events.subscribe(1)
+    other = events.subscribe(2)
+    events.publish(1, {'order_id': 'A', 'status': 'queued'})
+    assert first.get(0) == [{'order_id': 'A', 'status': 'queued'}]
+    assert second.get(0) == [{'order_id': 'A', 'status': 'queued'}]
+    assert other.get(0) == []
+
+def test_slow_reader_gets_latest_state_per_order():
+    """Test that unsent updates for one order merge instead of piling up."""
+    events = OrderEvents()
+    subscription = events.subscribe(1)
+    events.publish(1, {'order_id': 'A', 'status': 'queued', 'eta_minutes': 20})
+    events.publish(1, {'order_id': 'B', 'status': 'queued', 'eta_minutes': 25})
+    events.publish(1, {'order_id': 'A', 'status': 'persisted'})
+    events.publish(1, {'order_id': 'A', 'eta_minutes': 18})
+    assert subscription.get(0) == [
+        {'order_id': 'A', 'status': 'persisted', 'eta_minutes': 18},
+        {'order_id': 'B', 'status': 'queued', 'eta_minutes': 25},
+    ]
+    assert events.stats()['merged'] == 2
+
+def test_overflowing_reader_is_told_to_resync():
+    """Test that a reader too far behind is cut off rather than buffered without bound."""
+    events = OrderEvents(max_pending=2)
+    subscription = events.subscribe(1)
+    for order_id in 'ABC':
+        events.publish(1, {'order_id': order_id, 'status': 'queued'})
+    assert subscription.get(0) is None and subscription.overflowed
+    events.unsubscribe(subscription)
+    assert events.stats()['overflowed'] == 1
+
+def test_stream_caps():
+    """Test the per-user and total stream limits, and that closing frees a slot."""
+    events = OrderEvents(max_streams=3, max_streams_per_user=2)
+    first = events.subscribe(1)
+    events.subscribe(1)
+    with pytest.raises(StreamLimitReached):
+        events.subscribe(1)
+    events.subscribe(2)
+    with pytest.raises(StreamLimitReached):
+        events.subscribe(3)
+    events.unsubscribe(first)
+    events.unsubscribe(first)
+    events.subscribe(3)
+    assert events.stats()['streams'] == 3 and events.stats()['rejected'] == 2
+
+@pytest.fixture
+def order_events():
+    return OrderEvents(max_streams=2, max_streams_per_user=2)
+
+@pytest.fixture
+def client(customer, order_events):
+    with patch.object(app_module, 'order_events', order_events), \
+            patch.dict(app.config, {'ORDER_STREAM_HEARTBEAT': 0.01}):
+        yield customer
+
+def read_event(chunks):
+    """Next event from a stream as (name, data), skipping heartbeats."""
+    for chunk in chunks:
+        chunk = chunk.decode('utf-8')
+        if chunk.startswith('event: '):
+            name, data = chunk.split('\n')[:2]
+            return name[len('event: '):], json.loads(data[len('data: '):])
+    return None
+
+def test_stream_pushes_order_updates(client, order_events):
+    """Test the stream from snapshot through placement and delivery to disconnect."""
+    first = client.post('/place_order', json={'cart_items': [1], 'location': 'scdi'}).get_json()
+
+    response = client.get('/orders/stream', buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    chunks = iter(response.response)
+    assert next(chunks) == b'retry: 3000\n\n'
+    assert read_event(chunks) == ('order', {'order_id': first['order_id'], 'status': 'persisted',
+                                            'eta_minutes': first['delivery_time']})
+    assert next(chunks) == b': heartbeat\n\n'
+
+    second = client.post('/place_order', json={'cart_items': [1, 2], 'location': 'scdi'}).get_json()
+    assert read_event(chunks) == ('order', {'order_id': second['order_id'], 'status': 'persisted',
+                                            'eta_minutes': second['delivery_time']})
+
+    client.post(f"/orders/{first['order_id']}/delivered")
+    assert read_event(chunks) == ('order', {'order_id': first['order_id'], 'status': 'delivered'})
+    # The other order's courier run still leaves at the same time, so its unchanged ETA is not repeated
+    assert next(chunks) == b': heartbeat\n\n'
+
+    assert order_events.active() == 1
+    response.close()
+    assert order_events.active() == 0
+
+def test_stream_sees_other_workers_changes(client):
+    """Test that orders placed and delivered by another worker reach the stream through the orders table."""
+    with patch.dict(app.config, {'ORDER_STREAM_POLL': 0.01}):
+        response = client.get('/orders/stream', buffered=False)
+        chunks = iter(response.response)
+        assert next(chunks) == b'retry: 3000\n\n'
+
+        # Another worker's fan-out: nothing is published to this stream in-process
+        with patch.object(app_module, 'order_events', OrderEvents()):
+            placed = client.post('/place_order', json={'cart_items': [1], 'location': 'scdi'}).get_json()
+            assert read_event(chunks) == ('order', {'order_id': placed['order_id'], 'status': 'persisted',
+                                                    'eta_minutes': placed['delivery_time']})
+            client.post(f"/orders/{placed['order_id']}/delivered")
+            assert read_event(chunks) == ('order', {'order_id': placed['order_id'], 'status': 'delivered'})
+        response.close()
+
+def test_unsent_drops_fields_already_sent():
+    """Test that an update seen in-process and again in the database is sent once."""
+    sent = {}
+    assert unsent(sent, [{'order_id': 'A', 'status': 'persisted', 'eta_minutes': 20}]) == [
+        {'order_id': 'A', 'status': 'persisted', 'eta_minutes': 20}]
+    assert unsent(sent, [{'order_id': 'A', 'status': 'persisted', 'eta_minutes': 20}]) == []
+    assert unsent(sent, [{'order_id': 'A', 'status': 'persisted', 'eta_minutes': 18}]) == [
+        {'order_id': 'A', 'eta_minutes': 18}]
+    assert unsent(sent, [{'order_id': 'A', 'status': 'delivered'}]) == [{'order_id': 'A', 'status': 'delivered'}]
+
+def test_stream_limit_answers_503(client, order_events):
+    """Test that streams past the cap are refused with Retry-After, and that it needs a login."""
+    order_events.subscribe(1)
+    order_events.subscribe(2)
+    response = client.get('/orders/stream')
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+
+    with client.session_transaction() as sess:
+        sess.clear()
+    assert client.get('/orders/stream').status_code == 401
+
+def test_stream_ends_at_max_age(client):
+    """Test that a stream closes after ORDER_STREAM_MAX_AGE so the browser reconnects."""
+    with patch.dict(app.config, {'ORDER_STREAM_MAX_AGE': 0.05}):
+        response = client.get('/orders/stream', buffered=False)
+        body = b''.join(response.response)
+    response.close()
+    assert body.startswith(b'retry: ')
+    assert body.count(format_event('order', {}).encode()) == 0
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,104 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app, SCHEMA_PATH
+from order_ids import text_to_key
+from orders import decode_cursor, encode_cursor
+from storage import SQLiteEngine
+
+def oid(n, user_id=1):
+    return f"ORD-{n:08x}-{user_id}"
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = SQLiteEngine(str(tmp_path / 'history.db'), SCHEMA_PATH)
+    conn = engine.connect()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (name, scu_email, scu_id) VALUES ('Other', 'other@scu.edu', '555')")
+    # 25 orders for user 1 over 5 timestamps (ties broken by id), one for user 2
+    for n in range(25):
+        cursor.execute(
+            "INSERT INTO orders (user_id, order_date, location, total_price, estimated_delivery_time, order_id) "
+            "VALUES (1, %s, 'scdi', 5.00, 15, %s)", (f"2025-01-0{n // 5 + 1} 12:00:00", text_to_key(oid(n))))
+        cursor.execute("INSERT INTO order_items (order_id, menu_item_id, quantity) VALUES (%s, 1, %s)",
+                       (cursor.lastrowid, n % 3 + 1))
+    cursor.execute("INSERT INTO orders (user_id, location, total_price, estimated_delivery_time, order_id) "
+                   "VALUES (2, 'scdi', 2.00, 15, %s)", (text_to_key(oid(99, user_id=2)),))
+    conn.commit()
+    yield engine
+    engine.close()
+
+@pytest.fixture
+def client(engine):
+    app.config['TESTING'] = True
+    with patch.object(app_module, '_db_engine', engine):
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess['user_id'] = 1
+            yield client
+
+def test_cursor_round_trip():
+    """Test that page cursors encode and decode the seek position."""
+    token = encode_cursor({'order_date': '2025-01-01 12:00:00', 'id': 7})
+    assert decode_cursor(token) == ('2025-01-01 12:00:00', 7)
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+def test_pages_cover_history_without_gaps(client):
+    """Test that keyset pages walk the whole history newest first, exactly once."""
+    seen = []
+    cursor = None
+    while True:
+        url = '/orders?limit=7' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url).get_json()
+        assert len(page['orders']) <= 7
+        seen.extend(order['order_id'] for order in page['orders'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == [oid(n) for n in reversed(range(25))]
+
+def test_page_includes_line_items(client):
+    """Test that each order on a page carries its items."""
+    order = client.get('/orders?limit=1').get_json()['orders'][0]
+    assert order['order_id'] == oid(24)
+    assert order['items'] == [{'menu_item_id': 1, 'name': 'Cereal', 'quantity': 1, 'price': 5.0}]
+    assert order['total_price'] == 5.0
+
+def test_order_detail_is_owner_only(client):
+    """Test that tracking only returns the user's own orders."""
+    response = client.get(f'/orders/{oid(3)}')
+    assert response.status_code == 200
+    assert response.get_json()['delivery_time'] == 15
+    assert client.get(f'/orders/{oid(99, user_id=2)}').status_code == 404
+    assert client.get('/orders/not-an-order').status_code == 404
+
+def test_invalid_cursor_rejected(client):
+    """Test that a malformed cursor is a client error."""
+    assert client.get('/orders?cursor=%%%').status_code == 400
+    assert client.get('/orders?limit=abc').status_code == 400
+
+def test_history_requires_login():
+    """Test that order history is not available anonymously."""
+    with app.test_client() as client:
+        assert client.get('/orders').status_code == 401
+
+def test_page_query_uses_index(engine):
+    """Test that the seek query is served by the (user_id, order_date, id) index."""
+    conn = engine.connect()
+    cursor = conn.cursor()
+    cursor.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM orders WHERE user_id = %s "
+        "AND (order_date < %s OR (order_date = %s AND id < %s)) ORDER BY order_date DESC, id DESC LIMIT 8",
+        (1, '2025-01-03 12:00:00', '2025-01-03 12:00:00', 12))
+    plan = " ".join(str(row[-1]) for row in cursor.fetchall())
+    assert 'idx_orders_user_date' in plan
+    assert 'TEMP B-TREE' not in plan
+
+if __name__ == '__main__':
+    pytest.main()
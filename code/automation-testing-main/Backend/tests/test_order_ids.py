@@ -0,0 +1,111 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app, SCHEMA_PATH
+from order_ids import PREFIX, UlidGenerator, key_to_text, make_generator, migrate_order_ids, text_to_key
+from storage import SQLiteEngine
+
+class FakeClock:
+    def __init__(self, now=1700000000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def test_ids_increase_within_a_millisecond():
+    """Test that ids drawn in the same millisecond are still strictly increasing."""
+    generator = UlidGenerator(FakeClock())
+    keys = [generator.new_key() for _ in range(1000)]
+    assert keys == sorted(keys)
+    assert len(set(keys)) == 1000
+
+def test_ids_increase_when_clock_steps_back():
+    """Test that a clock going backwards does not reorder ids."""
+    clock = FakeClock()
+    generator = UlidGenerator(clock)
+    first = generator.new_key()
+    clock.now -= 5
+    assert generator.new_key() > first
+
+def test_text_sorts_like_key():
+    """Test that the text form sorts the same way as the stored key."""
+    clock = FakeClock()
+    generator = UlidGenerator(clock)
+    ids = []
+    for _ in range(50):
+        clock.now += 0.0004
+        ids.append(generator.new())
+    assert ids == sorted(ids)
+    assert all(order_id.startswith('ORD-') and len(order_id) == 30 for order_id in ids)
+    assert [text_to_key(order_id) for order_id in ids] == sorted(text_to_key(order_id) for order_id in ids)
+
+def test_round_trips():
+    """Test that new and legacy ids convert to 16-byte keys and back."""
+    order_id = make_generator('ulid').new(1)
+    assert key_to_text(text_to_key(order_id)) == order_id
+    assert text_to_key(PREFIX + order_id[4:].lower()) == text_to_key(order_id)
+
+    legacy = 'ORD-1a2b3c4d-42'
+    key = text_to_key(legacy)
+    assert len(key) == 16
+    assert key_to_text(key) == legacy
+    assert key_to_text(text_to_key(make_generator('legacy').new(7))).endswith('-7')
+
+@pytest.mark.parametrize('order_id', [
+    None, 'ORD-', 'order-1', 'ORD-zzzzzzzz-1', 'ORD-1a2b3c4d-x', 'ORD-1a2b3c4d-' + '9' * 30,
+    'ORD-' + 'U' * 26, 'ORD-' + '8' * 26,
+])
+def test_invalid_ids_rejected(order_id):
+    """Test that malformed ids raise ValueError rather than reaching the database."""
+    with pytest.raises(ValueError):
+        text_to_key(order_id)
+
+def test_unknown_scheme():
+    """Test that ORDER_ID_SCHEME must name a known generator."""
+    with pytest.raises(ValueError):
+        make_generator('snowflake')
+
+def test_reseed_starts_a_fresh_sequence():
+    """Test that a reseeded generator draws a new random tail for the same millisecond."""
+    generator = UlidGenerator(FakeClock())
+    first = generator.new_key()
+    generator.reseed()
+    second = generator.new_key()
+    assert first[:6] == second[:6]
+    assert first != second
+
+def test_migrate_legacy_rows(tmp_path):
+    """Test that text ids are converted in chunks and still resolve by their old id."""
+    engine = SQLiteEngine(str(tmp_path / 'ids.db'), SCHEMA_PATH)
+    conn = engine.connect()
+    cursor = conn.cursor()
+    legacy = [f'ORD-{n:08x}-1' for n in range(5)]
+    for order_id in legacy:
+        cursor.execute("INSERT INTO orders (user_id, location, total_price, estimated_delivery_time, order_id) "
+                       "VALUES (1, 'scdi', 5.00, 15, %s)", (order_id,))
+    conn.commit()
+
+    logged = []
+    assert migrate_order_ids(engine.connect, 'sqlite', chunk_size=2, log=logged.append) == 5
+    assert len(logged) == 3
+    assert migrate_order_ids(engine.connect, 'sqlite', log=logged.append) == 0
+
+    cursor.execute("SELECT order_id FROM orders ORDER BY id")
+    assert [key_to_text(row[0]) for row in cursor.fetchall()] == legacy
+
+    app.config['TESTING'] = True
+    with patch.object(app_module, '_db_engine', engine):
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess['user_id'] = 1
+            assert client.get(f'/orders/{legacy[3]}').get_json()['order_id'] == legacy[3]
+            assert client.get(f'/order_status/{legacy[3]}').status_code == 200
+    engine.close()
+
+if __name__ == '__main__':
+    pytest.main()
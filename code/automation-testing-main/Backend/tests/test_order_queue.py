@@ -0,0 +1,124 @@
+import pytest
+import sys
+import os
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app
+from menu_catalog import MenuCatalog
+from order_ids import text_to_key
+from order_queue import OrderWriter, QUEUED, PERSISTED, FAILED
+
+class FakeError(Exception):
+    pass
+
+class RecordingConnection:
+    """Fake connection that records each committed batch of orders."""
+    def __init__(self, batches, fail_on=None):
+        self.batches = batches
+        self.fail_on = fail_on
+        self.pending = []
+        self.cursor_obj = MagicMock()
+        self.cursor_obj.execute.side_effect = self._execute
+        self.cursor_obj.lastrowid = 1
+        self.cursor_obj.fetchall.side_effect = lambda: self._ids
+
+    def _execute(self, sql, params):
+        if sql.startswith("INSERT INTO orders"):
+            order_ids = params[4::7]
+            if self.fail_on in order_ids:
+                raise FakeError("duplicate order_id")
+            self.pending = list(order_ids)
+            self._ids = [{'id': i, 'order_id': oid} for i, oid in enumerate(order_ids, 1)]
+
+    def cursor(self, dictionary=False):
+        return self.cursor_obj
+
+    def commit(self):
+        self.batches.append(self.pending)
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+def oid(n, user_id=1):
+    return f'ORD-{n:08x}-{user_id}'
+
+def make_order(n, user_id=1):
+    return {'order_id': oid(n, user_id), 'user_id': user_id, 'location': 'Lucas Hall',
+            'total_price': 5.0, 'delivery_time': 17, 'items': {1: 1}}
+
+def test_writer_group_commits_batches():
+    """Test that queued orders are written in batches with one commit each."""
+    batches = []
+    writer = OrderWriter(lambda: RecordingConnection(batches), FakeError, batch_size=3, flush_interval=0.05)
+    for n in range(7):
+        assert writer.submit(make_order(n))
+    assert writer.stop(timeout=5)
+    assert sum(len(b) for b in batches) == 7
+    assert all(len(b) <= 3 for b in batches)
+    assert writer.status(oid(6)) == PERSISTED
+    assert writer.stats()['persisted'] == 7
+    assert writer.stats()['depth'] == 0
+
+def test_bad_order_does_not_sink_batch():
+    """Test that a failing order is isolated and the rest of its batch persists."""
+    batches = []
+    writer = OrderWriter(lambda: RecordingConnection(batches, fail_on=text_to_key(oid(1))), FakeError,
+                         batch_size=10, flush_interval=0.05, log=lambda msg: None)
+    for n in range(3):
+        writer.submit(make_order(n))
+    writer.stop(timeout=5)
+    assert writer.status(oid(1)) == FAILED
+    assert writer.status(oid(0)) == PERSISTED
+    assert writer.status(oid(2)) == PERSISTED
+
+def test_full_queue_rejects_submission():
+    """Test that submissions beyond the queue bound are refused, not blocked."""
+    writer = OrderWriter(lambda: None, FakeError, max_queue=1)
+    writer.start = lambda: None  # keep the writer idle so the queue stays full
+    assert writer.submit(make_order(1))
+    assert not writer.submit(make_order(2))
+    assert writer.status(oid(2)) is None
+    assert writer.stats()['rejected'] == 1
+
+def test_status_hidden_from_other_users():
+    """Test that order status is only reported to the order's owner."""
+    writer = OrderWriter(lambda: None, FakeError)
+    writer.start = lambda: None
+    writer.submit(make_order(1, user_id=1))
+    assert writer.status(oid(1), user_id=1) == QUEUED
+    assert writer.status(oid(1), user_id=2) is None
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def test_place_order_write_behind(client):
+    """Test that write-behind mode returns 202 and the order becomes persisted."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+        sess['name'] = 'Ritika Verma'
+
+    batches = []
+    writer = OrderWriter(lambda: RecordingConnection(batches), FakeError, flush_interval=0.05)
+    catalog = MenuCatalog(lambda: [{'id': 1, 'name': 'Cereal', 'category': 'Breakfast', 'price': Decimal('5.00')}])
+    with patch.dict(app.config, {'ORDER_WRITE_BEHIND': True}), \
+            patch('app.menu_catalog', catalog), patch('app._order_writer', writer):
+        response = client.post('/place_order', json={'cart_items': [1, 1], 'location': 'Lucas Hall'})
+        assert response.status_code == 202
+        order_id = response.get_json()['order_id']
+        writer.flush(timeout=5)
+
+        status = client.get(f'/order_status/{order_id}').get_json()
+        assert status['status'] == PERSISTED
+    writer.stop(timeout=5)
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,131 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app
+from rollups import aggregate, backfill, rollup_statements
+from storage import MySQLEngine
+
+@pytest.fixture
+def client(customer):
+    return customer
+
+def query(engine, sql):
+    cursor = engine.connect().cursor(dictionary=True)
+    cursor.execute(sql)
+    return cursor.fetchall()
+
+def test_aggregate_buckets_by_hour_and_day():
+    """Test that orders fold into hour x location and day x item buckets."""
+    orders = [
+        {'location': 'scdi', 'total_price': 18.0, 'items': {1: 2, 2: 1}, 'prices': {1: 5.0, 2: 8.0}},
+        {'location': 'scdi', 'total_price': 5.0, 'items': {1: 1}, 'prices': {1: 5.0}},
+    ]
+    hourly, daily = aggregate(orders, datetime(2025, 3, 1, 12, 34))
+    assert hourly == {('2025-03-01 12:00:00', 'scdi'): [2, 4, 23.0]}
+    assert daily == {('2025-03-01', 1): [3, 15.0], ('2025-03-01', 2): [1, 8.0]}
+
+def test_upsert_dialects():
+    """Test that each engine gets its own upsert syntax."""
+    order = {'location': 'scdi', 'total_price': 5.0, 'items': {1: 1}, 'prices': {1: 5.0}}
+    mysql_sql = rollup_statements('mysql', [order])[0][0]
+    sqlite_sql = rollup_statements('sqlite', [order])[0][0]
+    assert 'ON DUPLICATE KEY UPDATE order_count = order_count + VALUES(order_count)' in mysql_sql
+    assert 'ON CONFLICT (bucket_hour, location) DO UPDATE SET' in sqlite_sql
+    assert 'excluded.revenue' in sqlite_sql
+
+def test_orders_update_rollups(client, engine):
+    """Test that placed orders are added to the rollups in the same transaction."""
+    client.post('/place_order', json={'cart_items': [1, 1, 2], 'location': 'scdi'})
+    client.post('/place_order', json={'cart_items': [1], 'location': 'scdi'})
+    client.post('/bulk_orders', json={'orders': [{'location': 'Lucas Hall', 'cart_items': [2]}]})
+
+    hourly = {row['location']: row for row in query(engine, "SELECT * FROM sales_hourly_location")}
+    assert hourly['scdi']['order_count'] == 2
+    assert hourly['scdi']['item_count'] == 4
+    assert float(hourly['scdi']['revenue']) == 23.0
+    assert hourly['Lucas Hall']['order_count'] == 1
+
+    daily = {row['menu_item_id']: row for row in query(engine, "SELECT * FROM sales_daily_item")}
+    assert daily[1]['quantity'] == 3 and float(daily[1]['revenue']) == 15.0
+    assert daily[2]['quantity'] == 2 and float(daily[2]['revenue']) == 16.0
+
+def test_backfill_rebuilds_from_history(client, engine):
+    """Test that a chunked backfill reproduces the live rollups."""
+    for location in ('scdi', 'scdi', 'Kenna Hall', 'Alameda Hall', 'scdi'):
+        client.post('/place_order', json={'cart_items': [1, 3], 'location': location})
+    live_hourly = query(engine, "SELECT * FROM sales_hourly_location ORDER BY location")
+    live_daily = query(engine, "SELECT * FROM sales_daily_item ORDER BY menu_item_id")
+
+    logged = []
+    assert backfill(engine.connect, 'sqlite', chunk_size=2, log=logged.append) == 5
+    assert len(logged) == 3
+    assert query(engine, "SELECT * FROM sales_hourly_location ORDER BY location") == live_hourly
+    assert query(engine, "SELECT * FROM sales_daily_item ORDER BY menu_item_id") == live_daily
+
+class RecordingConnection:
+    """Connection to an empty orders table that records every statement."""
+
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self, dictionary=False):
+        return self
+
+    def execute(self, sql, params=()):
+        self.statements.append(sql)
+
+    def fetchone(self):
+        return {'max_id': 0}
+
+    def fetchall(self):
+        return []
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_mysql_backfill_buckets_in_utc():
+    """Test that a MySQL backfill reads order_date in UTC, not the session's zone."""
+    conn = RecordingConnection()
+    assert backfill(lambda: conn, 'mysql') == 0
+    assert conn.statements[0] == "SET time_zone = '+00:00'"
+    with patch('storage.mysql.connector.connect') as connect:
+        MySQLEngine('db', 'user', 'secret', 'scu', min_size=0).pool.acquire()
+    assert connect.call_args.kwargs['time_zone'] == '+00:00'
+
+def test_backfill_cli(client):
+    """Test the flask backfill-rollups command."""
+    client.post('/place_order', json={'cart_items': [1], 'location': 'scdi'})
+    result = app.test_cli_runner().invoke(args=['backfill-rollups'])
+    assert result.exit_code == 0
+    assert 'from 1 orders' in result.output
+
+def test_sales_report(client):
+    """Test the report reads totals by location and by item from the rollups."""
+    client.post('/place_order', json={'cart_items': [1, 2], 'location': 'scdi'})
+    today = datetime.now(timezone.utc).date().isoformat()
+
+    by_location = client.get(f'/reports/sales?by=location&start={today}&end={today}').get_json()
+    assert by_location['rows'] == [{'location': 'scdi', 'orders': 1, 'items': 2, 'revenue': 13.0}]
+
+    by_item = client.get('/reports/sales?by=item').get_json()['rows']
+    assert {row['name']: row['quantity'] for row in by_item} == {'Cereal': 1, 'Pancakes': 1}
+
+    assert client.get('/reports/sales?by=week').status_code == 400
+    assert client.get('/reports/sales?start=yesterday').status_code == 400
+
+def test_sales_report_restricted(client):
+    """Test that only report users can read sales."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = 99
+    assert client.get('/reports/sales').status_code == 403
+
+if __name__ == '__main__':
+    pytest.main()
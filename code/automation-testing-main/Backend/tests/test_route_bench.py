@@ -0,0 +1,41 @@
+import pytest
+import sys
+import os
+import json
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app
+from benchmarks import route_bench
+
+def test_percentile_nearest_rank():
+    """Test nearest-rank percentiles on a small sample."""
+    samples = list(range(1, 101))
+    assert route_bench.percentile(samples, 50) == 50
+    assert route_bench.percentile(samples, 95) == 95
+    assert route_bench.percentile(samples, 99) == 99
+    assert route_bench.percentile([], 99) == 0.0
+
+def test_benchmark_run_reports_every_route(tmp_path, app_state):
+    """Test a tiny benchmark run end to end and its JSON output."""
+    with patch.dict(app.config), patch.object(app_module, '_db_engine', None):
+        result = route_bench.run(concurrency=2, iterations=2, items=2, warmup=0)
+
+    assert set(result['routes']) == set(route_bench.ROUTES)
+    order_stats = result['routes']['POST /place_order']
+    assert order_stats['requests'] == 4
+    assert order_stats['errors'] == 0
+    assert order_stats['p50_ms'] <= order_stats['p95_ms'] <= order_stats['p99_ms']
+    json.dumps(result)
+
+def test_compare_flags_regression(capsys):
+    """Test that a slower candidate run is reported as a regression."""
+    baseline = {'routes': {'POST /place_order': {'p50_ms': 10, 'p95_ms': 20, 'p99_ms': 30, 'rps': 100}}}
+    candidate = {'routes': {'POST /place_order': {'p50_ms': 10, 'p95_ms': 40, 'p99_ms': 30, 'rps': 100}}}
+    assert route_bench.compare(baseline, candidate, threshold=10)
+    assert not route_bench.compare(baseline, baseline, threshold=10)
+
+if __name__ == '__main__':
+    pytest.main()
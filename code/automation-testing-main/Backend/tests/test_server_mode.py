@@ -0,0 +1,69 @@
+import pytest
+import sys
+import os
+import runpy
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def test_secret_key_from_environment():
+    """Test that SECRET_KEY is used verbatim so every worker signs sessions alike."""
+    with patch.dict(os.environ, {'SECRET_KEY': 'shared-secret'}):
+        assert app_module._load_secret_key() == 'shared-secret'
+
+def test_secret_key_from_file(tmp_path):
+    """Test that SECRET_KEY_FILE is read when SECRET_KEY is unset."""
+    key_file = tmp_path / 'secret'
+    key_file.write_text('from-file\n')
+    env = {k: v for k, v in os.environ.items() if k != 'SECRET_KEY'}
+    env['SECRET_KEY_FILE'] = str(key_file)
+    with patch.dict(os.environ, env, clear=True):
+        assert app_module._load_secret_key() == 'from-file'
+
+def test_gunicorn_config_from_environment():
+    """Test that worker and thread counts come from the environment with preloading on."""
+    with patch.dict(os.environ, {'WEB_WORKERS': '3', 'WEB_THREADS': '8'}):
+        config = runpy.run_path(os.path.join(BACKEND_DIR, 'gunicorn.conf.py'))
+    assert config['workers'] == 3
+    assert config['threads'] == 8
+    assert config['preload_app'] is True
+
+def test_gunicorn_starts_shared_cart_server():
+    """Test that the master starts the cart server that multi-worker carts live in, and stops it on exit."""
+    env = {k: v for k, v in os.environ.items() if k != 'WEB_WORKERS'}
+    with patch.dict(os.environ, env, clear=True):
+        config = runpy.run_path(os.path.join(BACKEND_DIR, 'gunicorn.conf.py'))
+        # The default worker count is exported for the app, which is imported after this file
+        assert os.environ['WEB_WORKERS'] == str(config['workers'])
+    server = MagicMock()
+    with patch.dict(app_module.app.config, {'CART_BACKEND': 'shared', 'CART_STORE_SPAWN': True}), \
+            patch('subprocess.Popen') as popen:
+        config['on_starting'](server)
+        config['on_exit'](server)
+    args = popen.call_args[0][0]
+    assert args[1].endswith('cart_store.py')
+    assert args[2:] == ['--serve', app_module.app.config['CART_STORE_ADDRESS']]
+    popen.return_value.terminate.assert_called_once()
+
+def test_shutdown_drains_order_queue():
+    """Test that shutdown stops the order writer and closes the storage engine."""
+    writer, engine = MagicMock(), MagicMock()
+    with patch.object(app_module, '_order_writer', writer), patch.object(app_module, '_db_engine', engine):
+        app_module.shutdown(timeout=5)
+    writer.stop.assert_called_once_with(5)
+    engine.close.assert_called_once()
+
+def test_reset_after_fork_drops_inherited_state():
+    """Test that a forked worker starts with its own engine and writer."""
+    with patch.object(app_module, '_order_writer', MagicMock()), \
+            patch.object(app_module, '_db_engine', MagicMock()):
+        app_module.reset_after_fork()
+        assert app_module._db_engine is None
+        assert app_module._order_writer is None
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,116 @@
+import pytest
+import sqlite3
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app, SCHEMA_PATH
+from order_ids import text_to_key
+from storage import SQLiteEngine, sqlite_statements
+
+@pytest.fixture
+def client(sqlite_client):
+    return sqlite_client
+
+def test_schema_translated_from_backend_sql():
+    """Test that backend.sql is reduced to SQLite-compatible DDL and seed data."""
+    with open(SCHEMA_PATH) as f:
+        statements = sqlite_statements(f.read())
+    assert not any(s.upper().startswith(('CREATE DATABASE', 'USE', 'GRANT')) for s in statements)
+    orders_ddl = next(s for s in statements if 'TABLE IF NOT EXISTS orders' in s)
+    assert 'INTEGER PRIMARY KEY AUTOINCREMENT' in orders_ddl
+
+def test_bootstrap_seeds_menu_in_wal_mode(engine):
+    """Test that the first connection creates the schema, seeds it and enables WAL."""
+    conn = engine.connect()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT COUNT(*) AS n FROM menu_items")
+    assert cursor.fetchone()['n'] == 22
+    cursor.execute("PRAGMA journal_mode")
+    assert cursor.fetchone()['journal_mode'] == 'wal'
+
+def old_schema(tmp_path):
+    """backend.sql as it was before orders.idempotency_key was added."""
+    with open(SCHEMA_PATH) as f:
+        script = f.read()
+    script = script.replace("    idempotency_key VARCHAR(64) NULL,  -- client Idempotency-Key of /place_order, if sent\n", "")
+    script = script.replace("CREATE UNIQUE INDEX idx_orders_idempotency ON orders (user_id, idempotency_key);", "")
+    path = tmp_path / 'old_schema.sql'
+    path.write_text(script)
+    return str(path)
+
+def test_bootstrap_upgrades_existing_tables(tmp_path):
+    """Test that a database created from an older schema gets the new columns and indexes."""
+    path = str(tmp_path / 'upgrade.db')
+    old = SQLiteEngine(path, old_schema(tmp_path))
+    cursor = old.connect().cursor()
+    cursor.execute("INSERT INTO orders (user_id, location, total_price, order_id) VALUES (1, 'scdi', 8, %s)",
+                   (b'\x01' * 16,))
+    old.connect().commit()
+    old.close()
+
+    engine = SQLiteEngine(path, SCHEMA_PATH)
+    cursor = engine.connect().cursor(dictionary=True)
+    cursor.execute("SELECT COUNT(*) AS n, MAX(idempotency_key) AS k FROM orders")
+    assert cursor.fetchone() == {'n': 1, 'k': None}
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'idx_orders_idempotency'")
+    assert cursor.fetchone() is not None
+    cursor.execute("SELECT COUNT(*) AS n FROM menu_items")
+    assert cursor.fetchone()['n'] == 22  # existing seed data is not duplicated
+    engine.close()
+
+def test_failed_bootstrap_is_not_cached(tmp_path):
+    """Test that a connection whose bootstrap failed is never reused."""
+    schema = tmp_path / 'broken.sql'
+    schema.write_text("CREATE TABLE t (id INT);\nCREATE INDEX idx_t ON t (missing);")
+    engine = SQLiteEngine(str(tmp_path / 'broken.db'), str(schema))
+    for _ in range(2):
+        with pytest.raises(sqlite3.OperationalError):
+            engine.connect()
+    assert engine.stats()['connections'] == 0
+
+def test_connection_is_per_thread(engine):
+    """Test that a thread reuses its own connection."""
+    assert engine.connect() is engine.connect()
+
+def test_full_flow_on_sqlite(client):
+    """Test login, menu, cart and order placement end to end without a DB server."""
+    response = client.post('/', data={'scu_email': 'admin@scu.edu', 'scu_id': '1234567890'},
+                           follow_redirects=True)
+    assert b'Pancakes' in response.data
+    assert b'$8.00' in response.data
+
+    client.post('/add_to_cart', json={'item_id': 2, 'name': 'Pancakes', 'price': 8})
+    assert client.get('/cart_total').get_json()['total'] == 8.0
+
+    response = client.post('/place_order', json={'cart_items': [2, 2, 18], 'location': 'scdi'})
+    assert response.status_code == 200
+    order_id = response.get_json()['order_id']
+
+    conn = app_module.get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT total_price, estimated_delivery_time FROM orders WHERE order_id = %s",
+                   (text_to_key(order_id),))
+    order = cursor.fetchone()
+    assert float(order['total_price']) == 18.0
+    assert order['estimated_delivery_time'] == 20  # 18 plus the courier run's 2 minute hold
+    assert client.get(f'/order_status/{order_id}').get_json()['status'] == 'persisted'
+
+def test_unknown_menu_item_is_rejected(client):
+    """Test that an id missing from the menu answers 400 instead of failing the insert."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    response = client.post('/place_order', json={'cart_items': [2, 999], 'location': 'scdi'})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid menu item'}
+
+    conn = app_module.get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT COUNT(*) AS n FROM orders")
+    assert cursor.fetchone()['n'] == 0
+    assert app_module.dispatcher.runs() == []
+
+if __name__ == '__main__':
+    pytest.main()
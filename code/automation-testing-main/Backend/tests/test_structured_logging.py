@@ -0,0 +1,132 @@
+import io
+import json
+import logging
+import queue
+import sqlite3
+import sys
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app
+from structured_logging import JsonFormatter, LogPipeline, NonBlockingQueueHandler, SamplingFilter
+
+def make_record(msg='hello %s', args=('world',), **extra):
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+def test_json_formatter_includes_extra_fields():
+    """Test that records render as one JSON object with their extra fields."""
+    line = JsonFormatter().format(make_record(request_id='abc', duration_ms=12.5))
+    entry = json.loads(line)
+    assert entry['message'] == 'hello world'
+    assert entry['level'] == 'INFO'
+    assert entry['request_id'] == 'abc'
+    assert entry['duration_ms'] == 12.5
+    assert 'args' not in entry and 'lineno' not in entry
+
+def test_sampling_only_applies_to_marked_records():
+    """Test that only records flagged as sampled are thinned out."""
+    draws = iter([0.05, 0.5])
+    sampler = SamplingFilter(0.1, draw=lambda: next(draws))
+    assert sampler.filter(make_record(sampled=True))
+    assert not sampler.filter(make_record(sampled=True))
+    assert sampler.filter(make_record())
+
+def test_full_queue_drops_instead_of_blocking():
+    """Test that a saturated log queue never blocks the caller."""
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    start = time.monotonic()
+    for _ in range(100):
+        handler.handle(make_record())
+    assert time.monotonic() - start < 0.5
+    assert handler.dropped == 99
+
+def read_entries(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_pipeline_writes_json_on_listener_thread():
+    """Test the whole queue -> listener -> JSON path, tracebacks included."""
+    stream = io.StringIO()
+    pipeline = LogPipeline('pipeline_test', stream=stream, context=lambda: {'request_id': 'r1'})
+    pipeline.start()
+    log = logging.getLogger('pipeline_test.child')
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        log.exception("failed %d times", 3)
+    log.info("done", extra={'request_id': 'explicit'})
+    pipeline.close()
+
+    failed, done = read_entries(stream)
+    assert failed['message'] == 'failed 3 times'
+    assert failed['level'] == 'ERROR'
+    assert failed['request_id'] == 'r1'
+    assert 'ValueError: boom' in failed['exc']
+    assert done['request_id'] == 'explicit'
+
+@pytest.fixture
+def captured():
+    """Route the app's log records to an in-memory JSON pipeline with no sampling."""
+    stream = io.StringIO()
+    pipeline = LogPipeline('app', stream=stream, context=app_module._log_context)
+    pipeline.start()
+    yield pipeline, stream
+    pipeline.close()
+
+def drain(captured):
+    pipeline, stream = captured
+    pipeline.stop()  # writes out everything already queued
+    return read_entries(stream)
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def test_request_log_carries_context(client, captured):
+    """Test that each request is logged with its id, route, status and duration."""
+    response = client.get('/get_location_image/scdi', headers={'X-Request-ID': 'edge-42'})
+    assert response.headers['X-Request-ID'] == 'edge-42'
+    client.get('/get_location_image/scdi')
+
+    first, second = [entry for entry in drain(captured) if entry['logger'] == 'app.request']
+    assert first['request_id'] == 'edge-42'
+    assert first['route'] == 'get_location_image'
+    assert first['status'] == 200
+    assert first['duration_ms'] >= 0
+    assert first['sampled'] is True
+    assert second['request_id'] != first['request_id']
+
+def test_errors_and_slow_requests_always_logged(client, captured):
+    """Test that a failing request logs its error with the request context, plus a slow-request record."""
+    class BrokenEngine:
+        name = 'sqlite'
+
+        def connect(self, deadline=None):
+            raise sqlite3.OperationalError("disk I/O error")
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 5
+    with patch.object(app_module, '_db_engine', BrokenEngine()), \
+            patch.dict(app.config, {'LOG_SLOW_REQUEST_MS': 0}):
+        assert client.get('/orders').status_code == 500
+
+    entries = {entry['logger']: entry for entry in drain(captured)}
+    error = entries['app']
+    assert error['message'] == 'Database connection error: disk I/O error'
+    assert error['route'] == 'order_history' and error['user_id'] == 5
+    assert entries['app.slow']['level'] == 'WARNING'
+    assert entries['app.request']['status'] == 500
+    assert entries['app.request']['request_id'] == error['request_id']
+    assert 'sampled' not in entries['app.request']
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,108 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, USER_BY_EMAIL
+from user_cache import MISS, UserLookupCache
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def cache():
+    """Swap in an empty lookup cache for the login route."""
+    fresh = UserLookupCache()
+    with patch('app.user_cache', fresh):
+        yield fresh
+
+RITIKA = {'id': 3, 'name': 'Ritika Verma', 'scu_id': '1234567890'}
+
+def test_positive_entry_checks_credential():
+    """Test that a cached user only matches the same SCU ID."""
+    cache = UserLookupCache()
+    assert cache.get('rverma@scu.edu', '1234567890') is MISS
+    assert cache.put('rverma@scu.edu', RITIKA, '0000000000') is None
+    assert cache.get('RVerma@scu.edu', '1234567890') == {'id': 3, 'name': 'Ritika Verma'}
+    assert cache.get('rverma@scu.edu', '1111111111') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['users'] == 1 and cache.stats()['negative'] == 0
+
+def test_negative_entry_expires():
+    """Test that failed lookups are only remembered for negative_ttl."""
+    cache = UserLookupCache(negative_ttl=0)
+    assert cache.put('nobody@scu.edu', None, '1111111111') is None
+    assert cache.get('nobody@scu.edu', '1111111111') is MISS
+
+def test_invalidate_forgets_user():
+    """Test that invalidate() drops positive and negative entries for an email."""
+    cache = UserLookupCache()
+    cache.put('tjain2@scu.edu', {'id': 4, 'name': 'Tanya Jain', 'scu_id': '1234567890'}, '1234567890')
+    cache.put('nobody@scu.edu', None, '9999999999')
+    cache.invalidate('tjain2@scu.edu')
+    cache.invalidate('NOBODY@scu.edu')
+    assert cache.get('tjain2@scu.edu', '1234567890') is MISS
+    assert cache.get('nobody@scu.edu', '9999999999') is MISS
+
+def test_capacity_bound():
+    """Test that the LRU never grows past its capacity."""
+    cache = UserLookupCache(capacity=2)
+    for n in range(3):
+        cache.put(f'user{n}@scu.edu', {'id': n, 'name': f'User {n}', 'scu_id': str(n)}, str(n))
+    assert cache.get('user0@scu.edu', '1234567890') is MISS
+    assert cache.stats()['evictions'] == 1
+
+def test_repeat_login_skips_database(client, cache):
+    """Test that a second login for the same user costs no DB round trip."""
+    with patch('app.get_db_connection') as mock_db:
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = {'id': 1, 'name': 'Ritika Verma', 'scu_id': '1234567890'}
+        mock_db.return_value.cursor.return_value = mock_cursor
+        for _ in range(2):
+            client.post('/', data={'scu_email': 'rverma@scu.edu', 'scu_id': '1234567890'})
+        assert mock_db.call_count == 1
+
+def test_bad_credential_flood_is_absorbed(client, cache):
+    """Test that repeated bad logins hit the negative cache, not MySQL."""
+    with patch('app.get_db_connection') as mock_db:
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = None
+        mock_db.return_value.cursor.return_value = mock_cursor
+        for _ in range(5):
+            response = client.post('/', data={'scu_email': 'wrong@scu.edu', 'scu_id': '0987654321'})
+            assert b'Invalid SCU Email or SCU ID' in response.data
+        assert mock_db.call_count == 1
+    assert cache.stats()['negative_hits'] == 4
+
+def test_guessing_ids_never_reaches_database(client, cache):
+    """Test that once an email is cached, every wrong SCU ID for it is answered in process."""
+    with patch('app.get_db_connection') as mock_db:
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = {'id': 1, 'name': 'Ritika Verma', 'scu_id': '1234567890'}
+        mock_db.return_value.cursor.return_value = mock_cursor
+        for guess in range(5):
+            response = client.post('/', data={'scu_email': 'rverma@scu.edu', 'scu_id': f'000000000{guess}'})
+            assert b'Invalid SCU Email or SCU ID' in response.data
+        assert mock_db.call_count == 1
+        # The lookup is by email alone; the SCU ID never goes to the database
+        assert mock_cursor.execute.call_args.args[1] == ('rverma@scu.edu',)
+        response = client.post('/', data={'scu_email': 'rverma@scu.edu', 'scu_id': '1234567890'})
+        assert response.status_code == 302 and mock_db.call_count == 1
+
+def test_login_ignores_email_case(sqlite_client, engine):
+    """Test that the database lookup ignores case like the cache keys do, so no casing blocks the real login."""
+    for email in ('ADMIN@scu.edu', 'Admin@SCU.edu'):
+        response = sqlite_client.post('/', data={'scu_email': email, 'scu_id': '1234567890'})
+        assert response.status_code == 302
+        sqlite_client.get('/logout')
+    cursor = engine.connect().cursor()
+    cursor.execute('EXPLAIN QUERY PLAN ' + USER_BY_EMAIL, ('admin@scu.edu',))
+    assert 'idx_users_email_lower' in str(cursor.fetchall())
+
+if __name__ == '__main__':
+    pytest.main()
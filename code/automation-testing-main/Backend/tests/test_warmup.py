@@ -0,0 +1,104 @@
+import pytest
+import sqlite3
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app as app_module
+from app import app
+from fragment_cache import FragmentCache
+from menu_catalog import MenuCatalog
+from warmup import Warmup
+
+def test_phases_run_in_order_and_are_timed():
+    """Test that every phase runs once, in order, and is timed."""
+    calls = []
+    warmup = Warmup([('a', lambda: calls.append('a')), ('b', lambda: calls.append('b'))])
+    assert not warmup.ready
+    assert warmup.status() == {'a': 'pending', 'b': 'pending'}
+    assert warmup.run()
+    assert warmup.run()
+    assert calls == ['a', 'b']
+    assert all(ms >= 0 for ms in warmup.status().values())
+    assert warmup.stats()['ready'] == 1
+
+def test_failed_phase_is_retried():
+    """Test that a failed phase keeps the worker unready until a later run succeeds."""
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("database unreachable")
+
+    calls = []
+    warmup = Warmup([('database', flaky), ('templates', lambda: calls.append('templates'))])
+    assert not warmup.run()
+    assert warmup.status()['database'] == 'failed: database unreachable'
+    assert calls == ['templates']
+    assert warmup.run()
+    assert len(attempts) == 2 and calls == ['templates']
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def test_healthz_needs_nothing(client):
+    """Test that liveness answers without warm-up or a database."""
+    with patch.object(app_module, 'warmup', Warmup([('never', lambda: None)])):
+        response = client.get('/healthz')
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'ok'}
+
+def test_readyz_after_warmup(client, engine):
+    """Test that the app's warm-up loads everything and /readyz turns ready."""
+    catalog = MenuCatalog(app_module._load_menu_items)
+    fragments = FragmentCache()
+    warmup = Warmup(app_module.warmup.phases)
+    with patch.object(app_module, '_db_engine', engine), \
+            patch.object(app_module, 'menu_catalog', catalog), \
+            patch.object(app_module, 'fragment_cache', fragments), \
+            patch.object(app_module, 'warmup', warmup):
+        assert warmup.run()
+        response = client.get('/readyz')
+        metrics = client.get('/metrics').data
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['status'] == 'ready'
+    assert set(body['phases']) == {'database', 'templates', 'menu'}
+    assert catalog.stats()['loads'] == 1
+    assert fragments.stats()['misses'] == 1
+    assert b'warmup{stat="ready"} 1' in metrics
+
+def test_readyz_while_warming(client):
+    """Test that an unwarmed worker is not ready, and the probe kicks off its warm-up."""
+    warmup = Warmup([('database', lambda: None)])
+    with patch.object(app_module, 'warmup', warmup):
+        response = client.get('/readyz')
+        assert response.status_code == 503
+        assert response.get_json()['status'] == 'warming'
+        warmup._thread.join()
+    assert warmup.ready
+
+class BrokenEngine:
+    name = 'sqlite'
+
+    def connect(self, deadline=None):
+        raise sqlite3.OperationalError("unable to open database file")
+
+def test_readyz_fails_without_database(client):
+    """Test that a warm worker that lost its database is taken out of rotation."""
+    warmup = Warmup([])
+    warmup.run()
+    with patch.object(app_module, 'warmup', warmup), \
+            patch.object(app_module, '_db_engine', BrokenEngine()):
+        response = client.get('/readyz')
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'database unavailable'
+
+if __name__ == '__main__':
+    pytest.main()
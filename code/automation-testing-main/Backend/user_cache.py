@@ -0,0 +1,100 @@
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+MISS = object()
+
+
+class UserLookupCache:
+    """Bounded LRU of login lookups sitting in front of the users table.
+
+    Entries are keyed by lower-cased email alone and hold the user's
+    (id, name, credential hash), where the hash is an HMAC of the SCU ID
+    under a per-process key, so raw IDs are never held in memory.  Each
+    login attempt's SCU ID is compared with the cached hash in process, so
+    guessing IDs for a known email never reaches the database.  Emails
+    with no user row are remembered for `negative_ttl` seconds.  Changes
+    to the users table show up once an entry's `ttl` runs out.
+    """
+
+    def __init__(self, capacity=10000, ttl=300.0, negative_ttl=30.0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._key = secrets.token_bytes(32)
+        self._users = OrderedDict()     # email -> (id, name, credential hash, expires)
+        self._negative = OrderedDict()  # email with no user row -> expires
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, email, scu_id):
+        """Return the user dict, None for a known-bad login, or MISS if the email is not cached."""
+        email = email.lower()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(email)
+            if entry is not None and entry[3] > now:
+                self._users.move_to_end(email)
+                return self._check(entry, scu_id)
+            expires = self._negative.get(email)
+            if expires is not None and expires > now:
+                self._negative.move_to_end(email)
+                self._stats['negative_hits'] += 1
+                return None
+            self._stats['misses'] += 1
+            return MISS
+
+    def put(self, email, row, scu_id):
+        """Cache the users row for an email (None if there is none); return the outcome for `scu_id`."""
+        email = email.lower()
+        now = time.monotonic()
+        with self._lock:
+            if row is None:
+                self._users.pop(email, None)
+                self._store(self._negative, email, now + self.negative_ttl)
+                return None
+            self._negative.pop(email, None)
+            entry = (row['id'], row['name'], self._hash(row['scu_id']), now + self.ttl)
+            self._store(self._users, email, entry)
+            return {'id': entry[0], 'name': entry[1]} if hmac.compare_digest(entry[2], self._hash(scu_id)) else None
+
+    def invalidate(self, email):
+        """Forget everything cached for one email."""
+        email = email.lower()
+        with self._lock:
+            self._users.pop(email, None)
+            self._negative.pop(email, None)
+
+    def clear(self):
+        """Forget every cached lookup."""
+        with self._lock:
+            self._users.clear()
+            self._negative.clear()
+
+    def stats(self):
+        """Return hit/miss counters and current sizes."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(users=len(self._users), negative=len(self._negative))
+        return stats
+
+    def _check(self, entry, scu_id):
+        if hmac.compare_digest(entry[2], self._hash(scu_id)):
+            self._stats['hits'] += 1
+            return {'id': entry[0], 'name': entry[1]}
+        # Emails and SCU IDs are both unique, so any other ID is wrong.
+        self._stats['negative_hits'] += 1
+        return None
+
+    def _hash(self, scu_id):
+        return hmac.new(self._key, str(scu_id).encode('utf-8'), hashlib.sha256).digest()
+
+    def _store(self, table, key, value):
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > self.capacity:
+            table.popitem(last=False)
+            self._stats['evictions'] += 1
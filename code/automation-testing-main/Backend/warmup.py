@@ -0,0 +1,81 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """Start-up phases a worker runs before it reports ready.
+
+    `phases` is a list of (name, fn) run in order, each timed and logged.
+    A phase that raises is logged and tried again on the next run(); the
+    ones that succeeded are not repeated.  The worker is ready once every
+    phase has succeeded.
+    """
+
+    def __init__(self, phases):
+        self.phases = list(phases)
+        self._timings = {}  # name -> seconds, for phases that succeeded
+        self._errors = {}  # name -> last failure
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return len(self._timings) == len(self.phases)
+
+    def run(self):
+        """Run every phase that has not yet succeeded; return whether all have."""
+        with self._lock:
+            for name, phase in self.phases:
+                if name in self._timings:
+                    continue
+                start = time.perf_counter()
+                try:
+                    phase()
+                except Exception as err:
+                    self._errors[name] = str(err)
+                    logger.warning("Warm-up phase %s failed: %s", name, err, extra={'phase': name})
+                    continue
+                elapsed = time.perf_counter() - start
+                self._timings[name] = elapsed
+                self._errors.pop(name, None)
+                logger.info("Warm-up phase %s took %.1f ms", name, elapsed * 1000,
+                            extra={'phase': name, 'duration_ms': round(elapsed * 1000, 2)})
+            if self.ready:
+                total_ms = round(sum(self._timings.values()) * 1000, 2)
+                logger.info("Warm-up complete in %.1f ms", total_ms, extra={'duration_ms': total_ms})
+            return self.ready
+
+    def start(self):
+        """Run in a background thread, unless already warm or warming."""
+        if self.ready or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self.run, name='warmup', daemon=True)
+        self._thread.start()
+
+    def reset(self):
+        """Forget every phase, e.g. in a forked worker whose connections were dropped."""
+        with self._lock:
+            self._timings.clear()
+            self._errors.clear()
+            self._thread = None
+
+    def status(self):
+        """Return {phase: duration in ms, 'failed: ...' or 'pending'} in phase order."""
+        status = {}
+        for name, _ in self.phases:
+            if name in self._timings:
+                status[name] = round(self._timings[name] * 1000, 2)
+            elif name in self._errors:
+                status[name] = f"failed: {self._errors[name]}"
+            else:
+                status[name] = 'pending'
+        return status
+
+    def stats(self):
+        stats = {'ready': int(self.ready)}
+        for name, seconds in self._timings.items():
+            stats[f'{name}_seconds'] = seconds
+        return stats